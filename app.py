@@ -5,6 +5,7 @@ Press 'D' to switch views, 'L' to load CSV.
 All functions are stateless and under 20 lines.
 """
 
+import time
 from datetime import datetime
 from typing import Optional
 from textual.app import App, ComposeResult
@@ -13,41 +14,38 @@ from textual.widgets import Header, Footer, Static, DataTable, ProgressBar, Butt
 from textual.worker import Worker, WorkerState
 from textual.screen import ModalScreen
 
+from db import close_pool, execute_query
+from refresh_scheduler import RefreshScheduler, REFRESH_SECONDS, REFRESH_FRAME_SECONDS, format_stats
 from styles import DASHBOARD_CSS
 from views.registry import ViewRegistry
-from views.wallet import WalletView
-from views.meta import MetaView
-from views.base import ContainerConfig
+from views.base import BaseView
+from views.prefetch import PrefetchScheduler, PREFETCH_ENABLED
 from components.date_range import DateRangeSelector, DateRange, today
 
-# Business Dashboard Views (BD-1.0 to BD-9.0)
-from views.revenue import RevenueView
-from views.users import UsersView
-from views.consultations import ConsultationsView
-from views.payments import PaymentsView
-from views.meta_campaigns import MetaCampaignsView
-from views.meta_totals import MetaTotalsView
-from views.astrologer_performance import AstrologerPerformanceView
-from views.astrologer_availability import AstrologerAvailabilityView
-from views.guides import GuidesView
-from views.guide_performance import GuidePerformanceView
-
 
 # --- Register Views ---
-ViewRegistry.register(WalletView())
-ViewRegistry.register(MetaView())
-
-# Business Dashboard Views
-ViewRegistry.register(RevenueView())           # BD-1.0
-ViewRegistry.register(UsersView())             # BD-2.0
-ViewRegistry.register(ConsultationsView())     # BD-3.0
-ViewRegistry.register(PaymentsView())          # BD-4.0
-ViewRegistry.register(MetaCampaignsView())     # BD-6.0
-ViewRegistry.register(MetaTotalsView())        # BD-7.0
-ViewRegistry.register(AstrologerPerformanceView())   # BD-8.0
-ViewRegistry.register(AstrologerAvailabilityView())  # BD-9.0
-ViewRegistry.register(GuidesView())                  # Guides Dashboard
-ViewRegistry.register(GuidePerformanceView())        # Guide Performance (Repeat/Leakage)
+# Metadata only; each module is imported when its view is first shown
+VIEWS = [
+    ("wallet", "Wallet Dashboard", "W", "views.wallet:WalletView"),
+    ("meta", "Meta Ads Analytics", "M", "views.meta:MetaView"),
+    # Business Dashboard Views
+    ("revenue", "Revenue", "₹", "views.revenue:RevenueView"),                                   # BD-1.0
+    ("users", "Users", "U", "views.users:UsersView"),                                           # BD-2.0
+    ("consultations", "Consultations", "C", "views.consultations:ConsultationsView"),           # BD-3.0
+    ("payments", "Payments", "P", "views.payments:PaymentsView"),                               # BD-4.0
+    ("meta-campaigns", "Meta Campaigns", "M", "views.meta_campaigns:MetaCampaignsView"),        # BD-6.0
+    ("meta-totals", "Meta Totals", "T", "views.meta_totals:MetaTotalsView"),                    # BD-7.0
+    ("astro-perf", "Astrologer Performance", "A",
+     "views.astrologer_performance:AstrologerPerformanceView"),                                 # BD-8.0
+    ("astro-avail", "Astrologer Availability", "V",
+     "views.astrologer_availability:AstrologerAvailabilityView"),                               # BD-9.0
+    ("guides", "Guides", "G", "views.guides:GuidesView"),                                       # Guides Dashboard
+    ("guide_performance", "Guide Performance", "P",
+     "views.guide_performance:GuidePerformanceView"),                  # Guide Performance (Repeat/Leakage)
+    ("query-profiler", "Query Profiler", "Q", "views.query_profiler:QueryProfilerView"),        # Query latency
+]
+for entry in VIEWS:
+    ViewRegistry.register_lazy(*entry)
 
 
 # --- Modal Screens ---
@@ -69,7 +67,7 @@ class ViewSelectorScreen(ModalScreen):
     ]
 
     def compose(self) -> ComposeResult:
-        self.views = ViewRegistry.all()
+        self.views = ViewRegistry.entries()
         with Container(id="dialog"):
             yield Static("Select View", id="title")
             yield DataTable(id="view-table")
@@ -165,10 +163,15 @@ def scan_csv_files() -> list:
     return files[:20]
 
 
-def build_container(cfg: ContainerConfig) -> Container:
-    """Build a container from config."""
-    container = Container(id=cfg.id)
-    return container
+def build_view(view: BaseView) -> Container:
+    """Build a view's container tree with its tables set up."""
+    sections = []
+    for cfg in view.get_containers():
+        tables = [DataTable(id=tbl.id) for tbl in cfg.tables]
+        for table, tbl in zip(tables, cfg.tables):
+            setup_table(table, tbl.columns, tbl.cursor)
+        sections.append(Container(Static(cfg.header, classes="section-header"), *tables, id=cfg.id))
+    return Container(*sections, id=f"view-{view.view_id}")
 
 
 def setup_table(table: DataTable, columns: list, cursor: bool = False) -> None:
@@ -179,17 +182,74 @@ def setup_table(table: DataTable, columns: list, cursor: bool = False) -> None:
         table.cursor_type = "row"
 
 
-def update_table(table: DataTable, rows: list, columns: list = None) -> None:
-    """Update table with new rows, optionally updating columns."""
-    table.clear()
-    if columns:
-        # Clear existing columns - table.columns returns ColumnKey objects directly
-        col_keys = list(table.columns)
-        for key in col_keys:
-            table.remove_column(key)
+def update_table(table: DataTable, rows: list, columns: list = None, keys: list = None) -> None:
+    """Update table in place, touching only changed cells and rows.
+
+    Rows are matched by key (e.g. guide id); without keys, by position.
+    Cursor and scroll position survive the update. Needs textual>=0.47.
+    """
+    cursor_key = _cursor_row_key(table)
+    scroll_x, scroll_y = table.scroll_x, table.scroll_y
+    if columns and [str(c.label) for c in table.columns.values()] != list(columns):
+        table.clear(columns=True)
         table.add_columns(*columns)
-    for row in rows:
-        table.add_row(*row)
+    keys = _row_keys(rows, keys)
+    _sync_rows(table, rows, keys)
+    _restore_cursor(table, cursor_key)
+    table.scroll_to(scroll_x, scroll_y, animate=False)
+
+
+def _row_keys(rows: list, keys: list = None) -> list:
+    """Use given keys if unique, else fall back to row positions."""
+    if keys is not None:
+        keys = [str(k) for k in keys]
+        if len(keys) == len(rows) and len(set(keys)) == len(keys):
+            return keys
+    return [str(i) for i in range(len(rows))]
+
+
+def _sync_rows(table: DataTable, rows: list, keys: list) -> None:
+    """Remove stale rows, update changed cells, add new rows, then reorder."""
+    wanted = set(keys)
+    for row_key in [k for k in table.rows if k.value not in wanted]:
+        table.remove_row(row_key)
+    col_keys = list(table.columns)
+    for key, row in zip(keys, rows):
+        if key in table.rows:
+            _update_row(table, key, col_keys, row)
+        else:
+            table.add_row(*row, key=key)
+    if [row.key.value for row in table.ordered_rows] != keys:
+        _reorder_rows(table, rows)
+
+
+def _reorder_rows(table: DataTable, rows: list) -> None:
+    """Sort rows into the given order (rows with equal cells are interchangeable)."""
+    order = {tuple(map(str, row)): i for i, row in enumerate(rows)}
+    table.sort(key=lambda values: order.get(tuple(map(str, values)), len(rows)))
+
+
+def _update_row(table: DataTable, key: str, col_keys: list, row: tuple) -> None:
+    """Update only the cells whose value changed."""
+    for col_key, old, new in zip(col_keys, table.get_row(key), row):
+        if old != new:
+            table.update_cell(key, col_key, new)
+
+
+def _cursor_row_key(table: DataTable) -> Optional[str]:
+    """Key of the row under the cursor, if any."""
+    if table.row_count == 0 or table.cursor_type == "none":
+        return None
+    try:
+        return table.coordinate_to_cell_key(table.cursor_coordinate).row_key.value
+    except Exception:
+        return None
+
+
+def _restore_cursor(table: DataTable, key: Optional[str]) -> None:
+    """Put the cursor back on the same row if it still exists."""
+    if key is not None and key in table.rows:
+        table.move_cursor(row=table.get_row_index(key), animate=False)
 
 
 # --- Main App ---
@@ -198,7 +258,6 @@ class Dashboard(App):
     """Main dashboard app using view framework."""
 
     CSS = DASHBOARD_CSS
-    REFRESH_SECONDS = 30
 
     BINDINGS = [
         ("q", "quit", "Quit"),
@@ -208,75 +267,85 @@ class Dashboard(App):
         ("l", "load_csv", "Load CSV"),
         ("n", "next_page", "Next"),
         ("p", "prev_page", "Prev"),
+        ("t", "refresh_stats", "Timings"),
     ]
 
     def __init__(self):
         super().__init__()
         self.current_view_id = "wallet"
+        self.mounted_views = {self.current_view_id}  # views are built on first show
         self.view_data = {}
-        self.page = 1
+        self.page_cursors = [None]  # keyset cursor per visited wallet page
         self.per_page = 100
         self.csv_path = None
-        self.timer_ticks = 0
-        self.total_ticks = int(self.REFRESH_SECONDS / 0.1)
+        self.scheduler = RefreshScheduler()  # per-view cadence, see refresh_scheduler
         self.date_range: DateRange = today()
+        self.prefetcher = PrefetchScheduler(self._fetch_kwargs) if PREFETCH_ENABLED else None
+        self._fetching = False
+        self._shown_errors: dict = {}  # view_id -> errors already toasted
 
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
         with Container(id="filter-container"):
             yield Static(f"📅 {self.date_range}", id="date-range-label")
         with Container(id="timer-container"):
-            yield Static(f"Auto-refresh: {self.REFRESH_SECONDS}s", id="timer-label")
-            yield ProgressBar(total=self.total_ticks, show_eta=False, id="timer-bar")
-        for view in ViewRegistry.all():
-            hidden = "hidden" if view.view_id != self.current_view_id else ""
-            with Container(id=f"view-{view.view_id}", classes=hidden):
-                for cfg in view.get_containers():
-                    with Container(id=cfg.id):
-                        yield Static(cfg.header, classes="section-header")
-                        for tbl in cfg.tables:
-                            yield DataTable(id=tbl.id)
+            yield Static(f"Auto-refresh: {REFRESH_SECONDS}s", id="timer-label")
+            yield ProgressBar(total=100, show_eta=False, id="timer-bar")
+        yield build_view(ViewRegistry.get(self.current_view_id))
         yield Static("Last updated: Never", id="last-update")
         yield Footer()
 
     def on_mount(self) -> None:
-        for view in ViewRegistry.all():
-            for cfg in view.get_containers():
-                for tbl in cfg.tables:
-                    table = self.query_one(f"#{tbl.id}", DataTable)
-                    setup_table(table, tbl.columns, tbl.cursor)
         self.fetch_data()
-        self.set_interval(0.1, self._tick)
+        self.set_interval(REFRESH_FRAME_SECONDS, self._tick)
+        if self.prefetcher:
+            self.set_interval(1, self._prefetch_tick)
+
+    def on_unmount(self) -> None:
+        if self.prefetcher:
+            self.prefetcher.shutdown()
+        close_pool()
 
     def _tick(self) -> None:
-        self.timer_ticks += 1
-        bar = self.query_one("#timer-bar", ProgressBar)
-        bar.progress = self.timer_ticks
-        if self.timer_ticks % 10 == 0:
-            secs = self.REFRESH_SECONDS - int(self.timer_ticks * 0.1)
-            self.query_one("#timer-label", Static).update(f"Auto-refresh: {secs}s")
-        if self.timer_ticks >= self.total_ticks:
-            self._reset_timer()
+        view_id = self.current_view_id
+        self.query_one("#timer-bar", ProgressBar).progress = 100 * self.scheduler.progress(view_id)
+        self.query_one("#timer-label", Static).update(self.scheduler.label(view_id))
+        if not self._fetching and self.scheduler.due(view_id):
             self.fetch_data()
 
-    def _reset_timer(self) -> None:
-        self.timer_ticks = 0
-        self.query_one("#timer-bar", ProgressBar).progress = 0
-        self.query_one("#timer-label", Static).update(f"Auto-refresh: {self.REFRESH_SECONDS}s")
+    def _prefetch_tick(self) -> None:
+        self.prefetcher.tick(self.current_view_id, foreground_busy=self._fetching)
 
     def fetch_data(self) -> None:
+        self._fetching = True
         self.run_worker(self._fetch_worker, thread=True, exclusive=True)
 
-    def _fetch_worker(self) -> dict:
-        view = ViewRegistry.get(self.current_view_id)
+    def _fetch_kwargs(self, view_id: str) -> dict:
+        if view_id == "wallet":
+            return {'per_page': self.per_page, 'cursor': self.page_cursors[-1]}
+        elif view_id == "meta":
+            return {'csv_path': self.csv_path}
         start, end = self.date_range.as_tuple()
-        if self.current_view_id == "wallet":
-            return view.fetch_data(page=self.page, per_page=self.per_page)
-        elif self.current_view_id == "meta":
-            return view.fetch_data(csv_path=self.csv_path)
-        return view.fetch_data(start_date=start, end_date=end)
+        return {'start_date': start, 'end_date': end}
+
+    def _fetch_worker(self) -> dict:
+        view_id = self.current_view_id
+        kwargs = self._fetch_kwargs(view_id)
+        view = ViewRegistry.get(view_id)
+        self.scheduler.register(view_id, view.refresh_seconds)
+        self.scheduler.check_lag(execute_query)
+        started = time.monotonic()
+        try:
+            data = view.fetch_data(**kwargs)
+        finally:
+            self.scheduler.record(view_id, time.monotonic() - started)
+        if self.prefetcher:
+            self.prefetcher.put(view_id, kwargs, data)
+        return data
 
     def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
+        if event.state in (WorkerState.SUCCESS, WorkerState.ERROR, WorkerState.CANCELLED):
+            self._fetching = False
         if event.state == WorkerState.SUCCESS:
             self.view_data = event.worker.result
             self._update_display()
@@ -288,30 +357,69 @@ class Dashboard(App):
         dynamic_cols = {}
         if hasattr(view, 'get_dynamic_columns'):
             dynamic_cols = view.get_dynamic_columns(self.view_data)
+        # Stable row keys (e.g. guide id) let tables update in place
+        row_keys = {}
+        if hasattr(view, 'get_row_keys'):
+            row_keys = view.get_row_keys(self.view_data)
         for table_id, table_rows in rows.items():
             table = self.query_one(f"#{table_id}", DataTable)
             columns = dynamic_cols.get(table_id)
-            update_table(table, table_rows, columns)
+            update_table(table, table_rows, columns, row_keys.get(table_id))
         self.query_one("#last-update", Static).update(
-            f"Last updated: {datetime.now().strftime('%H:%M:%S')}"
+            f"Last updated: {datetime.now().strftime('%H:%M:%S')}{self._page_info()}"
         )
-
-    def _switch_to_view(self, view_id: str) -> None:
+        self._notify_fetch_errors(self.view_data.get('_errors'))
+
+    def _page_info(self) -> str:
+        if 'total_txns' not in self.view_data:
+            return ""
+        pages = max(1, -(-self.view_data['total_txns'] // self.per_page))
+        return f" | Page {len(self.page_cursors)} of ~{pages:,}"
+
+    def _notify_fetch_errors(self, errors: Optional[dict]) -> None:
+        """Toast only errors that changed since the view's previous fetch."""
+        errors = dict(errors or {})
+        shown = self._shown_errors.get(self.current_view_id, {})
+        self._shown_errors[self.current_view_id] = errors
+        for key, message in errors.items():
+            if shown.get(key) == message:
+                continue
+            self.notify(f"{key}: {message}", title="Fetch failed", severity="warning")
+
+    async def _switch_to_view(self, view_id: str) -> None:
         if view_id == self.current_view_id:
             return
         self.query_one(f"#view-{self.current_view_id}").add_class("hidden")
-        self.query_one(f"#view-{view_id}").remove_class("hidden")
+        await self._show_view(view_id)
         self.current_view_id = view_id
+        self._show_prefetched(view_id)
         self.fetch_data()
 
+    async def _show_view(self, view_id: str) -> None:
+        if view_id in self.mounted_views:
+            self.query_one(f"#view-{view_id}").remove_class("hidden")
+        else:
+            await self.mount(build_view(ViewRegistry.get(view_id)), before="#last-update")
+            self.mounted_views.add(view_id)
+
+    def _show_prefetched(self, view_id: str) -> None:
+        if not self.prefetcher:
+            return
+        data = self.prefetcher.get(view_id, self._fetch_kwargs(view_id))
+        if data is not None:
+            self.view_data = data
+            self._update_display()
+
     def action_refresh(self) -> None:
-        self._reset_timer()
         self.fetch_data()
 
+    def action_refresh_stats(self) -> None:
+        self.notify(format_stats(self.scheduler.stats()), title="Refresh timings")
+
     def action_switch_view(self) -> None:
-        def handle(view_id: Optional[str]) -> None:
+        async def handle(view_id: Optional[str]) -> None:
             if view_id:
-                self._switch_to_view(view_id)
+                await self._switch_to_view(view_id)
         self.push_screen(ViewSelectorScreen(), handle)
 
     def action_date_filter(self) -> None:
@@ -319,24 +427,25 @@ class Dashboard(App):
             if result:
                 self.date_range = result
                 self.query_one("#date-range-label", Static).update(f"📅 {self.date_range}")
-                self._reset_timer()
                 self.fetch_data()
         self.push_screen(DateRangeSelector(self.date_range), handle)
 
     def action_load_csv(self) -> None:
-        def handle(path: Optional[str]) -> None:
+        async def handle(path: Optional[str]) -> None:
             if path:
                 self.csv_path = path
-                self._switch_to_view("meta")
+                await self._switch_to_view("meta")
         self.push_screen(FilePickerScreen(), handle)
 
     def action_next_page(self) -> None:
-        self.page += 1
-        self.fetch_data()
+        cursor = self.view_data.get('next_cursor')
+        if cursor:
+            self.page_cursors.append(cursor)
+            self.fetch_data()
 
     def action_prev_page(self) -> None:
-        if self.page > 1:
-            self.page -= 1
+        if len(self.page_cursors) > 1:
+            self.page_cursors.pop()
             self.fetch_data()
 
 
@@ -0,0 +1,248 @@
+"""
+Availability Sessions - guide availability intervals kept in a local SQLite store.
+
+guide_profile availability changes are read from audit.logged_actions past a
+watermark and stored as transitions; each guide's (start, end, state)
+intervals are rebuilt from its earliest new transition onward. Online
+minutes, days active and the live-now count for any range are then interval
+arithmetic: sessions still open, or begun before the range, are clipped to
+it rather than dropped.
+
+The first refresh seeds AVAILABILITY_BACKFILL_DAYS back: every guide starts
+in the state it left on its first change in that window, or in its current
+state if it had none. action_tstamp is the writing transaction's start time,
+so rows can commit slightly out of order; each refresh re-reads
+AVAILABILITY_OVERLAP seconds behind the watermark and ignores duplicates.
+
+Postgres is reached through fetch(query, params) -> rows, e.g.
+db.execute_query in the app or guide_identity.cursor_fetch(cursor) in scripts.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable
+
+from query_builder import IST_OFFSET
+
+AVAILABILITY_DB = os.getenv('AVAILABILITY_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            '.availability.db'))
+AVAILABILITY_BACKFILL_DAYS = int(os.getenv('AVAILABILITY_BACKFILL_DAYS', 90))
+AVAILABILITY_OVERLAP = int(os.getenv('AVAILABILITY_OVERLAP', 300))           # seconds
+AVAILABILITY_REFRESH_TTL = int(os.getenv('AVAILABILITY_REFRESH_TTL', 10))    # seconds
+
+ONLINE = 'ONLINE_AVAILABLE'
+DAY = 86400
+IST_SECONDS = IST_OFFSET.total_seconds()
+
+_lock = threading.Lock()
+_conn = None
+_refreshed_at = float('-inf')
+
+# (guide_id, full_name, epoch, from_state, to_state); a soft or hard delete is a move to DELETED
+CHANGES_QUERY = """
+SELECT
+    (COALESCE(new_data, original_data)->>'id')::bigint,
+    COALESCE(new_data, original_data)->>'full_name',
+    EXTRACT(EPOCH FROM action_tstamp)::float8,
+    CASE WHEN original_data IS NULL THEN NULL
+         WHEN original_data->>'deleted_at' IS NOT NULL THEN 'DELETED'
+         ELSE original_data->>'availability_state' END,
+    CASE WHEN new_data IS NULL OR new_data->>'deleted_at' IS NOT NULL THEN 'DELETED'
+         ELSE new_data->>'availability_state' END
+FROM audit.logged_actions
+WHERE schema_name = 'guide'
+  AND table_name = 'guide_profile'
+  AND action_tstamp >= TO_TIMESTAMP(%s)
+  AND (original_data->>'availability_state' IS DISTINCT FROM new_data->>'availability_state'
+       OR original_data->>'deleted_at' IS DISTINCT FROM new_data->>'deleted_at')
+ORDER BY action_tstamp
+"""
+
+CURRENT_STATE_QUERY = """
+SELECT id, full_name, CASE WHEN deleted_at IS NOT NULL THEN 'DELETED' ELSE availability_state END
+FROM guide.guide_profile
+"""
+
+
+# --- Local store ---
+
+def _db() -> sqlite3.Connection:
+    """Open (and create) the local session store."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(AVAILABILITY_DB, check_same_thread=False, timeout=30)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.executescript(
+            "CREATE TABLE IF NOT EXISTS transitions (guide_id INTEGER NOT NULL, at REAL NOT NULL, "
+            "from_state TEXT, to_state TEXT NOT NULL, seeded INTEGER NOT NULL, "
+            "PRIMARY KEY (guide_id, at, to_state));"
+            "CREATE TABLE IF NOT EXISTS intervals (guide_id INTEGER NOT NULL, start_at REAL NOT NULL, "
+            "end_at REAL, state TEXT NOT NULL, PRIMARY KEY (guide_id, start_at));"
+            "CREATE INDEX IF NOT EXISTS intervals_state ON intervals (state, start_at);"
+            "CREATE TABLE IF NOT EXISTS guides (guide_id INTEGER PRIMARY KEY, full_name TEXT);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL);")
+    return _conn
+
+
+def _watermark():
+    """Latest action_tstamp consumed (epoch), or None before the first refresh."""
+    row = _db().execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+    return row[0] if row else None
+
+
+def _seed_rows(fetch: Callable, start: float, changes: list) -> list:
+    """State of every guide at start: what its first change left, else its current state."""
+    first_from = {}
+    for guide_id, _, _, from_state, _ in changes:
+        first_from.setdefault(guide_id, from_state)
+    current = {guide_id: (name, state) for guide_id, name, state in fetch(CURRENT_STATE_QUERY)}
+    seeds = [(gid, name, start, None, first_from.get(gid, state)) for gid, (name, state) in current.items()]
+    seeds += [(gid, None, start, None, state) for gid, state in first_from.items() if gid not in current]
+    return [s for s in seeds if s[4] is not None]
+
+
+def _insert(rows: list, seeded: int) -> dict:
+    """Store new transitions; returns {guide_id: earliest newly stored epoch}."""
+    earliest = {}
+    for guide_id, _, at, from_state, to_state in rows:
+        if to_state is None:
+            continue
+        cur = _db().execute("INSERT OR IGNORE INTO transitions VALUES (?, ?, ?, ?, ?)",
+                            (guide_id, at, from_state, to_state, seeded))
+        if cur.rowcount:
+            earliest[guide_id] = min(earliest.get(guide_id, at), at)
+    _db().executemany("INSERT OR REPLACE INTO guides VALUES (?, ?)",
+                      [(r[0], r[1]) for r in rows if r[1] is not None])
+    return earliest
+
+
+def _rebuild(guide_id: int, since: float) -> None:
+    """Recompute a guide's intervals from the last one starting before since."""
+    row = _db().execute("SELECT MAX(start_at) FROM intervals WHERE guide_id = ? AND start_at < ?",
+                        (guide_id, since)).fetchone()
+    since = row[0] if row[0] is not None else since
+    _db().execute("DELETE FROM intervals WHERE guide_id = ? AND start_at >= ?", (guide_id, since))
+    events = _db().execute("SELECT at, to_state FROM transitions WHERE guide_id = ? AND at >= ? "
+                           "ORDER BY at", (guide_id, since)).fetchall()
+    ends = [at for at, _ in events[1:]] + [None]
+    _db().executemany("INSERT OR REPLACE INTO intervals VALUES (?, ?, ?, ?)",
+                      [(guide_id, at, end, state) for (at, state), end in zip(events, ends)])
+
+
+def refresh(fetch: Callable, force: bool = False) -> int:
+    """Consume audit rows past the watermark; returns how many guides' intervals changed."""
+    global _refreshed_at
+    with _lock:
+        if not force and time.monotonic() - _refreshed_at < AVAILABILITY_REFRESH_TTL:
+            return 0
+        watermark = _watermark()
+        since = watermark - AVAILABILITY_OVERLAP if watermark is not None else \
+            time.time() - AVAILABILITY_BACKFILL_DAYS * DAY
+        changes = [tuple(r) for r in fetch(CHANGES_QUERY, (since,))]
+        with _db():
+            earliest = _insert(_seed_rows(fetch, since, changes), 1) if watermark is None else {}
+            for guide_id, at in _insert(changes, 0).items():
+                earliest[guide_id] = min(earliest.get(guide_id, at), at)
+            for guide_id, at in earliest.items():
+                _rebuild(guide_id, at)
+            latest = max([since if watermark is None else watermark] + [c[2] for c in changes])
+            _db().execute("INSERT OR REPLACE INTO meta VALUES ('watermark', ?)", (latest,))
+        _refreshed_at = time.monotonic()
+        return len(earliest)
+
+
+def reset() -> None:
+    """Drop everything stored; the next refresh backfills again."""
+    global _refreshed_at
+    with _lock, _db():
+        for table in ('transitions', 'intervals', 'guides', 'meta'):
+            _db().execute(f"DELETE FROM {table}")
+        _refreshed_at = float('-inf')
+
+
+# --- Interval arithmetic ---
+
+def ist_day(epoch: float) -> int:
+    """Day number of an epoch in IST."""
+    return int((epoch + IST_SECONDS) // DAY)
+
+
+def ist_date(epoch: float) -> date:
+    """Calendar date of an epoch in IST."""
+    return (datetime.fromtimestamp(epoch, timezone.utc) + IST_OFFSET).date()
+
+
+def ist_range(start: date, end: date) -> tuple:
+    """Epoch bounds [lo, hi) of IST days start..end."""
+    lo = datetime.combine(start, datetime.min.time(), timezone.utc) - IST_OFFSET
+    hi = datetime.combine(end + timedelta(days=1), datetime.min.time(), timezone.utc) - IST_OFFSET
+    return lo.timestamp(), hi.timestamp()
+
+
+def _clipped(lo: float, hi: float, state: str = ONLINE) -> list:
+    """(guide_id, start, end) of state intervals overlapping [lo, hi), clipped; open ones end now."""
+    now = time.time()
+    with _lock:
+        return _db().execute(
+            "SELECT guide_id, MAX(start_at, ?), MIN(COALESCE(end_at, ?), ?) FROM intervals "
+            "WHERE state = ? AND start_at < ? AND COALESCE(end_at, ?) > ?",
+            (lo, now, hi, state, hi, now, lo)).fetchall()
+
+
+def _names() -> dict:
+    """{guide_id: latest full_name}."""
+    with _lock:
+        return dict(_db().execute("SELECT guide_id, full_name FROM guides").fetchall())
+
+
+def online_time(fetch: Callable, start: date, end: date) -> list:
+    """(name, first online day, last online day, minutes) per guide over IST days start..end."""
+    refresh(fetch)
+    totals = defaultdict(lambda: [float('inf'), float('-inf'), 0.0])
+    for guide_id, s, e in _clipped(*ist_range(start, end)):
+        t = totals[guide_id]
+        t[0], t[1], t[2] = min(t[0], s), max(t[1], e), t[2] + e - s
+    names = _names()
+    rows = [(names.get(gid), ist_date(first), ist_date(last), round(seconds / 60))
+            for gid, (first, last, seconds) in totals.items()]
+    return sorted(rows, key=lambda r: r[3], reverse=True)
+
+
+def online_days(lo: float, hi: float) -> dict:
+    """{guide_id: IST days with any online time in [lo, hi)}."""
+    days = defaultdict(set)
+    for guide_id, s, e in _clipped(lo, hi):
+        if e > s:
+            days[guide_id].update(range(ist_day(s), ist_day(e - 1e-3) + 1))
+    return {guide_id: len(d) for guide_id, d in days.items()}
+
+
+def days_active(fetch: Callable, days: int = 30) -> dict:
+    """{guide_id: IST days online in the last `days` days}."""
+    refresh(fetch)
+    now = time.time()
+    return online_days(now - days * DAY, now)
+
+
+def live_count(fetch: Callable) -> int:
+    """Guides whose current (open) interval is ONLINE_AVAILABLE."""
+    refresh(fetch)
+    with _lock:
+        return _db().execute("SELECT COUNT(*) FROM intervals WHERE end_at IS NULL AND state = ?",
+                             (ONLINE,)).fetchone()[0]
+
+
+def guide_activity(fetch: Callable, days: int = 30) -> list:
+    """Guide activity dicts (guide_id, days_active, state_changes_30d, last_activity) for Neo4j."""
+    active = days_active(fetch, days)
+    with _lock:
+        changes = _db().execute(
+            "SELECT guide_id, COUNT(*), MAX(at) FROM transitions WHERE seeded = 0 AND at >= ? "
+            "GROUP BY guide_id", (time.time() - days * DAY,)).fetchall()
+    return [{'guide_id': guide_id, 'days_active': active.get(guide_id, 0), 'state_changes_30d': count,
+             'last_activity': datetime.fromtimestamp(last, timezone.utc)}
+            for guide_id, count, last in changes]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: import time of each entry point against a budget.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter per
+sample and reports the best cumulative time, so the numbers are comparable
+between runs on the same box. Also fails if an entry point pulls in an
+optional heavy dependency (boto3, neo4j) at import time; those belong
+inside the functions that use them.
+
+With app in --modules it also starts the dashboard headless against an
+unreachable database, lets the foreground fetch fail and a few prefetch
+ticks pass, and fails if any view module other than the shown one was
+imported: views load only when shown or explicitly prefetched.
+
+Usage: python bench_startup.py [--modules app gdbrd] [--samples 5] [--top 10]
+Exits 1 when a module is over budget, imports a lazy dependency eagerly,
+or the dashboard imports a view it has not shown.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+# Entry point -> budget in ms (cumulative import time, best of --samples)
+STARTUP_BUDGETS = {
+    'app': 400,
+    'wallet_dashboard': 350,
+    'gdbrd': 350,
+    'guides_dashboard': 350,
+    'neo4j_sync': 80,
+    'get_rankings': 100,
+    'get_rankings_pg': 100,
+    'ranking_engine': 250,
+}
+LAZY_DEPS = ('boto3', 'botocore', 'neo4j')
+
+# Headless dashboard run; prints the lazy view modules imported but never shown
+LAZY_VIEWS_CHECK = """
+import asyncio, sys
+import app
+from views.registry import ViewRegistry
+
+async def run():
+    dashboard = app.Dashboard()
+    async with dashboard.run_test() as pilot:
+        while dashboard._fetching:
+            await pilot.pause(0.2)
+        await pilot.pause(2.5)
+        shown = {dashboard.current_view_id}
+    targets = {e.target.partition(':')[0] for e in ViewRegistry.entries() if e.view_id not in shown}
+    print(' '.join(sorted(targets & set(sys.modules))))
+
+asyncio.run(run())
+"""
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def importtime(module: str) -> list:
+    """(self_us, cumulative_us, depth, name) per import, in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=Path(__file__).parent, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    rows = [LINE.match(line) for line in proc.stderr.splitlines()]
+    return [(int(m[1]), int(m[2]), len(m[3]) // 2, m[4]) for m in rows if m]
+
+
+def measure(module: str, samples: int) -> tuple:
+    """(best cumulative ms, rows of the best sample)."""
+    best = None
+    for _ in range(samples):
+        rows = importtime(module)
+        total = next(cum for _, cum, _, name in reversed(rows) if name == module) / 1000
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best
+
+
+def eager_deps(rows: list) -> list:
+    """Lazy dependencies imported at startup."""
+    return sorted({name.split('.')[0] for *_, name in rows if name.split('.')[0] in LAZY_DEPS})
+
+
+def eager_views() -> list:
+    """View modules the dashboard imported without showing them."""
+    proc = subprocess.run([sys.executable, "-c", LAZY_VIEWS_CHECK], cwd=Path(__file__).parent,
+                          env=dict(os.environ, DB_ENDPOINT="/nonexistent"), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return proc.stdout.split()
+
+
+def print_top(rows: list, top: int) -> None:
+    """Heaviest direct imports of the entry point."""
+    direct = sorted((r for r in rows if r[2] == 1), key=lambda r: r[1], reverse=True)
+    for _, cum, _, name in direct[:top]:
+        print(f"{'':>20}  {cum / 1000:>11.1f}  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", nargs="+", default=list(STARTUP_BUDGETS))
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="show the N heaviest direct imports")
+    args = parser.parse_args()
+    failed = False
+    print(f"{'Module':>20}  {'Import (ms)':>11}  {'Budget':>7}  Status")
+    for module in args.modules:
+        total, rows = measure(module, args.samples)
+        budget = STARTUP_BUDGETS.get(module)
+        eager = eager_deps(rows)
+        status = "eager: " + ", ".join(eager) if eager else \
+            "OVER" if budget is not None and total > budget else "ok"
+        failed |= status != "ok"
+        print(f"{module:>20}  {total:>11.1f}  {budget if budget is not None else '-':>7}  {status}")
+        if args.top:
+            print_top(rows, args.top)
+    if 'app' in args.modules:
+        eager = eager_views()
+        failed |= bool(eager)
+        print(f"{'lazy views':>20}  {'':>11}  {'':>7}  {'eager: ' + ', '.join(eager) if eager else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: clear-and-rebuild vs keyed in-place update of a DataTable.
+
+Runs headless. Each refresh changes ~5% of cells and prepends a few rows,
+like the guide tables and wallet transaction pages between ticks.
+
+Usage: python bench_update_table.py [--rows 1000 10000] [--refreshes 5]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from textual.app import App, ComposeResult
+from textual.widgets import DataTable
+
+from app import update_table
+
+COLUMNS = ["ID", "Name", "Sess", "Chat", "Voice", "Rs/m", "Earn", "PEND", "COMP", "Today"]
+
+
+class BenchApp(App):
+    def compose(self) -> ComposeResult:
+        yield DataTable(id="bench")
+
+
+def make_rows(n: int, start: int = 0) -> list:
+    """Generate n keyed rows."""
+    return [(str(i),) + tuple(f"v{i}-{c}" for c in range(len(COLUMNS) - 1))
+            for i in range(start, start + n)]
+
+
+def mutate(rows: list, step: int) -> list:
+    """Change ~5% of cells, prepend 3 new rows and drop 3 from the end."""
+    rng = random.Random(step)
+    new = [list(r) for r in rows]
+    for _ in range(len(rows) * len(COLUMNS) // 20):
+        row = rng.randrange(len(new))
+        new[row][rng.randrange(1, len(COLUMNS))] = f"x{step}"
+    first = int(new[0][0]) - 3
+    return make_rows(3, first) + [tuple(r) for r in new[:-3]]
+
+
+def rebuild(table: DataTable, rows: list, keys: list = None) -> None:
+    """The previous behaviour: clear and re-add every row."""
+    table.clear()
+    for row in rows:
+        table.add_row(*row)
+
+
+async def run(strategy, n: int, refreshes: int) -> float:
+    """Average seconds per refresh, including the repaint."""
+    app = BenchApp()
+    async with app.run_test(size=(160, 50)) as pilot:
+        table = app.query_one("#bench", DataTable)
+        table.add_columns(*COLUMNS)
+        rows = make_rows(n, 10 * n)
+        strategy(table, rows, keys=[r[0] for r in rows])
+        await pilot.pause()
+        total = 0.0
+        for step in range(refreshes):
+            rows = mutate(rows, step)
+            t0 = time.perf_counter()
+            strategy(table, rows, keys=[r[0] for r in rows])
+            await pilot.pause()
+            total += time.perf_counter() - t0
+        return total / refreshes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--refreshes", type=int, default=5)
+    args = parser.parse_args()
+    print(f"{'Rows':>8}  {'Rebuild (ms)':>13}  {'Keyed (ms)':>11}  {'Speedup':>8}")
+    for n in args.rows:
+        old = asyncio.run(run(rebuild, n, args.refreshes))
+        new = asyncio.run(run(update_table, n, args.refreshes))
+        print(f"{n:>8}  {old * 1000:>13.1f}  {new * 1000:>11.1f}  {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,8 @@
 Data Fetching Functions for AstroKiran Dashboard
 """
 
-import psycopg2
-from utils import DB_CONFIG, get_rds_cloudwatch_metrics
+from db import execute_query, execute_single, execute_scalar, prefetch_query
+from utils import get_rds_cloudwatch_metrics, get_rds_metric_trends
 from queries import (
     DAILY_RECHARGE_QUERY,
     KPI_QUERY,
@@ -11,12 +11,53 @@ from queries import (
     REPLICATION_STATUS_QUERY,
     ALL_USERS_COUNT_QUERY,
     ALL_USERS_COMPLETE_QUERY,
+    ALL_USERS_BEFORE_QUERY,
 )
 
 
-def fetch_all_dashboard_data(current_page: int, items_per_page: int) -> dict:
+# A users page is (backward, cursor): the page after cursor, or with
+# backward=True the page before it. (False, None) is the first page and
+# (True, None) the last.
+FIRST_USERS_PAGE = (False, None)
+LAST_USERS_PAGE = (True, None)
+
+
+def users_page_params(cursor: tuple, limit: int) -> dict:
+    """Keyset params for the ALL_USERS page queries; cursor None = from either end."""
+    last_activity, user_id = cursor or (None, None)
+    return {
+        'first_page': cursor is None,
+        'last_activity': last_activity,
+        'user_id': user_id,
+        'limit': limit,
+    }
+
+
+def users_cursor(row: tuple) -> tuple:
+    """Keyset cursor (last_activity, user_id) of a user row."""
+    return (row[9], row[0])
+
+
+def fetch_users_page(page: tuple, limit: int) -> dict:
+    """Users on a page, best first, with the neighbouring pages (None at either end)."""
+    backward, cursor = page
+    query = ALL_USERS_BEFORE_QUERY if backward else ALL_USERS_COMPLETE_QUERY
+    rows = execute_query(query, users_page_params(cursor, limit))
+    if backward:
+        rows = rows[::-1]
+    full = len(rows) == limit
+    more_before, more_after = (full, cursor is not None) if backward else (cursor is not None, full)
+    return {
+        'all_users_data': rows,
+        'prev_page': (True, users_cursor(rows[0])) if rows and more_before else None,
+        'next_page': (False, users_cursor(rows[-1])) if rows and more_after else None,
+    }
+
+
+def fetch_all_dashboard_data(page: tuple, items_per_page: int) -> dict:
     """
     Fetch all dashboard data from database in a single call.
+    `page` is the keyset position of the users page (see FIRST_USERS_PAGE).
     Returns a dict with all the data needed to update the display.
     """
     result = {
@@ -25,45 +66,39 @@ def fetch_all_dashboard_data(current_page: int, items_per_page: int) -> dict:
         'daily_recharge_data': [],
         'total_users': 0,
         'all_users_data': [],
+        'prev_page': None,
+        'next_page': None,
         'replication_status': (False, 0, 0),
         'rds_metrics': None,
+        'rds_trends': {},
         'error': None,
     }
 
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
         # 1. DB Connection and Load Stats
-        cursor.execute(DB_CONNECTIONS_QUERY)
-        result['db_stats'] = cursor.fetchone()
+        result['db_stats'] = execute_single(DB_CONNECTIONS_QUERY)
 
-        # 2. KPIs
-        cursor.execute(KPI_QUERY)
-        result['kpi_data'] = cursor.fetchone()
+        # 2. KPIs (cached, see CACHE_TTLS)
+        result['kpi_data'] = execute_single(KPI_QUERY)
 
         # 3. Daily Recharge Counts (last 7 days)
-        cursor.execute(DAILY_RECHARGE_QUERY)
-        result['daily_recharge_data'] = cursor.fetchall()
+        result['daily_recharge_data'] = execute_query(DAILY_RECHARGE_QUERY)
 
-        # 4. Get total count of users for pagination
-        cursor.execute(ALL_USERS_COUNT_QUERY)
-        result['total_users'] = cursor.fetchone()[0]
+        # 4. Get total count of users for pagination (cached, refreshed in background)
+        result['total_users'] = execute_scalar(ALL_USERS_COUNT_QUERY)
 
-        # 5. All Users with Complete Data (paginated)
-        offset = (current_page - 1) * items_per_page
-        cursor.execute(ALL_USERS_COMPLETE_QUERY, (items_per_page, offset))
-        result['all_users_data'] = cursor.fetchall()
+        # 5. All Users with Complete Data (keyset paginated, next page warmed)
+        result.update(fetch_users_page(page, items_per_page))
+        if result['next_page']:
+            prefetch_query(ALL_USERS_COMPLETE_QUERY, users_page_params(result['next_page'][1], items_per_page))
 
         # 6. Replication Status
-        cursor.execute(REPLICATION_STATUS_QUERY)
-        result['replication_status'] = cursor.fetchone()
-
-        cursor.close()
-        conn.close()
+        result['replication_status'] = execute_single(REPLICATION_STATUS_QUERY)
 
         # 7. Fetch RDS CloudWatch Metrics (if configured)
         result['rds_metrics'] = get_rds_cloudwatch_metrics()
+        if result['rds_metrics']:
+            result['rds_trends'] = get_rds_metric_trends()
 
     except Exception as e:
         result['error'] = str(e)
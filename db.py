@@ -1,12 +1,21 @@
 """
-Database functions - all stateless, under 20 lines each.
+Database functions - under 20 lines each.
+Connections come from a shared, thread-safe keep-alive pool.
+Results of slow, slow-moving queries are served from a TTL cache.
 """
 
 import os
 import time
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from dotenv import load_dotenv
 
+import query_stats
+from query_cache import QueryCache, CACHE_ENABLED
+from queries import CACHE_TTLS
+
 load_dotenv()
 
 DB_CONFIG = {
@@ -20,6 +29,18 @@ DB_CONFIG = {
 MAX_RETRIES = 3
 RETRY_DELAY = 1  # seconds
 
+# Pool sizing (override via env)
+POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+POOL_MAX = int(os.getenv('DB_POOL_MAX', 8))
+POOL_PING_AFTER = int(os.getenv('DB_POOL_PING_AFTER', 30))  # seconds idle before health-check
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(POOL_MAX)
+_last_used = {}
+
+query_cache = QueryCache(CACHE_TTLS if CACHE_ENABLED else {})
+
 
 def get_connection():
     """Create a new database connection with retry logic."""
@@ -33,22 +54,135 @@ def get_connection():
                 raise
 
 
+# --- Connection Pool ---
+
+def get_pool() -> ThreadedConnectionPool:
+    """Return the shared pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ThreadedConnectionPool(POOL_MIN, POOL_MAX, **DB_CONFIG)
+        return _pool
+
+
+def is_healthy(conn) -> bool:
+    """Check a pooled connection; ping only if it sat idle for a while."""
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0) < POOL_PING_AFTER:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        if not conn.autocommit:
+            conn.rollback()  # a fresh connection; leave no transaction open before checkout sets autocommit
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def checkout():
+    """Take a healthy connection from the pool (blocks while pool is exhausted)."""
+    _pool_slots.acquire()
+    try:
+        conn = _healthy_conn(get_pool())
+        conn.autocommit = True
+        return conn
+    except Exception:
+        _pool_slots.release()
+        raise
+
+
+def _healthy_conn(pool: ThreadedConnectionPool):
+    """Get connections until one is healthy, discarding dead ones (e.g. after a replica restart)."""
+    for _ in range(POOL_MAX + 1):
+        conn = pool.getconn()
+        if is_healthy(conn):
+            return conn
+        _last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("no healthy connection after discarding the whole pool")
+
+
+def release(conn, broken: bool = False) -> None:
+    """Return a connection to the pool, discarding it if broken or if the pool is gone."""
+    try:
+        _last_used[id(conn)] = time.monotonic()
+        with _pool_lock:
+            pool = _pool
+        if pool is None or pool.closed:
+            conn.close()  # close_pool() ran while it was checked out; don't build a new pool
+        else:
+            try:
+                pool.putconn(conn, close=broken or bool(conn.closed))
+            except PoolError:  # checked out from a pool that has since been replaced
+                conn.close()
+        if conn.closed:
+            _last_used.pop(id(conn), None)
+    finally:
+        _pool_slots.release()
+
+
+@contextmanager
+def pooled_connection():
+    """Context manager yielding a pooled connection."""
+    conn = checkout()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        release(conn, broken)
+
+
+def close_pool() -> None:
+    """Close every pooled connection (call on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+        _last_used.clear()
+
+
+# --- Query Helpers ---
+
 def execute_query(query: str, params: tuple = None) -> list:
-    """Execute a query and return all results with retry logic."""
+    """Execute a query and return all results, cached per CACHE_TTLS."""
+    started = query_stats.call_started()
+    try:
+        return query_cache.get(query, params, lambda: _execute_uncached(query, params))
+    finally:
+        query_stats.call_finished(query, started, bool(query_cache.ttl_for(query)))
+
+
+def prefetch_query(query: str, params: tuple = None) -> None:
+    """Warm the cache for a query likely to be asked next (e.g. the next page)."""
+    query_cache.warm(query, params, lambda: _execute_uncached(query, params))
+
+
+def _execute_uncached(query: str, params: tuple = None) -> list:
+    """Execute a query against the pool with retry logic, timed into query_stats."""
+    started, wait = time.perf_counter(), 0.0
     for attempt in range(MAX_RETRIES):
         try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(query, params) if params else cursor.execute(query)
-            result = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            return result
-        except psycopg2.OperationalError:
-            if attempt < MAX_RETRIES - 1:
+            asked = time.perf_counter()
+            with pooled_connection() as conn:
+                wait += time.perf_counter() - asked
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params) if params else cursor.execute(query)
+                    rows = cursor.fetchall()
+            query_stats.record(query, time.perf_counter() - started, rows, attempt, wait)
+            return rows
+        except Exception as e:
+            retryable = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if retryable and attempt < MAX_RETRIES - 1:
                 time.sleep(RETRY_DELAY * (attempt + 1))
-            else:
-                raise
+                continue
+            query_stats.record(query, time.perf_counter() - started, None, attempt, wait)
+            raise
 
 
 def execute_single(query: str, params: tuple = None):
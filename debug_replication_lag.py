@@ -5,10 +5,11 @@ Debug high PostgreSQL replication lag on AWS RDS
 
 import os
 import psycopg2
-import boto3
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 
+from rds_metrics import MetricSpec, cloudwatch_client, fetch_series
+
 load_dotenv()
 
 # Database configurations
@@ -20,11 +21,8 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD')
 }
 
-# AWS configurations
-AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
+# AWS configurations (region and credentials are read by rds_metrics.cloudwatch_client)
 RDS_INSTANCE_ID = os.getenv('RDS_INSTANCE_ID')
-AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
-AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 
 def check_rds_metrics():
     """Check RDS CloudWatch metrics for insights"""
@@ -32,16 +30,6 @@ def check_rds_metrics():
     print("1. CHECKING RDS CLOUDWATCH METRICS")
     print("=" * 80)
 
-    cloudwatch = boto3.client(
-        'cloudwatch',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(hours=1)
-
     metrics_to_check = [
         ('ReplicaLag', 'Seconds'),
         ('CPUUtilization', 'Percent'),
@@ -52,35 +40,31 @@ def check_rds_metrics():
         ('ReadIOPS', 'Count/Second'),
         ('WriteIOPS', 'Count/Second'),
     ]
+    # Average and Maximum of every metric in one GetMetricData call
+    specs = [MetricSpec(name, unit, stat) for name, unit in metrics_to_check for stat in ('Average', 'Maximum')]
+    series = fetch_series(cloudwatch_client(), specs, RDS_INSTANCE_ID, minutes=60, period=300)
+    by_stat = {(spec.name, spec.stat): [value for _, value in points] for spec, points in series.items()}
 
     for metric_name, unit in metrics_to_check:
-        response = cloudwatch.get_metric_statistics(
-            Namespace='AWS/RDS',
-            MetricName=metric_name,
-            Dimensions=[{'Name': 'DBInstanceIdentifier', 'Value': RDS_INSTANCE_ID}],
-            StartTime=start_time,
-            EndTime=end_time,
-            Period=300,  # 5 minutes
-            Statistics=['Average', 'Maximum', 'Minimum']
-        )
-
-        if response['Datapoints']:
-            datapoints = sorted(response['Datapoints'], key=lambda x: x['Timestamp'])
-            latest = datapoints[-1]
-            avg = sum(dp['Average'] for dp in datapoints) / len(datapoints)
-            max_val = max(dp['Maximum'] for dp in datapoints)
+        averages = by_stat[(metric_name, 'Average')]
+        maximums = by_stat[(metric_name, 'Maximum')]
+
+        if averages:
+            latest = averages[-1]
+            avg = sum(averages) / len(averages)
+            max_val = max(maximums or averages)
 
             print(f"\n{metric_name}:")
-            print(f"  Latest: {latest['Average']:.2f} {unit}")
+            print(f"  Latest: {latest:.2f} {unit}")
             print(f"  Avg (1h): {avg:.2f} {unit}")
             print(f"  Max (1h): {max_val:.2f} {unit}")
 
             # Highlight issues
-            if metric_name == 'ReplicaLag' and latest['Average'] > 10:
+            if metric_name == 'ReplicaLag' and latest > 10:
                 print(f"  ⚠️  HIGH REPLICATION LAG DETECTED!")
-            if metric_name == 'CPUUtilization' and latest['Average'] > 80:
+            if metric_name == 'CPUUtilization' and latest > 80:
                 print(f"  ⚠️  HIGH CPU USAGE!")
-            if metric_name in ['ReadLatency', 'WriteLatency'] and latest['Average'] > 0.01:
+            if metric_name in ['ReadLatency', 'WriteLatency'] and latest > 0.01:
                 print(f"  ⚠️  HIGH DISK LATENCY!")
         else:
             print(f"\n{metric_name}: No data available")
@@ -83,16 +83,30 @@ def format_daily_recharge_rows(daily_recharge_data):
     return counts_row, amounts_row
 
 
-def format_rds_metrics_row1(rds_metrics):
-    """Format RDS performance metrics (CPU, Memory, IOPS)."""
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values, width=12):
+    """Unicode sparkline of the last `width` values."""
+    values = list(values)[-width:]
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return "".join(SPARK_CHARS[int((v - low) / span * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+def format_rds_metrics_row1(rds_metrics, trends=None):
+    """Format RDS performance metrics (CPU, Memory, IOPS), CPU with its recent trend."""
     cpu = rds_metrics.get('CPUUtilization', 0)
+    cpu_trend = sparkline((trends or {}).get('CPUUtilization', ()))
     mem_bytes = rds_metrics.get('FreeableMemory', 0)
     mem_gb = mem_bytes / (1024**3)
     read_iops = rds_metrics.get('ReadIOPS', 0)
     write_iops = rds_metrics.get('WriteIOPS', 0)
 
     return (
-        f"  {cpu:.1f}%  ",
+        f"  {cpu:.1f}% {cpu_trend}  ",
         f"  {mem_gb:.2f}  ",
         f"  {read_iops:.0f}  ",
         f"  {write_iops:.0f}  "
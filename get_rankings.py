@@ -8,7 +8,8 @@ Activity multiplier penalty: <5d=0.5x, 5-10d=0.75x, 10-15d=0.9x, 15+d=1.0x
 import os
 import psycopg2
 from dotenv import load_dotenv
-from neo4j import GraphDatabase
+
+from ranking_writer import HistoryColumn, copy_history, write_rankings
 
 load_dotenv()
 
@@ -204,6 +205,7 @@ ORDER BY ranking DESC
 
 def get_rankings():
     """Fetch rankings from Neo4j."""
+    from neo4j import GraphDatabase
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
 
     with driver.session() as session:
@@ -244,78 +246,46 @@ def print_sql(rankings):
     print(f"WHERE id IN ({', '.join(ids)});")
 
 
+HISTORY_COLUMNS = [
+    HistoryColumn('guide_id', 'id'),
+    HistoryColumn('ranking_score', 'ranking', 2),
+    HistoryColumn('activity_multiplier', 'activity_multiplier', 2, default=1.0),
+    HistoryColumn('repeat_score', 'repeat_score', 3),
+    HistoryColumn('aov_score', 'aov_score', 3),
+    HistoryColumn('volume_score', 'volume_score', 3),
+    HistoryColumn('activity_score', 'activity_score', 3),
+    HistoryColumn('rating_score', 'rating_score', 3),
+    HistoryColumn('response_score', 'response_score', 3),
+    HistoryColumn('consistency_score', 'consistency_score', 3),
+    HistoryColumn('reliability_score', 'reliability_score', 3),
+    HistoryColumn('experience_score', 'experience_score', 3),
+    HistoryColumn('total_consultations', 'total_consultations'),
+    HistoryColumn('unique_customers', 'unique_customers'),
+    HistoryColumn('total_bookings', 'total_bookings'),
+    HistoryColumn('avg_order_value', 'avg_order_value', 2),
+    HistoryColumn('days_active', 'days_active'),
+]
+
+
 def save_ranking_history(cur, rankings):
     """Insert ranking history records."""
-    if not rankings:
-        return 0
-
-    values = []
-    for r in rankings:
-        values.append(f"""(
-            {r['id']},
-            {r['ranking']:.2f},
-            {r.get('activity_multiplier') or 1.0:.2f},
-            {r.get('repeat_score') or 0:.3f},
-            {r.get('aov_score') or 0:.3f},
-            {r.get('volume_score') or 0:.3f},
-            {r.get('activity_score') or 0:.3f},
-            {r.get('rating_score') or 0:.3f},
-            {r.get('response_score') or 0:.3f},
-            {r.get('consistency_score') or 0:.3f},
-            {r.get('reliability_score') or 0:.3f},
-            {r.get('experience_score') or 0:.3f},
-            {r.get('total_consultations') or 0},
-            {r.get('unique_customers') or 0},
-            {r.get('total_bookings') or 0},
-            {r.get('avg_order_value') or 0:.2f},
-            {r.get('days_active') or 0}
-        )""")
-
-    sql = f"""
-    INSERT INTO guide.ranking_history (
-        guide_id, ranking_score, activity_multiplier,
-        repeat_score, aov_score, volume_score, activity_score,
-        rating_score, response_score, consistency_score,
-        reliability_score, experience_score,
-        total_consultations, unique_customers, total_bookings,
-        avg_order_value, days_active
-    ) VALUES {', '.join(values)}
-    """
-    cur.execute(sql)
-    return cur.rowcount
+    return copy_history(cur, rankings, HISTORY_COLUMNS) if rankings else 0
 
 
 def update_rankings_in_db(rankings):
-    """Update ranking_score in PostgreSQL and save history."""
+    """Save history and update changed ranking_score values in one transaction."""
     if not rankings:
         print("No rankings to update")
         return
 
     conn = psycopg2.connect(**PG_PRIMARY_CONFIG)
-    cur = conn.cursor()
+    try:
+        history_count, updated = write_rankings(conn, rankings, HISTORY_COLUMNS)
+    finally:
+        conn.close()
 
-    # Save history first
-    history_count = save_ranking_history(cur, rankings)
     print(f"Saved {history_count} ranking history records")
-
-    # Build the CASE statement
-    case_parts = [f"WHEN {r['id']} THEN {r['ranking']:.2f}" for r in rankings]
-    ids = [str(r['id']) for r in rankings]
-
-    sql = f"""
-    UPDATE guide.guide_profile
-    SET ranking_score = CASE id {' '.join(case_parts)} END,
-        updated_at = NOW()
-    WHERE id IN ({', '.join(ids)})
-    """
-
-    cur.execute(sql)
-    updated = cur.rowcount
-    conn.commit()
-    cur.close()
-    conn.close()
-
-    print(f"Updated ranking_score for {updated} guides in PostgreSQL")
+    print(f"Updated ranking_score for {updated} guides in PostgreSQL ({len(rankings) - updated} unchanged)")
 
 
 if __name__ == '__main__':
@@ -10,6 +10,10 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+from availability_sessions import days_active
+from guide_identity import cursor_fetch
+from ranking_writer import HistoryColumn, copy_history, write_rankings
+
 load_dotenv()
 
 PG_CONFIG = {
@@ -32,14 +36,8 @@ TEST_GUIDES = ('Aman Jain', 'Praveen')
 
 RANKING_QUERY = '''
 WITH guide_activity AS (
-    SELECT
-        (original_data->>'id')::int as guide_id,
-        COUNT(DISTINCT DATE(action_tstamp)) as days_active
-    FROM audit.logged_actions
-    WHERE table_name = 'guide_profile'
-      AND original_data->>'availability_state' IS DISTINCT FROM new_data->>'availability_state'
-      AND action_tstamp >= NOW() - INTERVAL '30 days'
-    GROUP BY original_data->>'id'
+    -- days online in the last 30 days, from the availability session store
+    SELECT * FROM UNNEST(%s::bigint[], %s::int[]) AS ga(guide_id, days_active)
 ),
 consultation_stats AS (
     SELECT
@@ -200,82 +198,71 @@ ORDER BY ranking DESC
 '''
 
 
+def ranking_params(conn) -> tuple:
+    """RANKING_QUERY parameters: per-guide days active, then the excluded test guides."""
+    with conn.cursor() as cur:
+        active = days_active(cursor_fetch(cur))
+    return list(active), list(active.values()), TEST_GUIDES
+
+
 def get_rankings():
     """Fetch rankings from PostgreSQL."""
     conn = psycopg2.connect(**PG_CONFIG)
+    params = ranking_params(conn)
     cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute(RANKING_QUERY, (TEST_GUIDES,))
+    cur.execute(RANKING_QUERY, params)
     rankings = [dict(r) for r in cur.fetchall()]
     cur.close()
     conn.close()
     return rankings
 
 
+HISTORY_COLUMNS = [
+    HistoryColumn('guide_id', 'id'),
+    HistoryColumn('ranking_score', 'ranking', 2),
+    HistoryColumn('activity_multiplier', 'activity_multiplier', 2),
+    HistoryColumn('repeat_score', 'repeat_score', 3),
+    HistoryColumn('aov_score', 'aov_score', 3),
+    HistoryColumn('volume_score', 'volume_score', 3),
+    HistoryColumn('activity_score', 'activity_score', 3),
+    HistoryColumn('rating_score', 'rating_score', 3),
+    HistoryColumn('response_score', 'response_score', 3),
+    HistoryColumn('consistency_score', 'consistency_score', 3),
+    HistoryColumn('reliability_score', 'reliability_score', 3),
+    HistoryColumn('experience_score', 'experience_score', 3),
+    HistoryColumn('total_consultations', 'total_consultations'),
+    HistoryColumn('unique_customers', 'unique_customers'),
+    HistoryColumn('total_bookings', 'total_customers'),
+    HistoryColumn('avg_order_value', 'avg_order_value', 2),
+    HistoryColumn('days_active', 'days_active'),
+    HistoryColumn('avg_rating', 'avg_rating', 2),
+    HistoryColumn('response_seconds', 'response_seconds'),
+    HistoryColumn('review_count', 'review_count'),
+    HistoryColumn('cancelled_count', 'cancelled_count'),
+    HistoryColumn('months_on_platform', 'months_on_platform'),
+    HistoryColumn('repeat_customers', 'repeat_customers'),
+]
+
+
 def save_ranking_history(cur, rankings):
     """Insert ranking history records."""
-    if not rankings:
-        return 0
-
-    values = []
-    for r in rankings:
-        values.append(f"""(
-            {r['id']}, {r['ranking']:.2f}, {r['activity_multiplier']:.2f},
-            {r['repeat_score']:.3f}, {r['aov_score']:.3f}, {r['volume_score']:.3f},
-            {r['activity_score']:.3f}, {r['rating_score']:.3f}, {r['response_score']:.3f},
-            {r['consistency_score']:.3f}, {r['reliability_score']:.3f}, {r['experience_score']:.3f},
-            {r['total_consultations']}, {r['unique_customers']}, {r['total_customers']},
-            {r['avg_order_value']:.2f}, {r['days_active']},
-            {r['avg_rating']:.2f}, {r['response_seconds']}, {r['review_count']},
-            {r['cancelled_count']}, {r['months_on_platform']}, {r['repeat_customers']}
-        )""")
-
-    sql = f"""
-    INSERT INTO guide.ranking_history (
-        guide_id, ranking_score, activity_multiplier,
-        repeat_score, aov_score, volume_score, activity_score,
-        rating_score, response_score, consistency_score,
-        reliability_score, experience_score,
-        total_consultations, unique_customers, total_bookings,
-        avg_order_value, days_active,
-        avg_rating, response_seconds, review_count,
-        cancelled_count, months_on_platform, repeat_customers
-    ) VALUES {', '.join(values)}
-    """
-    cur.execute(sql)
-    return cur.rowcount
+    return copy_history(cur, rankings, HISTORY_COLUMNS) if rankings else 0
 
 
 def update_rankings_in_db(rankings):
-    """Update ranking_score in PostgreSQL and save history."""
+    """Save history and update changed ranking_score values in one transaction."""
     if not rankings:
         print("No rankings to update")
         return
 
     conn = psycopg2.connect(**PG_PRIMARY_CONFIG)
-    cur = conn.cursor()
+    try:
+        history_count, updated = write_rankings(conn, rankings, HISTORY_COLUMNS)
+    finally:
+        conn.close()
 
-    # Save history
-    history_count = save_ranking_history(cur, rankings)
     print(f"Saved {history_count} ranking history records")
-
-    # Update guide_profile
-    case_parts = [f"WHEN {r['id']} THEN {r['ranking']:.2f}" for r in rankings]
-    ids = [str(r['id']) for r in rankings]
-
-    sql = f"""
-    UPDATE guide.guide_profile
-    SET ranking_score = CASE id {' '.join(case_parts)} END,
-        updated_at = NOW()
-    WHERE id IN ({', '.join(ids)})
-    """
-
-    cur.execute(sql)
-    updated = cur.rowcount
-    conn.commit()
-    cur.close()
-    conn.close()
-
-    print(f"Updated ranking_score for {updated} guides in PostgreSQL")
+    print(f"Updated ranking_score for {updated} guides in PostgreSQL ({len(rankings) - updated} unchanged)")
 
 
 def print_table(rankings):
@@ -295,7 +282,14 @@ if __name__ == '__main__':
     import sys
     from datetime import datetime
 
-    rankings = get_rankings()
+    if '--local' in sys.argv:
+        from ranking_engine import compute_rankings
+        rankings = compute_rankings()
+    elif '--incremental' in sys.argv:
+        from ranking_engine import incremental_rankings
+        rankings = incremental_rankings()
+    else:
+        rankings = get_rankings()
 
     if '--update' in sys.argv:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Updating rankings in PostgreSQL...")
@@ -306,3 +300,5 @@ if __name__ == '__main__':
         print_table(rankings)
         print(f"\nTotal: {len(rankings)} guides")
         print("\nRun with --update flag to update rankings in PostgreSQL")
+        print("Run with --local flag to compute rankings in-process (ranking_engine.py)")
+        print("Run with --incremental flag to only process changes since the last run")
@@ -0,0 +1,128 @@
+"""
+Guide identity map - guide_id -> (consultant_id, auth_user_ids, price_per_minute).
+
+Guides are linked to wallet.consultant_wallets, wallet.consultants and
+auth.auth_users only by phone number, and guide_profile stores it with a
+'+91' / '+' prefix. The guide queries used to normalise and string-join the
+phone in every CTE on every refresh. The map is resolved once, kept in
+memory, and handed to the queries as integer arrays (see GUIDE_SNAPSHOT_QUERY
+in queries.py), so they join wallet_orders and user_sessions on indexed ids.
+
+A cheap signature query (live guide ids/phones plus the consultant tables'
+last update) is checked at most every IDENTITY_CHECK_SECONDS; the map is
+rebuilt when it changes, or after IDENTITY_MAX_AGE regardless.
+"""
+
+import os
+import time
+import threading
+from typing import Callable, NamedTuple
+
+IDENTITY_CHECK_SECONDS = int(os.getenv('GUIDE_IDENTITY_CHECK_SECONDS', 30))
+IDENTITY_MAX_AGE = int(os.getenv('GUIDE_IDENTITY_MAX_AGE', 600))
+
+IDENTITY_QUERY = """
+SELECT
+    gp.id,
+    cw.consultant_id,
+    c.price_per_minute,
+    ARRAY(SELECT au.id FROM auth.auth_users au WHERE au.phone_number = p.phone ORDER BY au.id)
+FROM guide.guide_profile gp
+CROSS JOIN LATERAL (SELECT REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') AS phone) p
+LEFT JOIN wallet.consultant_wallets cw
+    ON cw.phone_number = p.phone AND cw.deleted_at IS NULL
+LEFT JOIN wallet.consultants c
+    ON c.phone_number = p.phone
+WHERE gp.deleted_at IS NULL
+"""
+
+# Changes whenever a guide is added/removed/re-numbered or a consultant row changes;
+# availability toggles (the frequent guide_profile updates) leave it alone.
+SIGNATURE_QUERY = """
+SELECT
+    (SELECT MD5(COALESCE(STRING_AGG(id || ':' || phone_number, ',' ORDER BY id), ''))
+     FROM guide.guide_profile WHERE deleted_at IS NULL),
+    (SELECT MAX(updated_at) FROM wallet.consultant_wallets),
+    (SELECT COUNT(*) FROM wallet.consultant_wallets WHERE deleted_at IS NULL),
+    (SELECT MAX(updated_at) FROM wallet.consultants)
+"""
+
+
+class GuideIdentity(NamedTuple):
+    consultant_id: int      # None when the guide has no live consultant wallet
+    auth_user_ids: tuple    # auth.auth_users rows sharing the phone (deleted ones included)
+    price_per_minute: object
+
+
+def build_identities(rows: list) -> dict:
+    """{guide_id: GuideIdentity} from IDENTITY_QUERY rows."""
+    return {gid: GuideIdentity(cid, tuple(auth_ids or ()), price)
+            for gid, cid, price, auth_ids in rows}
+
+
+def identity_params(identities: dict) -> dict:
+    """Array parameters for GUIDE_SNAPSHOT_QUERY (lists, so psycopg2 sends ARRAYs)."""
+    auth_pairs = [(gid, aid) for gid, ident in identities.items() for aid in ident.auth_user_ids]
+    return {
+        'guide_ids': list(identities),
+        'consultant_ids': [ident.consultant_id for ident in identities.values()],
+        'prices': [ident.price_per_minute for ident in identities.values()],
+        'auth_guide_ids': [gid for gid, _ in auth_pairs],
+        'auth_user_ids': [aid for _, aid in auth_pairs],
+    }
+
+
+def cursor_fetch(cursor) -> Callable:
+    """fetch(query, params) over a plain cursor, for the standalone dashboards."""
+    def fetch(query: str, params=None) -> list:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    return fetch
+
+
+class GuideIdentityMap:
+    """Thread-safe, lazily refreshed guide identity map."""
+
+    def __init__(self, check_seconds: int = IDENTITY_CHECK_SECONDS, max_age: int = IDENTITY_MAX_AGE):
+        self.check_seconds = check_seconds
+        self.max_age = max_age
+        self._identities = {}
+        self._params = identity_params({})
+        self._signature = None
+        self._built_at = self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def _refresh(self, fetch: Callable) -> None:
+        """Rebuild if the signature moved or the map is too old (caller holds the lock)."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return
+        signature = tuple(fetch(SIGNATURE_QUERY)[0])
+        self._checked_at = now
+        if signature == self._signature and now - self._built_at < self.max_age:
+            return
+        self._identities = build_identities(fetch(IDENTITY_QUERY))
+        self._params = identity_params(self._identities)
+        self._signature, self._built_at = signature, now
+        self.rebuilds += 1
+
+    def resolve(self, fetch: Callable) -> dict:
+        """Current {guide_id: GuideIdentity}; fetch(query, params=None) runs SQL."""
+        with self._lock:
+            self._refresh(fetch)
+            return self._identities
+
+    def query_params(self, fetch: Callable) -> dict:
+        """Array parameters for the guide detail queries."""
+        with self._lock:
+            self._refresh(fetch)
+            return self._params
+
+    def invalidate(self) -> None:
+        """Force a signature check on the next use."""
+        with self._lock:
+            self._checked_at = float('-inf')
+
+
+guide_identities = GuideIdentityMap()
@@ -0,0 +1,67 @@
+"""
+Guide snapshot partitioning - one GUIDE_SNAPSHOT_QUERY fetch, every guides table.
+
+The snapshot has one row per live guide (ordered by today's earnings); the
+online/offline/test tables, the summary counts, channel counts and skills
+breakdown are all derived from it here instead of by separate queries.
+"""
+
+from collections import Counter
+from typing import NamedTuple
+
+TEST_GUIDE_NAMES = ('Aman Jain', 'Praveen')
+ONLINE_STATES = ('ONLINE_AVAILABLE', 'ONLINE_BUSY')
+
+# GUIDE_SNAPSHOT_QUERY columns used for partitioning
+NAME, STATE, CHAT, VOICE, VIDEO = 1, 3, 4, 5, 6
+SKILL_NAMES = -1
+
+
+class GuideSnapshot(NamedTuple):
+    counts: tuple       # (online, offline, total)
+    channels: tuple     # (chat, voice, video) among ONLINE_AVAILABLE guides
+    skills: list        # (skill, online, offline, total), busiest first
+    online: list        # guide rows without availability_state
+    offline: list
+    test: list          # guide rows with availability_state
+
+
+def detail_row(row: tuple) -> tuple:
+    """Online/offline table row: drop availability_state and skill names."""
+    return row[:STATE] + row[STATE + 1:SKILL_NAMES]
+
+
+def guide_counts(rows: list) -> tuple:
+    """(online, offline, total) over all live guides."""
+    states = Counter(r[STATE] for r in rows)
+    return states['ONLINE_AVAILABLE'], states['OFFLINE'], len(rows)
+
+
+def channel_counts(rows: list) -> tuple:
+    """(chat, voice, video) enabled among ONLINE_AVAILABLE guides."""
+    online = [r for r in rows if r[STATE] == 'ONLINE_AVAILABLE']
+    return tuple(sum(1 for r in online if r[col]) for col in (CHAT, VOICE, VIDEO))
+
+
+def skills_breakdown(rows: list) -> list:
+    """(skill, online, offline, total) per skill any guide has."""
+    online, total = Counter(), Counter()
+    for r in rows:
+        for skill in r[SKILL_NAMES]:
+            total[skill] += 1
+            online[skill] += r[STATE] == 'ONLINE_AVAILABLE'
+    skills = [(s, online[s], total[s] - online[s], total[s]) for s in total]
+    return sorted(skills, key=lambda s: (-s[1], s[0]))
+
+
+def partition(rows: list) -> GuideSnapshot:
+    """Split snapshot rows into every guides table."""
+    listed = [r for r in rows if r[NAME] not in TEST_GUIDE_NAMES]
+    return GuideSnapshot(
+        counts=guide_counts(rows),
+        channels=channel_counts(rows),
+        skills=skills_breakdown(rows),
+        online=[detail_row(r) for r in listed if r[STATE] in ONLINE_STATES],
+        offline=[detail_row(r) for r in listed if r[STATE] not in ONLINE_STATES],
+        test=[r[:SKILL_NAMES] for r in rows if r[NAME] in TEST_GUIDE_NAMES],
+    )
@@ -6,6 +6,7 @@ Updates every 30 seconds with visual progress bar
 """
 
 import os
+import time
 import psycopg2
 import asyncio
 from datetime import datetime
@@ -15,13 +16,11 @@ from textual.widgets import Header, Footer, Static, DataTable, ProgressBar
 from textual.timer import Timer
 from textual.worker import Worker, WorkerState
 from dotenv import load_dotenv
+from guide_identity import guide_identities, cursor_fetch
+from guide_snapshot import partition
+from refresh_scheduler import RefreshScheduler, REFRESH_FRAME_SECONDS
 from guide_queries import (
-    get_guide_counts_query,
-    get_channel_counts_query,
-    get_skills_breakdown_query,
-    get_online_guides_query,
-    get_offline_guides_query,
-    get_test_guides_query,
+    get_guide_snapshot_query,
     get_promo_grant_spending_query,
     get_latest_feedback_query
 )
@@ -192,9 +191,8 @@ class GuidesDashboard(App):
         ("r", "refresh", "Refresh Now"),
     ]
 
-    # Configuration for the refresh timer
+    # Target refresh cadence; stretched when fetches are slow or the replica lags
     REFRESH_SECONDS = 30
-    TICK_RATE = 0.1  # Update bar every 0.1 seconds
 
     def __init__(self):
         super().__init__()
@@ -212,8 +210,9 @@ class GuidesDashboard(App):
         self.latest_feedback_data = []
 
         # Timer state
-        self.timer_ticks = 0
-        self.total_ticks = int(self.REFRESH_SECONDS / self.TICK_RATE)
+        self.scheduler = RefreshScheduler()
+        self.scheduler.register("guides", self.REFRESH_SECONDS)
+        self._fetching = False
 
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
@@ -222,7 +221,7 @@ class GuidesDashboard(App):
         # Refresh Timer Bar
         with Container(id="refresh-timer-container"):
             yield Static(f"Next refresh in {self.REFRESH_SECONDS}s", id="refresh-label")
-            yield ProgressBar(total=self.total_ticks, show_eta=False, id="refresh-bar")
+            yield ProgressBar(total=100, show_eta=False, id="refresh-bar")
 
         with Container(id="metrics"):
             with Horizontal():
@@ -287,70 +286,45 @@ class GuidesDashboard(App):
         # Initial data load
         self.fetch_data()
 
-        # Set up tick timer (runs fast to animate bar)
-        self.set_interval(self.TICK_RATE, self.tick_timer)
+        # Set up tick timer (redraws the countdown, fetches when due)
+        self.set_interval(REFRESH_FRAME_SECONDS, self.tick_timer)
 
     def tick_timer(self) -> None:
-        """Update progress bar and trigger fetch."""
-        self.timer_ticks += 1
-
-        bar = self.query_one("#refresh-bar", ProgressBar)
-        bar.progress = self.timer_ticks
-
-        if self.timer_ticks % 10 == 0:
-            seconds_left = self.REFRESH_SECONDS - (self.timer_ticks * self.TICK_RATE)
-            self.query_one("#refresh-label", Static).update(f"Next refresh in {int(seconds_left)}s")
-
-        if self.timer_ticks >= self.total_ticks:
-            self.timer_ticks = 0
-            bar.progress = 0
+        """Update the progress bar and trigger fetch when due."""
+        self.query_one("#refresh-bar", ProgressBar).progress = 100 * self.scheduler.progress("guides")
+        self.query_one("#refresh-label", Static).update(self.scheduler.label("guides"))
+        if not self._fetching and self.scheduler.due("guides"):
             self.fetch_data()
 
     def fetch_data(self) -> None:
         """Trigger data fetch using a worker."""
+        self._fetching = True
         self.run_worker(self._fetch_data_worker, thread=True, exclusive=True)
 
     def _fetch_data_worker(self) -> None:
         """Worker method to fetch data from the database."""
+        started = time.monotonic()
         try:
             conn = psycopg2.connect(**DB_CONFIG)
             cursor = conn.cursor()
-
-            # Query 1: Get counts
-            cursor.execute(get_guide_counts_query())
-            online, offline, total = cursor.fetchone()
-            self.online_count = online
-            self.offline_count = offline
-            self.total_count = total
-
-            # Query 2: Get channel counts
-            cursor.execute(get_channel_counts_query())
-            chat, voice, video = cursor.fetchone()
-            self.online_chat = chat
-            self.online_voice = voice
-            self.online_video = video
-
-            # Query 3: Get skill-wise online/offline counts
-            cursor.execute(get_skills_breakdown_query())
-            self.skills_data = cursor.fetchall()
-
-            # Query 4: Get ONLINE guides WITH SKILLS AND EARNINGS
-            cursor.execute(get_online_guides_query())
-            self.online_guides_data = cursor.fetchall()
-
-            # Query 5: Get OFFLINE guides WITH SKILLS AND EARNINGS
-            cursor.execute(get_offline_guides_query())
-            self.offline_guides_data = cursor.fetchall()
-
-            # Query 6: Get TEST guides (Aman Jain and Praveen)
-            cursor.execute(get_test_guides_query())
-            self.test_guides_data = cursor.fetchall()
-
-            # Query 7: Get promo grant spending by guide
+            self.scheduler.check_lag(cursor_fetch(cursor))
+
+            # Query 1: Every live guide once; counts and tables are derived from it
+            guide_params = guide_identities.query_params(cursor_fetch(cursor))
+            cursor.execute(get_guide_snapshot_query(), guide_params)
+            guides = partition(cursor.fetchall())
+            self.online_count, self.offline_count, self.total_count = guides.counts
+            self.online_chat, self.online_voice, self.online_video = guides.channels
+            self.skills_data = guides.skills
+            self.online_guides_data = guides.online
+            self.offline_guides_data = guides.offline
+            self.test_guides_data = guides.test
+
+            # Query 2: Get promo grant spending by guide
             cursor.execute(get_promo_grant_spending_query())
             self.promo_grant_data = cursor.fetchall()
 
-            # Query 8: Get latest feedback by guide
+            # Query 3: Get latest feedback by guide
             cursor.execute(get_latest_feedback_query())
             self.latest_feedback_data = cursor.fetchall()
 
@@ -359,9 +333,13 @@ class GuidesDashboard(App):
 
         except Exception as e:
             self.call_from_thread(self.notify, f"Error fetching data: {str(e)}", severity="error")
+        finally:
+            self.scheduler.record("guides", time.monotonic() - started)
 
     def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
         """Handle worker state changes and update display on success."""
+        if event.state in (WorkerState.SUCCESS, WorkerState.ERROR, WorkerState.CANCELLED):
+            self._fetching = False
         if event.state == WorkerState.SUCCESS:
             self.update_display()
         elif event.state == WorkerState.ERROR:
@@ -536,9 +514,7 @@ class GuidesDashboard(App):
         timestamp.update(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     def action_refresh(self) -> None:
-        """Manually refresh the data and reset timer."""
-        self.timer_ticks = 0
-        self.query_one("#refresh-bar", ProgressBar).progress = 0
+        """Manually refresh the data."""
         self.notify("Refreshing guides data...", severity="information")
         self.fetch_data()
 
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Neo4j CDC - stream PostgreSQL changes into Neo4j from a logical replication slot.
+
+Alternative to polling neo4j_sync on cron: the tables neo4j_sync tracks are
+decoded from a wal2json slot, each insert/update becomes the same row dict
+the q_* queries return, and micro-batches are applied with neo4j_sync's
+upsert and link functions. The slot is only advanced after a batch is in
+Neo4j, so a crash replays rather than loses changes (upserts are MERGEs).
+
+Server requirements: wal_level=logical and the wal2json plugin. Before
+PostgreSQL 16 the slot must live on the primary, not a read replica.
+
+Usage:
+    python neo4j_cdc.py --create-slot         # once
+    python neo4j_cdc.py --dry-run             # peek pending changes, apply nothing
+    python neo4j_cdc.py                       # stream continuously
+    python neo4j_cdc.py --dsn "dbname=astrokiran_test" --dry-run
+    python neo4j_cdc.py --drop-slot
+Pure functions, max 20 lines each.
+"""
+
+import os
+import json
+import time
+import select
+import argparse
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, NamedTuple
+
+from neo4j_sync import (
+    PG_CONFIG, log, neo4j_connect, neo4j_close, serialize_data, sync_new_relationships,
+    upsert_auth_users, upsert_customers, upsert_customer_profiles, upsert_guides,
+    upsert_consultations, upsert_feedback, upsert_user_wallets, upsert_payments,
+    upsert_wallet_orders, upsert_transactions, upsert_offer_reservations,
+)
+
+CDC_SLOT = os.getenv('CDC_SLOT', 'neo4j_sync')
+CDC_BATCH_ROWS = int(os.getenv('CDC_BATCH_ROWS', 500))
+CDC_FLUSH_SECONDS = float(os.getenv('CDC_FLUSH_SECONDS', 2))
+CDC_PEEK_LIMIT = 1000
+
+
+class CdcTable(NamedTuple):
+    label: str
+    key: str                # Neo4j node key, used to keep the last change per node
+    upsert: Callable
+    live_only: bool = False  # polling query filters deleted_at IS NULL
+
+
+CDC_TABLES = {
+    'auth.auth_users': CdcTable('AuthUser', 'id', upsert_auth_users, live_only=True),
+    'customers.customer': CdcTable('Customer', 'customer_id', upsert_customers),
+    'customers.customer_profile': CdcTable('CustomerProfile', 'profile_id', upsert_customer_profiles, live_only=True),
+    'guide.guide_profile': CdcTable('Guide', 'id', upsert_guides),
+    'consultation.consultation': CdcTable('Consultation', 'id', upsert_consultations, live_only=True),
+    'consultation.feedback': CdcTable('Feedback', 'id', upsert_feedback, live_only=True),
+    'wallet.user_wallets': CdcTable('CustomerWallet', 'user_id', upsert_user_wallets, live_only=True),
+    'wallet.payment_orders': CdcTable('Payment', 'payment_order_id', upsert_payments),
+    'wallet.wallet_orders': CdcTable('WalletOrder', 'order_id', upsert_wallet_orders),
+    'wallet.wallet_transactions': CdcTable('Transaction', 'transaction_id', upsert_transactions),
+    'offers.offer_reservations': CdcTable('OfferReservation', 'reservation_id', upsert_offer_reservations,
+                                          live_only=True),
+}
+
+WAL2JSON_OPTIONS = {
+    'format-version': '2',
+    'include-types': '1',
+    'add-tables': ','.join(CDC_TABLES),
+}
+
+
+# === DECODING ===
+
+def decode_value(type_name: str, value):
+    """wal2json text/JSON value -> the Python type psycopg2 would return."""
+    if value is None:
+        return None
+    if type_name.startswith('timestamp'):
+        return datetime.fromisoformat(value)
+    if type_name == 'date':
+        return date.fromisoformat(value)
+    if type_name.startswith('numeric'):
+        return Decimal(str(value))
+    return value
+
+
+def decode_change(change: dict):
+    """(table, row dict) for a tracked insert/update, else None."""
+    table = f"{change.get('schema')}.{change.get('table')}"
+    if change.get('action') not in ('I', 'U') or table not in CDC_TABLES:
+        return None
+    row = {c['name']: decode_value(c['type'], c['value']) for c in change['columns']}
+    if CDC_TABLES[table].live_only and row.get('deleted_at') is not None:
+        return None
+    return table, row
+
+
+def latest_rows(changes: list) -> dict:
+    """{table: {node key: row}} keeping only the last change per node."""
+    rows = {}
+    for table, row in changes:
+        rows.setdefault(table, {})[row[CDC_TABLES[table].key]] = row
+    return rows
+
+
+# === APPLY ===
+
+def apply_batch(driver, changes: list) -> dict:
+    """Upsert and link a micro-batch; returns node counts by label."""
+    counts = {}
+    for table, by_key in latest_rows(changes).items():
+        spec = CDC_TABLES[table]
+        upserted = spec.upsert(driver, serialize_data(list(by_key.values())))
+        sync_new_relationships(driver, spec.label, upserted)
+        counts[spec.label] = counts.get(spec.label, 0) + len(upserted.keys)
+    return counts
+
+
+def log_batch(counts: dict, lsn):
+    """One line per applied batch."""
+    summary = ", ".join(f"{label} {n}" for label, n in counts.items())
+    log(f"Applied up to LSN {lsn}: {summary}")
+
+
+# === POSTGRES ===
+
+def pg_params(dsn: str = None) -> dict:
+    """Connection kwargs: an explicit DSN (local testing) or PG_CONFIG."""
+    return {'dsn': dsn} if dsn else dict(PG_CONFIG)
+
+
+def pg_execute(dsn: str, query: str, params: tuple) -> list:
+    """Run one statement on a short-lived autocommit connection."""
+    import psycopg2
+    conn = psycopg2.connect(**pg_params(dsn))
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def create_slot(dsn: str = None, slot: str = CDC_SLOT):
+    """Create the wal2json logical replication slot."""
+    pg_execute(dsn, "SELECT pg_create_logical_replication_slot(%s, 'wal2json')", (slot,))
+    log(f"Created slot {slot}")
+
+
+def drop_slot(dsn: str = None, slot: str = CDC_SLOT):
+    """Drop the slot (otherwise it retains WAL while nothing consumes it)."""
+    pg_execute(dsn, "SELECT pg_drop_replication_slot(%s)", (slot,))
+    log(f"Dropped slot {slot}")
+
+
+def peek_changes(dsn: str = None, slot: str = CDC_SLOT, limit: int = CDC_PEEK_LIMIT) -> list:
+    """Decoded pending changes without consuming them from the slot."""
+    options = [v for kv in WAL2JSON_OPTIONS.items() for v in kv]
+    placeholders = ", ".join(["%s"] * len(options))
+    rows = pg_execute(dsn, f"SELECT data FROM pg_logical_slot_peek_changes(%s, NULL, %s, {placeholders})",
+                      (slot, limit, *options))
+    decoded = [decode_change(json.loads(data)) for (data,) in rows]
+    return [c for c in decoded if c]
+
+
+def open_stream(dsn: str = None, slot: str = CDC_SLOT):
+    """Replication connection with decoding started on the slot."""
+    import psycopg2
+    from psycopg2.extras import LogicalReplicationConnection
+    conn = psycopg2.connect(**pg_params(dsn), connection_factory=LogicalReplicationConnection)
+    cursor = conn.cursor()
+    cursor.start_replication(slot_name=slot, decode=True, options=WAL2JSON_OPTIONS)
+    return conn, cursor
+
+
+# === RUN ===
+
+def dry_run(dsn: str = None, slot: str = CDC_SLOT):
+    """Print what the next batch would apply, leaving the slot untouched."""
+    changes = peek_changes(dsn, slot)
+    log(f"{len(changes)} pending tracked changes (peeked up to {CDC_PEEK_LIMIT} WAL messages)")
+    for table, by_key in latest_rows(changes).items():
+        sample = serialize_data([next(iter(by_key.values()))])[0]
+        log(f"  {CDC_TABLES[table].label}: {len(by_key)} nodes, e.g. {sample}")
+
+
+def stream(cursor, driver):
+    """Consume the slot forever, flushing micro-batches by size or age."""
+    changes, lsn, flush_at = [], None, time.monotonic() + CDC_FLUSH_SECONDS
+    while True:
+        msg = cursor.read_message()
+        if msg:
+            change = decode_change(json.loads(msg.payload))
+            changes += [change] if change else []
+            lsn = msg.data_start
+        elif time.monotonic() < flush_at:
+            select.select([cursor], [], [], max(0.0, flush_at - time.monotonic()))
+        if lsn and (len(changes) >= CDC_BATCH_ROWS or time.monotonic() >= flush_at):
+            if changes:
+                log_batch(apply_batch(driver, changes), lsn)
+            cursor.send_feedback(flush_lsn=lsn)
+            changes, lsn = [], None
+        if time.monotonic() >= flush_at:
+            flush_at = time.monotonic() + CDC_FLUSH_SECONDS
+
+
+def run_cdc(dsn: str = None, slot: str = CDC_SLOT):
+    """Stream changes into Neo4j until interrupted."""
+    log(f"Streaming slot {slot} into Neo4j (batches of {CDC_BATCH_ROWS} rows / {CDC_FLUSH_SECONDS}s)...")
+    pg_conn, cursor = open_stream(dsn, slot)
+    driver = neo4j_connect()
+    try:
+        stream(cursor, driver)
+    except KeyboardInterrupt:
+        log("Stopping (unflushed changes will be replayed next start)")
+    finally:
+        pg_conn.close()
+        neo4j_close(driver)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logical replication CDC from PostgreSQL into Neo4j")
+    parser.add_argument('--dsn', help="libpq connection string (default: DB_* env settings)")
+    parser.add_argument('--slot', default=CDC_SLOT)
+    parser.add_argument('--create-slot', action='store_true', help="create the wal2json slot and exit")
+    parser.add_argument('--drop-slot', action='store_true', help="drop the slot and exit")
+    parser.add_argument('--dry-run', action='store_true', help="peek pending changes without applying them")
+    args = parser.parse_args()
+    if args.create_slot:
+        create_slot(args.dsn, args.slot)
+    elif args.drop_slot:
+        drop_slot(args.dsn, args.slot)
+    elif args.dry_run:
+        dry_run(args.dsn, args.slot)
+    else:
+        run_cdc(args.dsn, args.slot)
+
+
+if __name__ == '__main__':
+    main()
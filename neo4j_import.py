@@ -5,8 +5,17 @@ Pure functions, max 20 lines each.
 """
 
 import os
+import time
+import queue
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, NamedTuple, Optional
 from dotenv import load_dotenv
 
+from availability_sessions import guide_activity
+from guide_identity import cursor_fetch
+
 load_dotenv()
 
 # === CONFIG ===
@@ -23,6 +32,16 @@ NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'password')
 
+PG_ITERSIZE = int(os.getenv('PG_ITERSIZE', 2000))           # rows per server-side fetch
+NEO4J_BATCH_SIZE = int(os.getenv('NEO4J_BATCH_SIZE', 500))  # rows per UNWIND
+READ_AHEAD_BATCHES = int(os.getenv('READ_AHEAD_BATCHES', 4))
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', 6))        # concurrent import steps
+STEP_RETRIES = int(os.getenv('IMPORT_STEP_RETRIES', 3))
+STEP_RETRY_DELAY = 2  # seconds, multiplied by the attempt number
+
+_cursor_ids = itertools.count(1)
+_DONE = object()
+
 
 # === POSTGRES FUNCTIONS ===
 
@@ -34,10 +53,14 @@ def pg_connect():
     return conn, conn.cursor(cursor_factory=RealDictCursor)
 
 
-def pg_fetch(cursor, query: str) -> list:
-    """Execute query and return list of dicts."""
-    cursor.execute(query)
-    return [dict(row) for row in cursor.fetchall()]
+def pg_stream(cursor, query: str, itersize: int = PG_ITERSIZE):
+    """Yield rows as dicts from a named server-side cursor, itersize at a time."""
+    from psycopg2.extras import RealDictCursor
+    name = f"neo4j_import_{next(_cursor_ids)}"
+    with cursor.connection.cursor(name, cursor_factory=RealDictCursor) as stream:
+        stream.itersize = itersize
+        stream.execute(query)
+        yield from stream
 
 
 def pg_close(conn, cursor):
@@ -60,12 +83,18 @@ def neo4j_run(driver, query: str, params: dict = None):
         session.run(query, params or {})
 
 
-def neo4j_batch(driver, query: str, data: list, batch_size: int = 500):
-    """Run batched Cypher query with UNWIND."""
+def neo4j_batch(driver, query: str, data, batch_size: int = NEO4J_BATCH_SIZE) -> int:
+    """Run batched Cypher query with UNWIND over any iterable; returns row count.
+
+    Batches are built on a reader thread, so a streaming source keeps
+    fetching from Postgres while Neo4j writes the previous batch.
+    """
+    count = 0
     with driver.session() as session:
-        for i in range(0, len(data), batch_size):
-            batch = data[i:i + batch_size]
-            session.run(query, {'batch': batch})
+        for batch in read_ahead(chunked(data, batch_size)):
+            session.run(query, {'batch': batch}).consume()
+            count += len(batch)
+    return count
 
 
 def neo4j_close(driver):
@@ -73,6 +102,60 @@ def neo4j_close(driver):
     driver.close()
 
 
+# === STREAMING ===
+
+def chunked(rows, size: int):
+    """Group an iterable into lists of at most size items."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the consumer has stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(batches, q: queue.Queue, stop: threading.Event):
+    """Reader thread: push batches, then _DONE or the exception raised."""
+    try:
+        for batch in batches:
+            if not _put(q, batch, stop):
+                return
+        _put(q, _DONE, stop)
+    except Exception as e:
+        _put(q, e, stop)
+    finally:
+        getattr(batches, 'close', lambda: None)()
+
+
+def read_ahead(batches, depth: int = READ_AHEAD_BATCHES):
+    """Yield batches produced on a background thread, at most depth ahead."""
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    reader = threading.Thread(target=_produce, args=(batches, q, stop), name="pg-reader", daemon=True)
+    reader.start()
+    try:
+        while (item := q.get()) is not _DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+
+
 # === CLEANUP ===
 
 def clear_database(driver):
@@ -81,20 +164,9 @@ def clear_database(driver):
 
 
 def create_constraints(driver):
-    """Create uniqueness constraints for key nodes."""
-    constraints = [
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:AuthUser) REQUIRE n.id IS UNIQUE",
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Customer) REQUIRE n.customer_id IS UNIQUE",
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Guide) REQUIRE n.id IS UNIQUE",
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Skill) REQUIRE n.id IS UNIQUE",
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Language) REQUIRE n.id IS UNIQUE",
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Consultation) REQUIRE n.id IS UNIQUE",
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Payment) REQUIRE n.payment_order_id IS UNIQUE",
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:WalletOrder) REQUIRE n.order_id IS UNIQUE",
-        "CREATE CONSTRAINT IF NOT EXISTS FOR (n:Offer) REQUIRE n.offer_id IS UNIQUE",
-    ]
-    for c in constraints:
-        neo4j_run(driver, c)
+    """Create the constraints and lookup indexes our import/sync queries need."""
+    from neo4j_schema import apply_schema
+    apply_schema(driver, log)
 
 
 # === DATA QUERIES ===
@@ -176,23 +248,9 @@ SELECT id, phone, name, source, utm_source, utm_medium, utm_campaign, status, cr
 FROM marketing.leads
 """
 
-Q_GUIDE_ACTIVITY = """
-SELECT
-    (original_data->>'id')::int as guide_id,
-    COUNT(DISTINCT DATE(action_tstamp)) as days_active,
-    COUNT(*) as state_changes_30d,
-    MAX(action_tstamp) as last_activity
-FROM audit.logged_actions
-WHERE table_name = 'guide_profile'
-  AND original_data->>'availability_state' IS DISTINCT FROM new_data->>'availability_state'
-  AND action_tstamp >= NOW() - INTERVAL '30 days'
-GROUP BY original_data->>'id'
-"""
-
-
 # === NODE IMPORT FUNCTIONS ===
 
-def import_auth_users(driver, data: list):
+def import_auth_users(driver, data):
     """Import AuthUser nodes."""
     query = """
     UNWIND $batch AS row
@@ -202,10 +260,10 @@ def import_auth_users(driver, data: list):
         n.is_test_user = row.is_test_user,
         n.created_at = row.created_at
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_customers(driver, data: list):
+def import_customers(driver, data):
     """Import Customer nodes (including deleted)."""
     query = """
     UNWIND $batch AS row
@@ -217,10 +275,10 @@ def import_customers(driver, data: list):
         n.deleted_at = row.deleted_at,
         n.is_deleted = CASE WHEN row.deleted_at IS NOT NULL THEN true ELSE false END
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_customer_profiles(driver, data: list):
+def import_customer_profiles(driver, data):
     """Import CustomerProfile nodes."""
     query = """
     UNWIND $batch AS row
@@ -229,10 +287,10 @@ def import_customer_profiles(driver, data: list):
         n.dob = row.dob, n.birth_city = row.birth_city,
         n.zodiac_sign = row.zodiac_sign, n.gender = row.gender
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_guides(driver, data: list):
+def import_guides(driver, data):
     """Import Guide nodes (including deleted)."""
     query = """
     UNWIND $batch AS row
@@ -246,30 +304,30 @@ def import_guides(driver, data: list):
         n.deleted_at = row.deleted_at,
         n.is_deleted = CASE WHEN row.deleted_at IS NOT NULL THEN true ELSE false END
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_skills(driver, data: list):
+def import_skills(driver, data):
     """Import Skill nodes."""
     query = """
     UNWIND $batch AS row
     MERGE (n:Skill {id: row.id})
     SET n.name = row.name, n.description = row.description
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_languages(driver, data: list):
+def import_languages(driver, data):
     """Import Language nodes."""
     query = """
     UNWIND $batch AS row
     MERGE (n:Language {id: row.id})
     SET n.name = row.name
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_consultations(driver, data: list):
+def import_consultations(driver, data):
     """Import Consultation nodes."""
     query = """
     UNWIND $batch AS row
@@ -281,10 +339,10 @@ def import_consultations(driver, data: list):
         n.promotional = row.promotional, n.created_at = row.created_at,
         n.requested_at = row.requested_at, n.accepted_at = row.accepted_at
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_feedback(driver, data: list):
+def import_feedback(driver, data):
     """Import Feedback nodes."""
     query = """
     UNWIND $batch AS row
@@ -292,10 +350,10 @@ def import_feedback(driver, data: list):
     SET n.consultation_id = row.consultation_id, n.customer_id = row.customer_id,
         n.rating = row.rating, n.feedback = row.feedback, n.status = row.status
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_user_wallets(driver, data: list):
+def import_user_wallets(driver, data):
     """Import CustomerWallet nodes."""
     query = """
     UNWIND $batch AS row
@@ -304,10 +362,10 @@ def import_user_wallets(driver, data: list):
         n.real_cash = row.real_cash, n.virtual_cash = row.virtual_cash,
         n.recharge_count = row.recharge_count
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_consultant_wallets(driver, data: list):
+def import_consultant_wallets(driver, data):
     """Import GuideWallet nodes."""
     query = """
     UNWIND $batch AS row
@@ -315,10 +373,10 @@ def import_consultant_wallets(driver, data: list):
     SET n.name = row.name, n.phone_number = row.phone_number,
         n.revenue_share = row.revenue_share
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_payments(driver, data: list):
+def import_payments(driver, data):
     """Import Payment nodes."""
     query = """
     UNWIND $batch AS row
@@ -327,10 +385,10 @@ def import_payments(driver, data: list):
         n.status = row.status, n.payment_method = row.payment_method,
         n.created_at = row.created_at
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_wallet_orders(driver, data: list):
+def import_wallet_orders(driver, data):
     """Import WalletOrder nodes."""
     query = """
     UNWIND $batch AS row
@@ -340,10 +398,10 @@ def import_wallet_orders(driver, data: list):
         n.final_amount = row.final_amount, n.consultant_share = row.consultant_share,
         n.status = row.status, n.created_at = row.created_at
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_transactions(driver, data: list):
+def import_transactions(driver, data):
     """Import Transaction nodes."""
     query = """
     UNWIND $batch AS row
@@ -353,10 +411,10 @@ def import_transactions(driver, data: list):
         n.real_cash_delta = row.real_cash_delta, n.virtual_cash_delta = row.virtual_cash_delta,
         n.is_promotional = row.is_promotional
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_offers(driver, data: list):
+def import_offers(driver, data):
     """Import Offer nodes."""
     query = """
     UNWIND $batch AS row
@@ -365,10 +423,10 @@ def import_offers(driver, data: list):
         n.bonus_percentage = row.bonus_percentage, n.free_minutes = row.free_minutes,
         n.is_active = row.is_active
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_offer_reservations(driver, data: list):
+def import_offer_reservations(driver, data):
     """Import OfferReservation nodes."""
     query = """
     UNWIND $batch AS row
@@ -377,10 +435,10 @@ def import_offer_reservations(driver, data: list):
         n.reservation_status = row.reservation_status,
         n.bonus_amount = row.bonus_amount, n.consultation_id = row.consultation_id
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def import_leads(driver, data: list):
+def import_leads(driver, data):
     """Import Lead nodes."""
     query = """
     UNWIND $batch AS row
@@ -389,11 +447,11 @@ def import_leads(driver, data: list):
         n.utm_source = row.utm_source, n.utm_medium = row.utm_medium,
         n.utm_campaign = row.utm_campaign, n.status = row.status
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def update_guide_activity(driver, data: list):
-    """Update Guide nodes with activity metrics from audit log."""
+def update_guide_activity(driver, data):
+    """Update Guide nodes with activity metrics (see import_guide_activity)."""
     query = """
     UNWIND $batch AS row
     MATCH (g:Guide {id: row.guide_id})
@@ -401,7 +459,17 @@ def update_guide_activity(driver, data: list):
         g.state_changes_30d = row.state_changes_30d,
         g.last_activity = row.last_activity
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
+
+
+def import_guide_activity(driver):
+    """Guide activity metrics from the availability session store (fed by the audit log)."""
+    conn, cursor = pg_connect()
+    try:
+        data = guide_activity(cursor_fetch(conn.cursor()))
+    finally:
+        pg_close(conn, cursor)
+    return update_guide_activity(driver, serialize_data(data))
 
 
 # === RELATIONSHIP IMPORT FUNCTIONS ===
@@ -456,7 +524,7 @@ def link_guide_wallet(driver):
     neo4j_run(driver, query)
 
 
-def link_guide_skills(driver, data: list):
+def link_guide_skills(driver, data):
     """Create Guide -> Skill relationships."""
     query = """
     UNWIND $batch AS row
@@ -464,10 +532,10 @@ def link_guide_skills(driver, data: list):
     MATCH (s:Skill {id: row.skill_id})
     MERGE (g)-[:HAS_SKILL]->(s)
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
-def link_guide_languages(driver, data: list):
+def link_guide_languages(driver, data):
     """Create Guide -> Language relationships."""
     query = """
     UNWIND $batch AS row
@@ -475,7 +543,7 @@ def link_guide_languages(driver, data: list):
     MATCH (l:Language {id: row.language_id})
     MERGE (g)-[:SPEAKS]->(l)
     """
-    neo4j_batch(driver, query, data)
+    return neo4j_batch(driver, query, data)
 
 
 def link_guide_referrals(driver):
@@ -627,9 +695,9 @@ def serialize_row(row: dict) -> dict:
     return result
 
 
-def serialize_data(data: list) -> list:
-    """Serialize all rows in a list."""
-    return [serialize_row(row) for row in data]
+def serialize_data(data):
+    """Lazily serialize rows from any iterable."""
+    return (serialize_row(row) for row in data)
 
 
 # === MAIN ===
@@ -642,9 +710,6 @@ def log(msg: str):
 
 def run_import():
     """Main import orchestration."""
-    log("Connecting to PostgreSQL...")
-    pg_conn, pg_cursor = pg_connect()
-
     log("Connecting to Neo4j...")
     neo4j_driver = neo4j_connect()
 
@@ -654,103 +719,150 @@ def run_import():
     log("Creating constraints...")
     create_constraints(neo4j_driver)
 
-    # Import nodes
-    import_nodes(pg_cursor, neo4j_driver)
-
-    # Import relationships
-    import_relationships(pg_cursor, neo4j_driver)
+    log(f"Importing nodes and relationships ({IMPORT_WORKERS} workers)...")
+    started = time.monotonic()
+    timings = run_dag(NODE_STEPS + LINK_STEPS, neo4j_driver)
+    log_timings(timings, time.monotonic() - started)
 
     log("Closing connections...")
-    pg_close(pg_conn, pg_cursor)
     neo4j_close(neo4j_driver)
 
     log("Done!")
 
 
-def import_nodes(cursor, driver):
-    """Import all nodes."""
-    node_imports = [
-        ("AuthUsers", Q_AUTH_USERS, import_auth_users),
-        ("Customers", Q_CUSTOMERS, import_customers),
-        ("CustomerProfiles", Q_CUSTOMER_PROFILES, import_customer_profiles),
-        ("Guides", Q_GUIDES, import_guides),
-        ("Skills", Q_SKILLS, import_skills),
-        ("Languages", Q_LANGUAGES, import_languages),
-        ("Consultations", Q_CONSULTATIONS, import_consultations),
-        ("Feedback", Q_FEEDBACK, import_feedback),
-        ("CustomerWallets", Q_USER_WALLETS, import_user_wallets),
-        ("GuideWallets", Q_CONSULTANT_WALLETS, import_consultant_wallets),
-        ("Payments", Q_PAYMENTS, import_payments),
-        ("WalletOrders", Q_WALLET_ORDERS, import_wallet_orders),
-        ("Transactions", Q_TRANSACTIONS, import_transactions),
-        ("Offers", Q_OFFERS, import_offers),
-        ("OfferReservations", Q_OFFER_RESERVATIONS, import_offer_reservations),
-        ("Leads", Q_LEADS, import_leads),
-    ]
-    for name, query, import_fn in node_imports:
-        log(f"Importing {name}...")
-        data = serialize_data(pg_fetch(cursor, query))
-        import_fn(driver, data)
-        log(f"  -> {len(data)} nodes")
-
-
-def import_relationships(cursor, driver):
-    """Import all relationships."""
-    log("Creating relationships...")
-
-    # Identity links
-    log("  -> Customer-Auth links")
-    link_customer_auth(driver)
-    log("  -> Customer-Wallet links")
-    link_customer_wallet(driver)
-    log("  -> Customer-Profile links")
-    link_customer_profile(driver)
-    log("  -> Guide-Auth links")
-    link_guide_auth(driver)
-    log("  -> Guide-Wallet links")
-    link_guide_wallet(driver)
-
+# === STEP GRAPH ===
+# Node steps are named after their label and are mutually independent.
+# Link steps need the labels of their two endpoints, and (via serialize_links)
+# the previous link step touching either label: MERGEing relationships locks
+# both end nodes, so overlapping link steps in parallel deadlock.
+
+class Step(NamedTuple):
+    name: str
+    fn: Callable                # fn(driver) or fn(driver, rows) when query is set
+    query: Optional[str] = None
+    needs: tuple = ()
+
+
+NODE_STEPS = [
+    Step("AuthUser", import_auth_users, Q_AUTH_USERS),
+    Step("Customer", import_customers, Q_CUSTOMERS),
+    Step("CustomerProfile", import_customer_profiles, Q_CUSTOMER_PROFILES),
+    Step("Guide", import_guides, Q_GUIDES),
+    Step("Skill", import_skills, Q_SKILLS),
+    Step("Language", import_languages, Q_LANGUAGES),
+    Step("Consultation", import_consultations, Q_CONSULTATIONS),
+    Step("Feedback", import_feedback, Q_FEEDBACK),
+    Step("CustomerWallet", import_user_wallets, Q_USER_WALLETS),
+    Step("GuideWallet", import_consultant_wallets, Q_CONSULTANT_WALLETS),
+    Step("Payment", import_payments, Q_PAYMENTS),
+    Step("WalletOrder", import_wallet_orders, Q_WALLET_ORDERS),
+    Step("Transaction", import_transactions, Q_TRANSACTIONS),
+    Step("Offer", import_offers, Q_OFFERS),
+    Step("OfferReservation", import_offer_reservations, Q_OFFER_RESERVATIONS),
+    Step("Lead", import_leads, Q_LEADS),
+]
+
+def serialize_links(steps: list) -> list:
+    """Add a need on the previous step sharing an endpoint label, in declaration order."""
+    last_by_label, chained = {}, []
+    for step in steps:
+        after = sorted({last_by_label[label] for label in step.needs if label in last_by_label})
+        chained.append(step._replace(needs=step.needs + tuple(after)))
+        last_by_label.update((label, step.name) for label in step.needs)
+    return chained
+
+
+LINK_STEPS = serialize_links([
+    # Identity
+    Step("Customer-Auth", link_customer_auth, needs=("Customer", "AuthUser")),
+    Step("Customer-Wallet", link_customer_wallet, needs=("Customer", "CustomerWallet")),
+    Step("Customer-Profile", link_customer_profile, needs=("Customer", "CustomerProfile")),
+    Step("Guide-Auth", link_guide_auth, needs=("Guide", "AuthUser")),
+    Step("Guide-Wallet", link_guide_wallet, needs=("Guide", "GuideWallet")),
     # Guide profile
-    log("  -> Guide-Skills links")
-    skills_data = serialize_data(pg_fetch(cursor, Q_GUIDE_SKILLS))
-    link_guide_skills(driver, skills_data)
-    log("  -> Guide-Languages links")
-    langs_data = serialize_data(pg_fetch(cursor, Q_GUIDE_LANGUAGES))
-    link_guide_languages(driver, langs_data)
-    log("  -> Guide referrals")
-    link_guide_referrals(driver)
-
+    Step("Guide-Skills", link_guide_skills, Q_GUIDE_SKILLS, needs=("Guide", "Skill")),
+    Step("Guide-Languages", link_guide_languages, Q_GUIDE_LANGUAGES, needs=("Guide", "Language")),
+    Step("Guide-Referrals", link_guide_referrals, needs=("Guide",)),
     # Consultations
-    log("  -> Consultation-Customer links")
-    link_consultation_customer(driver)
-    log("  -> Consultation-Guide links")
-    link_consultation_guide(driver)
-    log("  -> Consultation-Order links")
-    link_consultation_order(driver)
-    log("  -> Consultation-Feedback links")
-    link_consultation_feedback(driver)
-
+    Step("Consultation-Customer", link_consultation_customer, needs=("Consultation", "Customer")),
+    Step("Consultation-Guide", link_consultation_guide, needs=("Consultation", "Guide")),
+    Step("Consultation-Order", link_consultation_order, needs=("Consultation", "WalletOrder")),
+    Step("Consultation-Feedback", link_consultation_feedback, needs=("Consultation", "Feedback")),
     # Financial
-    log("  -> Payment links")
-    link_payment_wallet(driver)
-    link_payment_customer(driver)
-    log("  -> WalletOrder links")
-    link_wallet_order_customer(driver)
-    link_wallet_order_guide(driver)
-    log("  -> Transaction links")
-    link_transaction_wallet(driver)
-    link_transaction_order(driver)
-
+    Step("Payment-Wallet", link_payment_wallet, needs=("Payment", "CustomerWallet")),
+    Step("Payment-Customer", link_payment_customer, needs=("Payment", "Customer")),
+    Step("WalletOrder-Customer", link_wallet_order_customer, needs=("WalletOrder", "CustomerWallet")),
+    Step("WalletOrder-Guide", link_wallet_order_guide, needs=("WalletOrder", "GuideWallet")),
+    Step("Transaction-Wallet", link_transaction_wallet, needs=("Transaction", "CustomerWallet")),
+    Step("Transaction-Order", link_transaction_order, needs=("Transaction", "WalletOrder")),
     # Offers
-    log("  -> Offer reservation links")
-    link_offer_reservation(driver)
-    link_reservation_customer(driver)
-
+    Step("Reservation-Offer", link_offer_reservation, needs=("OfferReservation", "Offer")),
+    Step("Reservation-Customer", link_reservation_customer, needs=("OfferReservation", "Customer")),
     # Guide activity metrics (from audit log - availability state changes)
-    log("  -> Guide activity (from audit log)")
-    activity_data = serialize_data(pg_fetch(cursor, Q_GUIDE_ACTIVITY))
-    update_guide_activity(driver, activity_data)
-    log(f"     Updated {len(activity_data)} guides with activity data")
+    Step("Guide-Activity", import_guide_activity, needs=("Guide",)),
+])
+
+
+# === SCHEDULER ===
+
+def run_step_once(step: Step, driver):
+    """Run a step; steps with a query stream it over their own PG connection."""
+    if step.query is None:
+        return step.fn(driver)
+    conn, cursor = pg_connect()
+    try:
+        return step.fn(driver, serialize_data(pg_stream(cursor, step.query)))
+    finally:
+        pg_close(conn, cursor)
+
+
+def run_step(step: Step, driver) -> float:
+    """Run a step with retries (every step is an idempotent MERGE); returns seconds."""
+    for attempt in range(1, STEP_RETRIES + 1):
+        started = time.monotonic()
+        try:
+            count = run_step_once(step, driver)
+        except Exception as e:
+            if attempt == STEP_RETRIES:
+                raise
+            log(f"  !! {step.name} failed (attempt {attempt}/{STEP_RETRIES}): {e}")
+            time.sleep(STEP_RETRY_DELAY * attempt)
+            continue
+        elapsed = time.monotonic() - started
+        done = f"{count} rows" if count is not None else "done"
+        log(f"  -> {step.name}: {done} in {elapsed:.1f}s")
+        return elapsed
+
+
+def ready_steps(pending: dict, done: set) -> list:
+    """Pending steps whose dependencies have all finished."""
+    return [s for s in pending.values() if set(s.needs) <= done]
+
+
+def run_dag(steps: list, driver, workers: int = None) -> dict:
+    """Run steps on a worker pool as their dependencies finish; returns {name: seconds}."""
+    pending = {s.name: s for s in steps}
+    running, done, timings = {}, set(), {}
+    with ThreadPoolExecutor(max_workers=workers or IMPORT_WORKERS, thread_name_prefix="import") as pool:
+        while pending or running:
+            for step in ready_steps(pending, done):
+                running[pool.submit(run_step, pending.pop(step.name), driver)] = step.name
+            if not running:
+                raise ValueError(f"Unsatisfiable step dependencies: {sorted(pending)}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                timings[name] = future.result()
+                done.add(name)
+    return timings
+
+
+def log_timings(timings: dict, wall: float):
+    """Log wall time against summed step time and the slowest steps."""
+    total = sum(timings.values())
+    log(f"Imported {len(timings)} steps in {wall:.1f}s wall ({total:.1f}s of step time)")
+    for name, seconds in sorted(timings.items(), key=lambda t: -t[1])[:5]:
+        log(f"     {name:<24} {seconds:>7.1f}s")
 
 
 if __name__ == '__main__':
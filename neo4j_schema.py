@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Neo4j Schema Manager - constraints and indexes derived from our Cypher.
+
+Scans the Cypher in neo4j_import.py, neo4j_sync.py (including the generated
+link queries) and get_rankings.RANKING_QUERY for the properties nodes are
+looked up by:
+  MERGE (n:Label {key: ...})     -> uniqueness constraint on Label.key
+  MATCH (n:Label {prop: ...})    -> range index on Label.prop
+  WHERE n.prop = ... / IN [...]  -> range index on Label.prop
+
+Usage:
+    python neo4j_schema.py            # report missing constraints/indexes
+    python neo4j_schema.py --apply    # create them (idempotent)
+    python neo4j_schema.py --profile  # EXPLAIN every keyed query, flag label scans
+Pure functions, max 20 lines each.
+"""
+
+import os
+import re
+import ast
+import argparse
+from typing import NamedTuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CYPHER_SOURCES = ['neo4j_import.py', 'neo4j_sync.py', 'get_rankings.py']
+
+NODE_RE = re.compile(r"\((\w+):(\w+)(?:\s*\{(\w+)\s*:)?")
+MERGE_RE = re.compile(r"MERGE\s*\((\w+):(\w+)\s*\{(\w+)\s*:")
+WHERE_RE = re.compile(r"(?:WHERE|AND)\s+(\w+)\.(\w+)\s*(?:=|IN\b)")
+PARAM_RE = re.compile(r"\$(\w+)")
+SCAN_OPERATORS = ('AllNodesScan', 'NodeByLabelScan')
+
+
+class SchemaItem(NamedTuple):
+    kind: str       # 'constraint' or 'index'
+    label: str
+    prop: str
+
+    @property
+    def name(self) -> str:
+        suffix = 'unique' if self.kind == 'constraint' else 'idx'
+        return f"{self.label.lower()}_{self.prop}_{suffix}"
+
+    @property
+    def ddl(self) -> str:
+        if self.kind == 'constraint':
+            return f"CREATE CONSTRAINT {self.name} IF NOT EXISTS FOR (n:{self.label}) REQUIRE n.{self.prop} IS UNIQUE"
+        return f"CREATE INDEX {self.name} IF NOT EXISTS FOR (n:{self.label}) ON (n.{self.prop})"
+
+
+# === CYPHER DISCOVERY ===
+
+def is_cypher(text: str) -> bool:
+    """Heuristic: a string constant that is a MATCH/MERGE statement."""
+    return bool(re.search(r"\b(MATCH|MERGE)\s*\(", text))
+
+
+def scope_name(node) -> str:
+    """Name of a top-level function or assignment, else ''."""
+    if isinstance(node, ast.FunctionDef):
+        return node.name
+    if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+        return node.targets[0].id
+    return ''
+
+
+def file_queries(filename: str) -> list:
+    """(source, cypher) for every Cypher string constant in a module."""
+    with open(os.path.join(BASE_DIR, filename)) as f:
+        tree = ast.parse(f.read())
+    queries = []
+    for node in tree.body:
+        for const in ast.walk(node):
+            if isinstance(const, ast.Constant) and isinstance(const.value, str) and is_cypher(const.value):
+                queries.append((f"{filename[:-3]}.{scope_name(node)}", const.value))
+    return queries
+
+
+def link_queries() -> list:
+    """(source, cypher) for the link queries neo4j_sync generates."""
+    from neo4j_sync import LINKS, link_forward_query, link_reverse_query
+    queries = []
+    for link in LINKS:
+        name = f"neo4j_sync.{link.owner}-{link.rel}-{link.target}"
+        queries.append((f"{name} (forward)", link_forward_query(link)))
+        if link.reverse:
+            queries.append((f"{name} (reverse)", link_reverse_query(link)))
+    return queries
+
+
+def all_queries() -> list:
+    """Every Cypher statement we run, deduplicated by text."""
+    seen, queries = set(), []
+    for source, query in [q for f in CYPHER_SOURCES for q in file_queries(f)] + link_queries():
+        if query not in seen:
+            seen.add(query)
+            queries.append((source, query))
+    return queries
+
+
+# === REQUIREMENTS ===
+
+def query_requirements(query: str) -> set:
+    """SchemaItems one query needs."""
+    labels = {var: label for var, label, _ in NODE_RE.findall(query)}
+    merged = {(label, prop) for _, label, prop in MERGE_RE.findall(query)}
+    looked_up = {(label, prop) for _, label, prop in NODE_RE.findall(query) if prop}
+    looked_up |= {(labels[var], prop) for var, prop in WHERE_RE.findall(query) if var in labels}
+    items = {SchemaItem('constraint', label, prop) for label, prop in merged}
+    items |= {SchemaItem('index', label, prop) for label, prop in looked_up - merged}
+    return items
+
+
+def required_schema(queries: list = None) -> list:
+    """All required items; a uniqueness constraint also serves as the index."""
+    items = set()
+    for _, query in queries or all_queries():
+        items |= query_requirements(query)
+    constrained = {(i.label, i.prop) for i in items if i.kind == 'constraint'}
+    items = {i for i in items if i.kind == 'constraint' or (i.label, i.prop) not in constrained}
+    return sorted(items, key=lambda i: (i.label, i.kind, i.prop))
+
+
+# === NEO4J ===
+
+def existing_schema(driver) -> dict:
+    """{(label, prop): kinds} for single-property constraints and indexes."""
+    existing = {}
+    with driver.session() as session:
+        for kind, show in (('constraint', "SHOW CONSTRAINTS"), ('index', "SHOW INDEXES")):
+            for r in session.run(f"{show} YIELD labelsOrTypes, properties"):
+                if r['labelsOrTypes'] and r['properties'] and len(r['properties']) == 1:
+                    existing.setdefault((r['labelsOrTypes'][0], r['properties'][0]), set()).add(kind)
+    return existing
+
+
+def missing_schema(driver) -> list:
+    """Required items with no matching constraint (or, for indexes, any index)."""
+    existing = existing_schema(driver)
+    return [i for i in required_schema()
+            if i.kind not in existing.get((i.label, i.prop), set())
+            and not (i.kind == 'index' and existing.get((i.label, i.prop)))]
+
+
+def apply_schema(driver, log=print) -> int:
+    """Create missing constraints and indexes; returns how many were created."""
+    created = 0
+    with driver.session() as session:
+        for item in missing_schema(driver):
+            try:
+                session.run(item.ddl).consume()
+                created += 1
+            except Exception as e:  # e.g. duplicate keys already in the graph
+                log(f"  !! {item.name}: {e}")
+    log(f"Schema: {created} constraints/indexes created")
+    return created
+
+
+def report_missing(driver, log=print) -> list:
+    """Log required constraints/indexes missing from the database."""
+    missing = missing_schema(driver)
+    for item in missing:
+        log(f"  missing {item.kind}: :{item.label}({item.prop})")
+    if missing:
+        log(f"Schema: {len(missing)} missing - run `python neo4j_schema.py --apply`")
+    return missing
+
+
+# === PROFILE ===
+
+def plan_operators(plan) -> list:
+    """Flatten an EXPLAIN plan into operator names."""
+    ops = [plan['operatorType'].split('@')[0]]
+    for child in plan.get('children', []):
+        ops += plan_operators(child)
+    return ops
+
+
+def explain(session, query: str) -> list:
+    """Operators the planner picks for a query (parameters bound to empty values)."""
+    params = {name: [] for name in PARAM_RE.findall(query)}
+    summary = session.run("EXPLAIN " + query, params).consume()
+    return plan_operators(summary.plan)
+
+
+def profile(driver) -> int:
+    """EXPLAIN every keyed query; returns how many still scan a whole label."""
+    scanning = 0
+    with driver.session() as session:
+        for source, query in all_queries():
+            if not query_requirements(query):
+                continue
+            ops = explain(session, query)
+            scans = [op for op in ops if op in SCAN_OPERATORS]
+            seeks = [op for op in ops if 'Seek' in op]
+            scanning += bool(scans)
+            status = "SCAN " + ",".join(scans) if scans else "ok"
+            print(f"{status:<24} {len(seeks)} seeks  {source}")
+    return scanning
+
+
+# === MAIN ===
+
+def main():
+    parser = argparse.ArgumentParser(description="Neo4j constraints/indexes derived from our Cypher")
+    parser.add_argument('--apply', action='store_true', help="create missing constraints and indexes")
+    parser.add_argument('--profile', action='store_true', help="EXPLAIN each keyed query")
+    args = parser.parse_args()
+
+    from neo4j_sync import neo4j_connect, neo4j_close
+    driver = neo4j_connect()
+    if args.apply:
+        apply_schema(driver)
+    elif not report_missing(driver):
+        print(f"Schema: all {len(required_schema())} required constraints/indexes present")
+    if args.profile:
+        scanning = profile(driver)
+        print(f"{scanning} queries still scan a label" if scanning else "All keyed queries use index seeks")
+    neo4j_close(driver)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,8 +9,12 @@ import os
 import json
 from datetime import datetime, timedelta
 from decimal import Decimal
+from typing import NamedTuple
 from dotenv import load_dotenv
 
+from availability_sessions import guide_activity
+from guide_identity import cursor_fetch
+
 load_dotenv()
 
 # === CONFIG ===
@@ -28,35 +32,63 @@ NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'password')
 
 SYNC_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.neo4j_sync_state.json')
+SYNC_COMMIT_LAG = int(os.getenv('SYNC_COMMIT_LAG', 30))  # seconds; rows newer than this wait a run
 
 
 # === STATE MANAGEMENT ===
+# State file: per-table (ts, pk) high-water marks plus the run in progress.
+# {"tables": {"customers": {"ts": "...", "pk": 42, "key": "customer_id"}, ...},
+#  "run": {"started": "...", "done": ["auth_users", ...]} | null,
+#  "last_sync": "..."}   <- start of the last completed run
 
 def load_sync_state() -> dict:
-    """Load last sync timestamp from file."""
+    """Load watermarks and run progress from file."""
+    state = {}
     if os.path.exists(SYNC_STATE_FILE):
         with open(SYNC_STATE_FILE, 'r') as f:
-            return json.load(f)
-    return {'last_sync': None}
+            state = json.load(f)
+    state.setdefault('tables', {})
+    state.setdefault('run', None)
+    return state
 
 
 def save_sync_state(state: dict):
-    """Save sync state to file."""
-    with open(SYNC_STATE_FILE, 'w') as f:
-        json.dump(state, f, indent=2)
+    """Atomically replace the state file (temp file, fsync, rename)."""
+    tmp = SYNC_STATE_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, SYNC_STATE_FILE)
 
 
-def get_last_sync() -> datetime:
-    """Get last sync time or default to 1 hour ago."""
-    state = load_sync_state()
-    if state.get('last_sync'):
-        return datetime.fromisoformat(state['last_sync'])
-    return datetime.now() - timedelta(hours=1)
+def table_mark(state: dict, name: str) -> dict:
+    """Table watermark; falls back to the last full run, else 1 hour ago.
+
+    A pk recorded for a different key column (the key changed) is dropped;
+    rows at the watermark timestamp are then re-read, which MERGE absorbs.
+    """
+    mark = state['tables'].get(name)
+    if mark is not None:
+        return mark if mark.get('key') == TABLES[name].pk else {'ts': mark['ts'], 'pk': None}
+    since = state.get('last_sync') or (datetime.now() - timedelta(hours=1)).isoformat()
+    return {'ts': since, 'pk': None}
+
+
+def start_run(state: dict, resume: bool) -> list:
+    """Begin a run, or continue an interrupted one; returns tables already done."""
+    if resume and state['run']:
+        log(f"Resuming run started {state['run']['started']} (done: {', '.join(state['run']['done']) or '-'})")
+    else:
+        state['run'] = {'started': datetime.now().isoformat(), 'done': []}
+    return state['run']['done']
 
 
-def update_sync_time(sync_time: datetime):
-    """Update last sync timestamp."""
-    save_sync_state({'last_sync': sync_time.isoformat()})
+def finish_run(state: dict):
+    """Mark the run complete."""
+    state['last_sync'] = state['run']['started']
+    state['run'] = None
+    save_sync_state(state)
 
 
 # === POSTGRES FUNCTIONS ===
@@ -75,6 +107,29 @@ def pg_fetch(cursor, query: str, params: tuple = None) -> list:
     return [dict(row) for row in cursor.fetchall()]
 
 
+def pg_until(cursor, lag: int = SYNC_COMMIT_LAG):
+    """Upper bound for this run: database time minus the commit lag.
+
+    Rows stamped just before a query may still be in uncommitted
+    transactions; leaving the last few seconds for the next run means the
+    watermark never passes a row we have not seen.
+    """
+    cursor.execute("SELECT now() - %s * INTERVAL '1 second' AS until", (lag,))
+    return cursor.fetchone()['until']
+
+
+def fetch_changes(cursor, name: str, query: str, mark: dict, until) -> tuple:
+    """Rows of a table changed past its watermark, and the advanced watermark."""
+    table = TABLES[name]
+    rows = pg_fetch(cursor, query, {'ts': mark['ts'], 'pk': mark.get('pk'), 'until': until})
+    if rows:
+        last = max(rows, key=lambda r: (r['_change_ts'], r[table.pk]))
+        mark = {'ts': last['_change_ts'].isoformat(), 'pk': last[table.pk], 'key': table.pk}
+    for row in rows:
+        del row['_change_ts']
+    return serialize_data(rows), mark
+
+
 def pg_close(conn, cursor):
     """Close PostgreSQL connection."""
     cursor.close()
@@ -103,37 +158,98 @@ def neo4j_batch(driver, query: str, data: list, batch_size: int = 500):
             session.run(query, {'batch': batch})
 
 
+class Upserted(NamedTuple):
+    keys: list              # every node key upserted
+    created: list           # keys of the nodes that did not exist before
+
+
+def neo4j_upsert(driver, query: str, data: list, key: str, batch_size: int = 500) -> Upserted:
+    """Run a batched `MERGE (n ...) ON CREATE SET n._created = true ...` and collect created keys."""
+    query += f"""
+    WITH n WHERE n._created
+    REMOVE n._created
+    RETURN n.{key} AS key
+    """
+    created = []
+    with driver.session() as session:
+        for i in range(0, len(data), batch_size):
+            created += [record['key'] for record in session.run(query, {'batch': data[i:i + batch_size]})]
+    return Upserted([row[key] for row in data], created)
+
+
 def neo4j_close(driver):
     """Close Neo4j driver."""
     driver.close()
 
 
 # === INCREMENTAL QUERIES ===
+# Each incremental table has a primary key and the timestamp columns that
+# mark a change; its last change is the greatest of them.
+
+class Table(NamedTuple):
+    pk: str
+    ts_columns: tuple
+
+    @property
+    def change_ts(self) -> str:
+        if len(self.ts_columns) == 1:
+            return self.ts_columns[0]
+        return f"GREATEST({', '.join(self.ts_columns)})"
+
+
+TABLES = {
+    'auth_users': Table('id', ('created_at', 'updated_at')),
+    'customers': Table('customer_id', ('created_at', 'updated_at', 'deleted_at')),
+    'customer_profiles': Table('profile_id', ('created_at', 'updated_at')),
+    'consultations': Table('id', ('created_at', 'updated_at')),
+    'feedback': Table('id', ('created_at', 'updated_at')),
+    'user_wallets': Table('user_id', ('created_at', 'updated_at')),
+    'payments': Table('payment_order_id', ('created_at', 'updated_at')),
+    'wallet_orders': Table('order_id', ('created_at',)),
+    'transactions': Table('transaction_id', ('created_at',)),
+    'offer_reservations': Table('reservation_id', ('created_at', 'updated_at')),
+}
+
+
+def window(table: Table) -> str:
+    """Rows changed after the (ts, pk) watermark and before %(until)s.
 
-def q_auth_users(since: datetime) -> str:
+    The OR over the raw columns keeps their indexes usable; the row
+    comparison then breaks ties on the primary key.
+    """
+    any_recent = " OR ".join(f"{col} >= %(ts)s" for col in table.ts_columns)
+    return f"""({any_recent})
+      AND {table.change_ts} < %(until)s
+      AND ({table.change_ts} > %(ts)s OR %(pk)s IS NULL OR {table.pk} > %(pk)s)"""
+
+
+def q_auth_users() -> str:
     """Query for new/updated auth users."""
+    t = TABLES['auth_users']
     return f"""
-    SELECT id, phone_number, is_active, is_test_user, created_at, updated_at
+    SELECT id, phone_number, is_active, is_test_user, created_at, updated_at, {t.change_ts} AS _change_ts
     FROM auth.auth_users
-    WHERE deleted_at IS NULL AND (created_at >= %s OR updated_at >= %s)
+    WHERE deleted_at IS NULL AND {window(t)}
     """
 
 
-def q_customers(since: datetime) -> str:
+def q_customers() -> str:
     """Query for new/updated customers (including deleted)."""
+    t = TABLES['customers']
     return f"""
-    SELECT customer_id, phone_number, country_code, x_auth_id, created_at, updated_at, deleted_at
+    SELECT customer_id, phone_number, country_code, x_auth_id, created_at, updated_at, deleted_at, {t.change_ts} AS _change_ts
     FROM customers.customer
-    WHERE created_at >= %s OR updated_at >= %s OR deleted_at >= %s
+    WHERE {window(t)}
     """
 
 
-def q_customer_profiles(since: datetime) -> str:
+def q_customer_profiles() -> str:
     """Query for new/updated customer profiles."""
+    t = TABLES['customer_profiles']
     return f"""
-    SELECT profile_id, customer_id, name, dob, birth_city, zodiac_sign, gender, created_at, updated_at
+    SELECT profile_id, customer_id, name, dob, birth_city, zodiac_sign, gender, created_at, updated_at, {t.change_ts} AS _change_ts
     FROM customers.customer_profile
-    WHERE deleted_at IS NULL AND (created_at >= %s OR updated_at >= %s)
+    WHERE deleted_at IS NULL AND {window(t)}
     """
 
 
@@ -147,145 +263,157 @@ def q_guides() -> str:
     """
 
 
-def q_guide_activity() -> str:
-    """Query guide activity from audit log (last 30 days)."""
-    return """
-    SELECT
-        (original_data->>'id')::int as guide_id,
-        COUNT(DISTINCT DATE(action_tstamp)) as days_active,
-        COUNT(*) as state_changes_30d,
-        MAX(action_tstamp) as last_activity
-    FROM audit.logged_actions
-    WHERE table_name = 'guide_profile'
-      AND original_data->>'availability_state' IS DISTINCT FROM new_data->>'availability_state'
-      AND action_tstamp >= NOW() - INTERVAL '30 days'
-    GROUP BY original_data->>'id'
-    """
-
-
-def q_consultations(since: datetime) -> str:
+def q_consultations() -> str:
     """Query for new/updated consultations."""
+    t = TABLES['consultations']
     return f"""
     SELECT id, customer_id, guide_id, mode, state, order_id,
            base_rate_per_minute, call_duration_seconds, is_quick_connect_request,
-           promotional, free, created_at, completed_at, requested_at, accepted_at, updated_at
+           promotional, free, created_at, completed_at, requested_at, accepted_at, updated_at, {t.change_ts} AS _change_ts
     FROM consultation.consultation
-    WHERE deleted_at IS NULL AND (created_at >= %s OR updated_at >= %s)
+    WHERE deleted_at IS NULL AND {window(t)}
     """
 
 
-def q_feedback(since: datetime) -> str:
+def q_feedback() -> str:
     """Query for new/updated feedback."""
+    t = TABLES['feedback']
     return f"""
-    SELECT id, consultation_id, customer_id, rating, feedback, status, created_at, updated_at
+    SELECT id, consultation_id, customer_id, rating, feedback, status, created_at, updated_at, {t.change_ts} AS _change_ts
     FROM consultation.feedback
-    WHERE deleted_at IS NULL AND (created_at >= %s OR updated_at >= %s)
+    WHERE deleted_at IS NULL AND {window(t)}
     """
 
 
-def q_user_wallets(since: datetime) -> str:
+def q_user_wallets() -> str:
     """Query for new/updated user wallets."""
+    t = TABLES['user_wallets']
     return f"""
-    SELECT user_id, name, phone_number, real_cash, virtual_cash, recharge_count, created_at, updated_at
+    SELECT user_id, name, phone_number, real_cash, virtual_cash, recharge_count, created_at, updated_at, {t.change_ts} AS _change_ts
     FROM wallet.user_wallets
-    WHERE deleted_at IS NULL AND (created_at >= %s OR updated_at >= %s)
+    WHERE deleted_at IS NULL AND {window(t)}
     """
 
 
-def q_payments(since: datetime) -> str:
+def q_payments() -> str:
     """Query for new/updated payments."""
+    t = TABLES['payments']
     return f"""
-    SELECT payment_order_id, user_id, amount, status, payment_method, gateway_id, created_at, updated_at
+    SELECT payment_order_id, user_id, amount, status, payment_method, gateway_id, created_at, updated_at, {t.change_ts} AS _change_ts
     FROM wallet.payment_orders
-    WHERE created_at >= %s OR updated_at >= %s
+    WHERE {window(t)}
     """
 
 
-def q_wallet_orders(since: datetime) -> str:
+def q_wallet_orders() -> str:
     """Query for new/updated wallet orders."""
+    t = TABLES['wallet_orders']
     return f"""
     SELECT order_id, user_id, consultant_id, service_type, minutes_ordered,
-           price_per_minute, final_amount, consultant_share, status, created_at
+           price_per_minute, final_amount, consultant_share, status, created_at, {t.change_ts} AS _change_ts
     FROM wallet.wallet_orders
-    WHERE created_at >= %s
+    WHERE {window(t)}
     """
 
 
-def q_transactions(since: datetime) -> str:
+def q_transactions() -> str:
     """Query for new transactions."""
+    t = TABLES['transactions']
     return f"""
     SELECT id, transaction_id, user_id, order_id, type, amount,
-           real_cash_delta, virtual_cash_delta, is_promotional, created_at
+           real_cash_delta, virtual_cash_delta, is_promotional, created_at, {t.change_ts} AS _change_ts
     FROM wallet.wallet_transactions
-    WHERE created_at >= %s
+    WHERE {window(t)}
     """
 
 
-def q_offer_reservations(since: datetime) -> str:
+def q_offer_reservations() -> str:
     """Query for new/updated offer reservations."""
+    t = TABLES['offer_reservations']
     return f"""
     SELECT reservation_id, offer_id, user_id, reservation_status,
-           original_amount, bonus_amount, consultation_id, created_at, updated_at
+           original_amount, bonus_amount, consultation_id, created_at, updated_at, {t.change_ts} AS _change_ts
     FROM offers.offer_reservations
-    WHERE deleted_at IS NULL AND (created_at >= %s OR updated_at >= %s)
+    WHERE deleted_at IS NULL AND {window(t)}
     """
 
 
 # === SYNC FUNCTIONS ===
 
-def sync_auth_users(cursor, driver, since: datetime) -> int:
+def sync_auth_users(cursor, driver, mark: dict, until) -> tuple:
     """Sync auth users."""
-    data = serialize_data(pg_fetch(cursor, q_auth_users(since), (since, since)))
+    data, mark = fetch_changes(cursor, 'auth_users', q_auth_users(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_auth_users(driver, data), mark
+
+
+def upsert_auth_users(driver, data: list) -> list:
+    """Upsert AuthUser nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:AuthUser {id: row.id})
+    ON CREATE SET n._created = true
     SET n.phone_number = row.phone_number, n.is_active = row.is_active,
         n.is_test_user = row.is_test_user, n.created_at = row.created_at
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'id')
 
 
-def sync_customers(cursor, driver, since: datetime) -> int:
+def sync_customers(cursor, driver, mark: dict, until) -> tuple:
     """Sync customers (including deleted)."""
-    data = serialize_data(pg_fetch(cursor, q_customers(since), (since, since, since)))
+    data, mark = fetch_changes(cursor, 'customers', q_customers(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_customers(driver, data), mark
+
+
+def upsert_customers(driver, data: list) -> list:
+    """Upsert Customer nodes (including deleted); returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:Customer {customer_id: row.customer_id})
+    ON CREATE SET n._created = true
     SET n.phone_number = row.phone_number, n.country_code = row.country_code,
         n.x_auth_id = row.x_auth_id, n.created_at = row.created_at,
         n.deleted_at = row.deleted_at,
         n.is_deleted = CASE WHEN row.deleted_at IS NOT NULL THEN true ELSE false END
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'customer_id')
 
 
-def sync_customer_profiles(cursor, driver, since: datetime) -> int:
+def sync_customer_profiles(cursor, driver, mark: dict, until) -> tuple:
     """Sync customer profiles."""
-    data = serialize_data(pg_fetch(cursor, q_customer_profiles(since), (since, since)))
+    data, mark = fetch_changes(cursor, 'customer_profiles', q_customer_profiles(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_customer_profiles(driver, data), mark
+
+
+def upsert_customer_profiles(driver, data: list) -> list:
+    """Upsert CustomerProfile nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:CustomerProfile {profile_id: row.profile_id})
+    ON CREATE SET n._created = true
     SET n.customer_id = row.customer_id, n.name = row.name, n.dob = row.dob,
         n.birth_city = row.birth_city, n.zodiac_sign = row.zodiac_sign, n.gender = row.gender
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'profile_id')
 
 
-def sync_guides(cursor, driver) -> int:
+def sync_guides(cursor, driver) -> Upserted:
     """Sync all guides (always full)."""
     data = serialize_data(pg_fetch(cursor, q_guides()))
+    return upsert_guides(driver, data)
+
+
+def upsert_guides(driver, data: list) -> list:
+    """Upsert Guide nodes (including deleted); returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:Guide {id: row.id})
+    ON CREATE SET n._created = true
     SET n.full_name = row.full_name, n.phone_number = row.phone_number,
         n.x_auth_id = row.x_auth_id, n.availability_state = row.availability_state,
         n.chat_enabled = row.chat_enabled, n.voice_enabled = row.voice_enabled,
@@ -294,15 +422,15 @@ def sync_guides(cursor, driver) -> int:
         n.created_at = row.created_at, n.deleted_at = row.deleted_at,
         n.is_deleted = CASE WHEN row.deleted_at IS NOT NULL THEN true ELSE false END
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'id')
 
 
-def sync_guide_activity(cursor, driver) -> int:
-    """Sync guide activity from audit log."""
-    data = serialize_data(pg_fetch(cursor, q_guide_activity()))
+def sync_guide_activity(cursor, driver) -> Upserted:
+    """Sync guide activity from the availability session store (fed by the audit log); creates no nodes."""
+    with cursor.connection.cursor() as plain:
+        data = serialize_data(guide_activity(cursor_fetch(plain)))
     if not data:
-        return 0
+        return Upserted([], [])
     query = """
     UNWIND $batch AS row
     MATCH (g:Guide {id: row.guide_id})
@@ -311,17 +439,23 @@ def sync_guide_activity(cursor, driver) -> int:
         g.last_activity = row.last_activity
     """
     neo4j_batch(driver, query, data)
-    return len(data)
+    return Upserted([row['guide_id'] for row in data], [])
 
 
-def sync_consultations(cursor, driver, since: datetime) -> int:
+def sync_consultations(cursor, driver, mark: dict, until) -> tuple:
     """Sync consultations."""
-    data = serialize_data(pg_fetch(cursor, q_consultations(since), (since, since)))
+    data, mark = fetch_changes(cursor, 'consultations', q_consultations(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_consultations(driver, data), mark
+
+
+def upsert_consultations(driver, data: list) -> list:
+    """Upsert Consultation nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:Consultation {id: row.id})
+    ON CREATE SET n._created = true
     SET n.customer_id = row.customer_id, n.guide_id = row.guide_id,
         n.mode = row.mode, n.state = row.state, n.order_id = row.order_id,
         n.duration_seconds = row.call_duration_seconds,
@@ -329,220 +463,216 @@ def sync_consultations(cursor, driver, since: datetime) -> int:
         n.promotional = row.promotional, n.created_at = row.created_at,
         n.requested_at = row.requested_at, n.accepted_at = row.accepted_at
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'id')
 
 
-def sync_feedback(cursor, driver, since: datetime) -> int:
+def sync_feedback(cursor, driver, mark: dict, until) -> tuple:
     """Sync feedback."""
-    data = serialize_data(pg_fetch(cursor, q_feedback(since), (since, since)))
+    data, mark = fetch_changes(cursor, 'feedback', q_feedback(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_feedback(driver, data), mark
+
+
+def upsert_feedback(driver, data: list) -> list:
+    """Upsert Feedback nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:Feedback {id: row.id})
+    ON CREATE SET n._created = true
     SET n.consultation_id = row.consultation_id, n.customer_id = row.customer_id,
         n.rating = row.rating, n.feedback = row.feedback, n.status = row.status
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'id')
 
 
-def sync_user_wallets(cursor, driver, since: datetime) -> int:
+def sync_user_wallets(cursor, driver, mark: dict, until) -> tuple:
     """Sync user wallets."""
-    data = serialize_data(pg_fetch(cursor, q_user_wallets(since), (since, since)))
+    data, mark = fetch_changes(cursor, 'user_wallets', q_user_wallets(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_user_wallets(driver, data), mark
+
+
+def upsert_user_wallets(driver, data: list) -> list:
+    """Upsert CustomerWallet nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:CustomerWallet {user_id: row.user_id})
+    ON CREATE SET n._created = true
     SET n.name = row.name, n.phone_number = row.phone_number,
         n.real_cash = row.real_cash, n.virtual_cash = row.virtual_cash,
         n.recharge_count = row.recharge_count
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'user_id')
 
 
-def sync_payments(cursor, driver, since: datetime) -> int:
+def sync_payments(cursor, driver, mark: dict, until) -> tuple:
     """Sync payments."""
-    data = serialize_data(pg_fetch(cursor, q_payments(since), (since, since)))
+    data, mark = fetch_changes(cursor, 'payments', q_payments(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_payments(driver, data), mark
+
+
+def upsert_payments(driver, data: list) -> list:
+    """Upsert Payment nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:Payment {payment_order_id: row.payment_order_id})
+    ON CREATE SET n._created = true
     SET n.user_id = row.user_id, n.amount = row.amount,
         n.status = row.status, n.payment_method = row.payment_method,
         n.created_at = row.created_at
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'payment_order_id')
 
 
-def sync_wallet_orders(cursor, driver, since: datetime) -> int:
+def sync_wallet_orders(cursor, driver, mark: dict, until) -> tuple:
     """Sync wallet orders."""
-    data = serialize_data(pg_fetch(cursor, q_wallet_orders(since), (since,)))
+    data, mark = fetch_changes(cursor, 'wallet_orders', q_wallet_orders(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_wallet_orders(driver, data), mark
+
+
+def upsert_wallet_orders(driver, data: list) -> list:
+    """Upsert WalletOrder nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:WalletOrder {order_id: row.order_id})
+    ON CREATE SET n._created = true
     SET n.user_id = row.user_id, n.consultant_id = row.consultant_id,
         n.service_type = row.service_type, n.minutes_ordered = row.minutes_ordered,
         n.final_amount = row.final_amount, n.consultant_share = row.consultant_share,
         n.status = row.status, n.created_at = row.created_at
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'order_id')
 
 
-def sync_transactions(cursor, driver, since: datetime) -> int:
+def sync_transactions(cursor, driver, mark: dict, until) -> tuple:
     """Sync transactions."""
-    data = serialize_data(pg_fetch(cursor, q_transactions(since), (since,)))
+    data, mark = fetch_changes(cursor, 'transactions', q_transactions(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_transactions(driver, data), mark
+
+
+def upsert_transactions(driver, data: list) -> list:
+    """Upsert Transaction nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:Transaction {transaction_id: row.transaction_id})
+    ON CREATE SET n._created = true
     SET n.user_id = row.user_id, n.order_id = row.order_id,
         n.type = row.type, n.amount = row.amount,
         n.real_cash_delta = row.real_cash_delta, n.virtual_cash_delta = row.virtual_cash_delta,
         n.is_promotional = row.is_promotional
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'transaction_id')
 
 
-def sync_offer_reservations(cursor, driver, since: datetime) -> int:
+def sync_offer_reservations(cursor, driver, mark: dict, until) -> tuple:
     """Sync offer reservations."""
-    data = serialize_data(pg_fetch(cursor, q_offer_reservations(since), (since, since)))
+    data, mark = fetch_changes(cursor, 'offer_reservations', q_offer_reservations(), mark, until)
     if not data:
-        return 0
+        return Upserted([], []), mark
+    return upsert_offer_reservations(driver, data), mark
+
+
+def upsert_offer_reservations(driver, data: list) -> list:
+    """Upsert OfferReservation nodes; returns Upserted keys."""
     query = """
     UNWIND $batch AS row
     MERGE (n:OfferReservation {reservation_id: row.reservation_id})
+    ON CREATE SET n._created = true
     SET n.offer_id = row.offer_id, n.user_id = row.user_id,
         n.reservation_status = row.reservation_status,
         n.bonus_amount = row.bonus_amount, n.consultation_id = row.consultation_id
     """
-    neo4j_batch(driver, query, data)
-    return len(data)
+    return neo4j_upsert(driver, query, data, 'reservation_id')
 
 
 # === RELATIONSHIP SYNC ===
+# Each link is keyed by the node holding the foreign key ("owner"). New or
+# updated owners link forward to their target; targets created this run link
+# back to existing owners, so a target that arrives after its owner is still
+# joined. Updated targets (e.g. a CustomerWallet after every spend) are
+# already linked and are not walked back over their owners' history.
+
+class Link(NamedTuple):
+    rel: str
+    owner: str              # label holding the foreign key
+    owner_key: str
+    fk: str                 # owner property referencing target_key
+    target: str
+    target_key: str
+    owner_is_start: bool    # (owner)-[rel]->(target), else (target)-[rel]->(owner)
+    fk_expr: str = ''       # Cypher for the lookup value, default o.<fk>
+    where: str = ''         # extra owner predicate
+    reverse: bool = True    # also link from new target keys
+
+
+LINKS = [
+    Link('HAS_AUTH', 'Customer', 'customer_id', 'x_auth_id', 'AuthUser', 'id', True),
+    Link('HAS_WALLET', 'Customer', 'customer_id', 'customer_id', 'CustomerWallet', 'user_id', True),
+    Link('HAS_PROFILE', 'CustomerProfile', 'profile_id', 'customer_id', 'Customer', 'customer_id', False),
+    Link('BOOKED', 'Consultation', 'id', 'customer_id', 'Customer', 'customer_id', False),
+    # Guides are fully re-synced every run, so consultations always find theirs
+    Link('WITH_GUIDE', 'Consultation', 'id', 'guide_id', 'Guide', 'id', True, reverse=False),
+    Link('PAID_VIA', 'Consultation', 'id', 'order_id', 'WalletOrder', 'order_id', True,
+         where='o.order_id > 0'),
+    Link('HAS_FEEDBACK', 'Feedback', 'id', 'consultation_id', 'Consultation', 'id', False),
+    Link('MADE_PAYMENT', 'Payment', 'payment_order_id', 'user_id', 'Customer', 'customer_id', False),
+    Link('CREDITED_TO', 'Payment', 'payment_order_id', 'user_id', 'CustomerWallet', 'user_id', True),
+    Link('DEBITED_FROM', 'WalletOrder', 'order_id', 'user_id', 'CustomerWallet', 'user_id', True),
+    Link('CREDITED_TO', 'WalletOrder', 'order_id', 'consultant_id', 'GuideWallet', 'consultant_id', True),
+    Link('HAS_TRANSACTION', 'Transaction', 'transaction_id', 'user_id', 'CustomerWallet', 'user_id', False,
+         fk_expr='toInteger(o.user_id)'),
+    Link('FOR_ORDER', 'Transaction', 'transaction_id', 'order_id', 'WalletOrder', 'order_id', True,
+         where='o.order_id > 0'),
+    Link('RESERVED', 'OfferReservation', 'reservation_id', 'user_id', 'Customer', 'customer_id', False),
+    Link('FOR_OFFER', 'OfferReservation', 'reservation_id', 'offer_id', 'Offer', 'offer_id', True),
+]
+
+
+def merge_clause(link: Link) -> str:
+    """MERGE pattern for the link in its stored direction."""
+    if link.owner_is_start:
+        return f"MERGE (o)-[:{link.rel}]->(t)"
+    return f"MERGE (t)-[:{link.rel}]->(o)"
+
+
+def link_forward_query(link: Link) -> str:
+    """Link owners in $batch to their targets."""
+    fk_value = link.fk_expr or f"o.{link.fk}"
+    where = f" AND {link.where}" if link.where else ""
+    return f"""
+    UNWIND $batch AS key
+    MATCH (o:{link.owner} {{{link.owner_key}: key}})
+    WHERE o.{link.fk} IS NOT NULL{where}
+    MATCH (t:{link.target} {{{link.target_key}: {fk_value}}})
+    {merge_clause(link)}
+    """
+
+
+def link_reverse_query(link: Link) -> str:
+    """Link targets in $batch to the owners referencing them."""
+    return f"""
+    UNWIND $batch AS key
+    MATCH (t:{link.target} {{{link.target_key}: key}})
+    MATCH (o:{link.owner} {{{link.fk}: key}})
+    {merge_clause(link)}
+    """
+
 
-def sync_new_relationships(driver, since: datetime):
-    """Create relationships for newly added nodes."""
-    queries = [
-        # Customer -> Auth
-        """
-        MATCH (c:Customer) WHERE c.x_auth_id IS NOT NULL
-        AND NOT (c)-[:HAS_AUTH]->()
-        MATCH (a:AuthUser {id: c.x_auth_id})
-        MERGE (c)-[:HAS_AUTH]->(a)
-        """,
-        # Customer -> Wallet
-        """
-        MATCH (c:Customer)
-        WHERE NOT (c)-[:HAS_WALLET]->()
-        MATCH (w:CustomerWallet {user_id: c.customer_id})
-        MERGE (c)-[:HAS_WALLET]->(w)
-        """,
-        # Customer -> Profile
-        """
-        MATCH (p:CustomerProfile)
-        WHERE NOT ()-[:HAS_PROFILE]->(p)
-        MATCH (c:Customer {customer_id: p.customer_id})
-        MERGE (c)-[:HAS_PROFILE]->(p)
-        """,
-        # Consultation -> Customer
-        """
-        MATCH (con:Consultation) WHERE con.customer_id IS NOT NULL
-        AND NOT ()-[:BOOKED]->(con)
-        MATCH (c:Customer {customer_id: con.customer_id})
-        MERGE (c)-[:BOOKED]->(con)
-        """,
-        # Consultation -> Guide
-        """
-        MATCH (con:Consultation) WHERE con.guide_id IS NOT NULL
-        AND NOT (con)-[:WITH_GUIDE]->()
-        MATCH (g:Guide {id: con.guide_id})
-        MERGE (con)-[:WITH_GUIDE]->(g)
-        """,
-        # Consultation -> WalletOrder
-        """
-        MATCH (con:Consultation) WHERE con.order_id IS NOT NULL AND con.order_id > 0
-        AND NOT (con)-[:PAID_VIA]->()
-        MATCH (wo:WalletOrder {order_id: con.order_id})
-        MERGE (con)-[:PAID_VIA]->(wo)
-        """,
-        # Feedback -> Consultation
-        """
-        MATCH (f:Feedback)
-        WHERE NOT ()-[:HAS_FEEDBACK]->(f)
-        MATCH (c:Consultation {id: f.consultation_id})
-        MERGE (c)-[:HAS_FEEDBACK]->(f)
-        """,
-        # Payment -> Customer
-        """
-        MATCH (p:Payment) WHERE p.user_id IS NOT NULL
-        AND NOT ()-[:MADE_PAYMENT]->(p)
-        MATCH (c:Customer {customer_id: p.user_id})
-        MERGE (c)-[:MADE_PAYMENT]->(p)
-        """,
-        # Payment -> Wallet
-        """
-        MATCH (p:Payment) WHERE p.user_id IS NOT NULL
-        AND NOT (p)-[:CREDITED_TO]->()
-        MATCH (w:CustomerWallet {user_id: p.user_id})
-        MERGE (p)-[:CREDITED_TO]->(w)
-        """,
-        # WalletOrder -> CustomerWallet
-        """
-        MATCH (wo:WalletOrder) WHERE wo.user_id IS NOT NULL
-        AND NOT (wo)-[:DEBITED_FROM]->()
-        MATCH (w:CustomerWallet {user_id: wo.user_id})
-        MERGE (wo)-[:DEBITED_FROM]->(w)
-        """,
-        # WalletOrder -> GuideWallet
-        """
-        MATCH (wo:WalletOrder) WHERE wo.consultant_id IS NOT NULL
-        AND NOT (wo)-[:CREDITED_TO]->()
-        MATCH (gw:GuideWallet {consultant_id: wo.consultant_id})
-        MERGE (wo)-[:CREDITED_TO]->(gw)
-        """,
-        # Transaction -> Wallet
-        """
-        MATCH (t:Transaction) WHERE t.user_id IS NOT NULL
-        AND NOT ()-[:HAS_TRANSACTION]->(t)
-        MATCH (w:CustomerWallet {user_id: toInteger(t.user_id)})
-        MERGE (w)-[:HAS_TRANSACTION]->(t)
-        """,
-        # Transaction -> WalletOrder
-        """
-        MATCH (t:Transaction) WHERE t.order_id IS NOT NULL AND t.order_id > 0
-        AND NOT (t)-[:FOR_ORDER]->()
-        MATCH (wo:WalletOrder {order_id: t.order_id})
-        MERGE (t)-[:FOR_ORDER]->(wo)
-        """,
-        # OfferReservation -> Customer
-        """
-        MATCH (r:OfferReservation) WHERE r.user_id IS NOT NULL
-        AND NOT ()-[:RESERVED]->(r)
-        MATCH (c:Customer {customer_id: r.user_id})
-        MERGE (c)-[:RESERVED]->(r)
-        """,
-        # OfferReservation -> Offer
-        """
-        MATCH (r:OfferReservation) WHERE r.offer_id IS NOT NULL
-        AND NOT (r)-[:FOR_OFFER]->()
-        MATCH (o:Offer {offer_id: r.offer_id})
-        MERGE (r)-[:FOR_OFFER]->(o)
-        """
-    ]
-    for q in queries:
-        neo4j_run(driver, q)
+def sync_new_relationships(driver, label: str, upserted: Upserted):
+    """Link upserted nodes of label forward, and the created ones back to their owners."""
+    for link in LINKS:
+        if link.owner == label and upserted.keys:
+            neo4j_batch(driver, link_forward_query(link), upserted.keys)
+        if link.reverse and link.target == label and upserted.created:
+            neo4j_batch(driver, link_reverse_query(link), upserted.created)
 
 
 # === SERIALIZATION ===
@@ -574,81 +704,89 @@ def log(msg: str):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
 
-def run_sync():
+def run_sync(resume: bool = False):
     """Main sync orchestration."""
-    since = get_last_sync()
-    sync_start = datetime.now()
-
-    log(f"Syncing changes since: {since}")
+    state = load_sync_state()
+    done = start_run(state, resume)
 
     log("Connecting to PostgreSQL...")
     pg_conn, pg_cursor = pg_connect()
+    until = pg_until(pg_cursor)
 
     log("Connecting to Neo4j...")
     neo4j_driver = neo4j_connect()
+    check_schema(neo4j_driver)
 
-    # Sync nodes
-    stats = sync_all_nodes(pg_cursor, neo4j_driver, since)
-
-    # Sync relationships
-    log("Syncing relationships...")
-    sync_new_relationships(neo4j_driver, since)
-
-    # Update sync time
-    update_sync_time(sync_start)
+    # Sync nodes and their relationships, table by table
+    stats = sync_all_nodes(pg_cursor, neo4j_driver, state, until, skip=done)
+    finish_run(state)
 
     log("Closing connections...")
     pg_close(pg_conn, pg_cursor)
     neo4j_close(neo4j_driver)
 
     log("=== SYNC COMPLETE ===")
-    for name, count in stats.items():
+    for label, count in stats.items():
         if count > 0:
-            log(f"  {name}: {count} updated")
-
-
-def sync_all_nodes(cursor, driver, since: datetime) -> dict:
-    """Sync all node types and return stats."""
+            log(f"  {label}: {count} updated")
+
+
+def check_schema(driver):
+    """Warn about missing constraints/indexes (lookups would scan whole labels)."""
+    from neo4j_schema import report_missing
+    report_missing(driver, log)
+
+
+# (state key, label, log name, sync function); keys in TABLES are incremental
+NODE_SYNCS = [
+    ('auth_users', 'AuthUser', 'AuthUsers', sync_auth_users),
+    ('customers', 'Customer', 'Customers', sync_customers),
+    ('customer_profiles', 'CustomerProfile', 'CustomerProfiles', sync_customer_profiles),
+    ('guides', 'Guide', 'Guides', sync_guides),
+    ('guide_activity', 'GuideActivity', 'Guide Activity', sync_guide_activity),
+    ('consultations', 'Consultation', 'Consultations', sync_consultations),
+    ('feedback', 'Feedback', 'Feedback', sync_feedback),
+    ('user_wallets', 'CustomerWallet', 'UserWallets', sync_user_wallets),
+    ('payments', 'Payment', 'Payments', sync_payments),
+    ('wallet_orders', 'WalletOrder', 'WalletOrders', sync_wallet_orders),
+    ('transactions', 'Transaction', 'Transactions', sync_transactions),
+    ('offer_reservations', 'OfferReservation', 'OfferReservations', sync_offer_reservations),
+]
+
+
+def sync_table(cursor, driver, state: dict, name: str, label: str, sync_fn, until) -> int:
+    """Sync one table, link its nodes, then commit its watermark."""
+    if name in TABLES:
+        upserted, mark = sync_fn(cursor, driver, table_mark(state, name), until)
+    else:
+        upserted, mark = sync_fn(cursor, driver), None
+    sync_new_relationships(driver, label, upserted)
+    if mark:
+        state['tables'][name] = mark
+    state['run']['done'].append(name)
+    save_sync_state(state)
+    return len(upserted.keys)
+
+
+def sync_all_nodes(cursor, driver, state: dict, until, skip: list = ()) -> dict:
+    """Sync every table not in skip and return update counts by label."""
     stats = {}
+    for name, label, title, sync_fn in NODE_SYNCS:
+        if name in skip:
+            log(f"Skipping {title} (done before interruption)")
+            continue
+        log(f"Syncing {title}...")
+        stats[label] = sync_table(cursor, driver, state, name, label, sync_fn, until)
+    return stats
 
-    log("Syncing AuthUsers...")
-    stats['AuthUsers'] = sync_auth_users(cursor, driver, since)
-
-    log("Syncing Customers...")
-    stats['Customers'] = sync_customers(cursor, driver, since)
-
-    log("Syncing CustomerProfiles...")
-    stats['CustomerProfiles'] = sync_customer_profiles(cursor, driver, since)
-
-    log("Syncing Guides...")
-    stats['Guides'] = sync_guides(cursor, driver)
-
-    log("Syncing Guide Activity...")
-    stats['GuideActivity'] = sync_guide_activity(cursor, driver)
-
-    log("Syncing Consultations...")
-    stats['Consultations'] = sync_consultations(cursor, driver, since)
-
-    log("Syncing Feedback...")
-    stats['Feedback'] = sync_feedback(cursor, driver, since)
-
-    log("Syncing UserWallets...")
-    stats['UserWallets'] = sync_user_wallets(cursor, driver, since)
-
-    log("Syncing Payments...")
-    stats['Payments'] = sync_payments(cursor, driver, since)
-
-    log("Syncing WalletOrders...")
-    stats['WalletOrders'] = sync_wallet_orders(cursor, driver, since)
-
-    log("Syncing Transactions...")
-    stats['Transactions'] = sync_transactions(cursor, driver, since)
-
-    log("Syncing OfferReservations...")
-    stats['OfferReservations'] = sync_offer_reservations(cursor, driver, since)
 
-    return stats
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Incremental PostgreSQL -> Neo4j sync")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run, skipping tables it already finished")
+    run_sync(resume=parser.parse_args().resume)
 
 
 if __name__ == '__main__':
-    run_sync()
+    main()
@@ -124,10 +124,11 @@ class OffersDashboard(App):
     def _update_display(self) -> None:
         view = ViewRegistry.get(self.current_view_id)
         rows = view.format_rows(self.view_data)
+        row_keys = view.get_row_keys(self.view_data) if hasattr(view, 'get_row_keys') else {}
         first_focused = False
         for table_id, table_rows in rows.items():
             table = self.query_one(f"#{table_id}", DataTable)
-            update_table(table, table_rows)
+            update_table(table, table_rows, row_keys.get(table_id))
             # Focus only the first table with cursor for arrow key navigation
             if not first_focused and hasattr(view, 'get_containers'):
                 for cfg in view.get_containers():
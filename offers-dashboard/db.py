@@ -1,11 +1,19 @@
 """
 Database functions - all stateless, under 20 lines each.
+Read-mostly analytics are served from a TTL cache; writes clear it.
 """
 
 import os
+import sys
 import psycopg2
 from dotenv import load_dotenv
 
+# query_cache is shared with the main dashboard at the repo root; appended so
+# this app's own queries/db modules still win.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from query_cache import QueryCache, CACHE_ENABLED
+from queries import CACHE_TTLS
+
 load_dotenv()
 
 DB_CONFIG = {
@@ -17,6 +25,8 @@ DB_CONFIG = {
     'sslmode': os.getenv('DB_SSLMODE', 'require')
 }
 
+query_cache = QueryCache(CACHE_TTLS if CACHE_ENABLED else {})
+
 
 def get_connection():
     """Create a new database connection."""
@@ -24,7 +34,12 @@ def get_connection():
 
 
 def execute_query(query: str, params: tuple = None) -> list:
-    """Execute a query and return all results."""
+    """Execute a query and return all results, cached per CACHE_TTLS."""
+    return query_cache.get(query, params, lambda: _execute_uncached(query, params))
+
+
+def _execute_uncached(query: str, params: tuple = None) -> list:
+    """Execute a query on a fresh connection."""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(query, params) if params else cursor.execute(query)
@@ -43,6 +58,7 @@ def execute_update(query: str, params: tuple = None) -> int:
     conn.commit()
     cursor.close()
     conn.close()
+    query_cache.invalidate()
     return rowcount
 
 
@@ -55,6 +71,7 @@ def execute_insert_returning(query: str, params: tuple = None):
     conn.commit()
     cursor.close()
     conn.close()
+    query_cache.invalidate()
     return result
 
 
@@ -2,6 +2,7 @@
 Helper functions for the dashboard.
 """
 
+from typing import Optional
 from textual.widgets import DataTable
 
 
@@ -13,8 +14,67 @@ def setup_table(table: DataTable, columns: list, cursor: bool = False) -> None:
         table.cursor_type = "row"
 
 
-def update_table(table: DataTable, rows: list) -> None:
-    """Update table with new rows."""
-    table.clear()
-    for row in rows:
-        table.add_row(*row)
+def update_table(table: DataTable, rows: list, keys: list = None) -> None:
+    """Update table in place, touching only changed cells and rows.
+
+    Rows are matched by key when given, else by position.
+    Cursor and scroll position survive the update.
+    """
+    cursor_key = _cursor_row_key(table)
+    scroll_x, scroll_y = table.scroll_x, table.scroll_y
+    _sync_rows(table, rows, _row_keys(rows, keys))
+    _restore_cursor(table, cursor_key)
+    table.scroll_to(scroll_x, scroll_y, animate=False)
+
+
+def _row_keys(rows: list, keys: list = None) -> list:
+    """Use given keys if unique, else fall back to row positions."""
+    if keys is not None:
+        keys = [str(k) for k in keys]
+        if len(keys) == len(rows) and len(set(keys)) == len(keys):
+            return keys
+    return [str(i) for i in range(len(rows))]
+
+
+def _sync_rows(table: DataTable, rows: list, keys: list) -> None:
+    """Remove stale rows, update changed cells, add new rows, then reorder."""
+    wanted = set(keys)
+    for row_key in [k for k in table.rows if k.value not in wanted]:
+        table.remove_row(row_key)
+    col_keys = list(table.columns)
+    for key, row in zip(keys, rows):
+        if key in table.rows:
+            _update_row(table, key, col_keys, row)
+        else:
+            table.add_row(*row, key=key)
+    if [row.key.value for row in table.ordered_rows] != keys:
+        _reorder_rows(table, rows)
+
+
+def _reorder_rows(table: DataTable, rows: list) -> None:
+    """Sort rows into the given order (rows with equal cells are interchangeable)."""
+    order = {tuple(map(str, row)): i for i, row in enumerate(rows)}
+    table.sort(key=lambda values: order.get(tuple(map(str, values)), len(rows)))
+
+
+def _update_row(table: DataTable, key: str, col_keys: list, row: tuple) -> None:
+    """Update only the cells whose value changed."""
+    for col_key, old, new in zip(col_keys, table.get_row(key), row):
+        if old != new:
+            table.update_cell(key, col_key, new)
+
+
+def _cursor_row_key(table: DataTable) -> Optional[str]:
+    """Key of the row under the cursor, if any."""
+    if table.row_count == 0 or table.cursor_type == "none":
+        return None
+    try:
+        return table.coordinate_to_cell_key(table.cursor_coordinate).row_key.value
+    except Exception:
+        return None
+
+
+def _restore_cursor(table: DataTable, key: Optional[str]) -> None:
+    """Put the cursor back on the same row if it still exists."""
+    if key is not None and key in table.rows:
+        table.move_cursor(row=table.get_row_index(key), animate=False)
@@ -468,3 +468,20 @@ WHERE deleted_at IS NULL
   AND 'FIRST_TIME' = ANY(target_user_types)
 ORDER BY min_recharge_amount ASC
 """
+
+
+# =============================================================================
+# RESULT CACHE TTLs (seconds) - read-mostly analytics only; any write clears
+# the cache so edited offers/rates show up on the next refresh
+# =============================================================================
+
+CACHE_TTLS = {
+    DAILY_CONSUMPTION_QUERY: 120,
+    FIRST_TIME_VS_REGULAR_QUERY: 120,
+    USER_SEGMENTS_QUERY: 300,
+    TOP_SPENDERS_QUERY: 300,
+    RECENT_ACTIVITY_QUERY: 120,
+    REGISTRATION_SOURCES_QUERY: 300,
+    FIRST_TIME_OFFER_PERFORMANCE_QUERY: 120,
+    FIRST_TIME_DAILY_CONVERSIONS_QUERY: 120,
+}
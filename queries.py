@@ -254,14 +254,43 @@ WHERE uw.deleted_at IS NULL
 """
 
 # ALL Users with Complete Wallet Data (paginated) + Batch Detection
-ALL_USERS_COMPLETE_QUERY = """
-WITH user_recharges AS (
+# Most recently active first: keyset on (last_activity, user_id), NULL activity
+# last. Only last activity is computed for every user; recharge/spend totals
+# and batch sizes are aggregated for the page's users alone.
+# Pass first_page=True, or the boundary row's (last_activity, user_id).
+ALL_USERS_PAGE_SQL = """
+WITH last_recharge AS (
+    SELECT user_id, MAX(created_at) as last_recharge_date
+    FROM wallet.payment_orders
+    WHERE status = 'SUCCESSFUL'
+    GROUP BY user_id
+),
+activity AS (
+    SELECT
+        uw.user_id,
+        uw.created_at,
+        COALESCE(GREATEST(lr.last_recharge_date, uw.updated_at), '-infinity') as activity_key
+    FROM wallet.user_wallets uw
+    LEFT JOIN last_recharge lr ON uw.user_id = lr.user_id
+    WHERE uw.deleted_at IS NULL
+      AND (uw.created_at >= '2025-11-13 00:00:00' OR lr.last_recharge_date >= '2025-11-13 00:00:00')
+),
+page AS (
+    SELECT *
+    FROM activity
+    WHERE %(first_page)s
+       OR (activity_key, user_id) {seek} (COALESCE(%(last_activity)s::timestamp, '-infinity'), %(user_id)s)
+    ORDER BY activity_key {order}, user_id {order}
+    LIMIT %(limit)s
+),
+user_recharges AS (
     SELECT
         user_id,
         COUNT(*) FILTER (WHERE status = 'SUCCESSFUL') as successful_recharge_count,
         COALESCE(SUM(amount) FILTER (WHERE status = 'SUCCESSFUL'), 0) as total_recharge_amount,
         MAX(created_at) FILTER (WHERE status = 'SUCCESSFUL') as last_recharge_date
     FROM wallet.payment_orders
+    WHERE user_id IN (SELECT user_id FROM page)
     GROUP BY user_id
 ),
 user_spending AS (
@@ -270,15 +299,18 @@ user_spending AS (
         COUNT(*) FILTER (WHERE status = 'COMPLETED') as completed_order_count,
         COALESCE(SUM(final_amount) FILTER (WHERE status = 'COMPLETED'), 0) as total_spent
     FROM wallet.wallet_orders
+    WHERE user_id IN (SELECT user_id FROM page)
     GROUP BY user_id
 ),
 daily_batch_counts AS (
     SELECT
-        DATE(created_at) as creation_date,
+        d.creation_date,
         COUNT(*) as batch_size
-    FROM wallet.user_wallets
-    WHERE deleted_at IS NULL
-    GROUP BY DATE(created_at)
+    FROM (SELECT DISTINCT DATE(created_at) as creation_date FROM page) d
+    JOIN wallet.user_wallets w
+      ON w.created_at >= d.creation_date AND w.created_at < d.creation_date + 1
+    WHERE w.deleted_at IS NULL
+    GROUP BY d.creation_date
 )
 SELECT
     uw.user_id,
@@ -293,28 +325,25 @@ SELECT
     GREATEST(ur.last_recharge_date, uw.updated_at) as last_activity,
     uw.created_at as account_created,
     COALESCE(dbc.batch_size, 1) as batch_size
-FROM wallet.user_wallets uw
+FROM page p
+JOIN wallet.user_wallets uw ON uw.user_id = p.user_id
 LEFT JOIN customers.customer c ON uw.user_id = c.customer_id AND c.deleted_at IS NULL
 LEFT JOIN user_recharges ur ON uw.user_id = ur.user_id
 LEFT JOIN user_spending us ON uw.user_id = us.user_id
 LEFT JOIN daily_batch_counts dbc ON DATE(uw.created_at) = dbc.creation_date
-WHERE uw.deleted_at IS NULL
-  AND (
-    uw.created_at >= '2025-11-13 00:00:00'
-    OR EXISTS (
-      SELECT 1 FROM wallet.payment_orders po
-      WHERE po.user_id = uw.user_id
-        AND po.status = 'SUCCESSFUL'
-        AND po.created_at >= '2025-11-13 00:00:00'
-    )
-  )
-ORDER BY GREATEST(ur.last_recharge_date, uw.updated_at) DESC NULLS LAST, total_spent DESC
-LIMIT %s OFFSET %s;
+ORDER BY p.activity_key {order}, p.user_id {order};
 """
 
-# Wallet Transactions (recent, paginated)
+# Next page (after the cursor), best first
+ALL_USERS_COMPLETE_QUERY = ALL_USERS_PAGE_SQL.format(seek='<', order='DESC')
+
+# Previous page (before the cursor; first_page=True = the last page), worst first
+ALL_USERS_BEFORE_QUERY = ALL_USERS_PAGE_SQL.format(seek='>', order='ASC')
+
+# Wallet Transactions (recent, keyset paginated on created_at, transaction_id)
 # For SPENT transactions, shows guide name instead of comment
-WALLET_TRANSACTIONS_QUERY = """
+# Last column is the raw created_at, used as the page cursor
+WALLET_TRANSACTIONS_SELECT = """
 SELECT
     wt.transaction_id,
     wt.user_id,
@@ -327,13 +356,25 @@ SELECT
         WHEN wt.type = 'SPENT' THEN COALESCE(gp.full_name, wt.comment)
         ELSE wt.comment
     END as comment_or_guide,
-    wt.created_at + INTERVAL '5 hours 30 minutes' as created_at_ist
+    wt.created_at + INTERVAL '5 hours 30 minutes' as created_at_ist,
+    wt.created_at
 FROM wallet.wallet_transactions wt
 LEFT JOIN customers.customer c ON wt.user_id = c.customer_id
 LEFT JOIN wallet.wallet_orders wo ON wt.order_id = wo.order_id AND wt.type = 'SPENT'
 LEFT JOIN guide.guide_profile gp ON wo.consultant_id = gp.id
-ORDER BY wt.created_at DESC
-LIMIT %s OFFSET %s;
+"""
+
+# First page
+WALLET_TRANSACTIONS_QUERY = WALLET_TRANSACTIONS_SELECT + """
+ORDER BY wt.created_at DESC, wt.transaction_id DESC
+LIMIT %s;
+"""
+
+# Pages after a cursor: params (created_at, transaction_id, limit) of the previous page's last row
+WALLET_TRANSACTIONS_AFTER_QUERY = WALLET_TRANSACTIONS_SELECT + """
+WHERE (wt.created_at, wt.transaction_id) < (%s, %s)
+ORDER BY wt.created_at DESC, wt.transaction_id DESC
+LIMIT %s;
 """
 
 # Wallet Transactions Count
@@ -341,10 +382,18 @@ WALLET_TRANSACTIONS_COUNT_QUERY = """
 SELECT COUNT(*) FROM wallet.wallet_transactions;
 """
 
+# Wallet Transactions row estimate (planner statistics, no table scan)
+WALLET_TRANSACTIONS_ESTIMATE_QUERY = """
+SELECT GREATEST(reltuples, 0)::bigint
+FROM pg_class
+WHERE oid = 'wallet.wallet_transactions'::regclass;
+"""
+
 # Revenue Summary (BD-1.0) - with date range parameters (IST timezone)
 # BD-1.1: Add Cash, BD-1.2: Promotions, BD-1.3: Consultations
 # BD-1.4: Astrologer Share, BD-1.5: Company Share
 # Note: wallet.* tables use timestamp WITHOUT time zone, use +5:30
+# Legacy: the view now builds this from views/revenue.py REVENUE_METRICS; kept for query_regression.py
 REVENUE_SUMMARY_QUERY = """
 SELECT
     -- BD-1.1: Add Cash (successful payment orders)
@@ -455,6 +504,7 @@ SELECT
 # BD-3.1: All, BD-3.4: Chat, BD-3.5: Call
 # Excludes deleted guides (test/developer accounts)
 # Note: All timestamps stored in UTC. Use + INTERVAL '5 hours 30 minutes' for IST conversion.
+# Legacy: the view now builds this from views/consultations.py CONSULTATION_METRICS; kept for query_regression.py
 CONSULTATION_SUMMARY_QUERY = """
 SELECT
     -- All consultations
@@ -566,6 +616,7 @@ ORDER BY (COALESCE(SUM(wo.final_amount), 0)) DESC;
 
 # Payment Metrics (BD-4.0) - with date range parameters (IST timezone)
 # BD-4.1: Number of Payments, BD-4.2: Amount, BD-4.3: Success Rate, BD-4.4: By Payment Mode
+# Legacy: the view now builds this from views/payments.py PAYMENT_METRICS; kept for query_regression.py
 PAYMENT_SUMMARY_QUERY = """
 SELECT
     -- BD-4.1: Total Payments (attempted)
@@ -708,69 +759,9 @@ GROUP BY gp.full_name
 ORDER BY (COALESCE(SUM(wo.final_amount), 0)) DESC;
 """
 
-# Astrologer Availability (BD-9.0) - Online time from audit logs (IST timezone)
-# BD-9.1: Online time per astrologer, BD-9.2: Live astrologers count
-ASTROLOGER_AVAILABILITY_QUERY = """
-WITH state_changes AS (
-    SELECT
-        (original_data->>'id')::int as guide_id,
-        original_data->>'full_name' as guide_name,
-        original_data->>'availability_state' as from_state,
-        new_data->>'availability_state' as to_state,
-        action_tstamp + INTERVAL '5 hours 30 minutes' as changed_at_ist
-    FROM audit.logged_actions
-    WHERE table_name = 'guide_profile'
-      AND action = 'U'
-      AND original_data->>'availability_state' IS DISTINCT FROM new_data->>'availability_state'
-      AND (action_tstamp + INTERVAL '5 hours 30 minutes')::date >= %s
-      AND (action_tstamp + INTERVAL '5 hours 30 minutes')::date <= %s
-),
--- Track when each guide goes online and offline
-online_periods AS (
-    SELECT
-        guide_id,
-        guide_name,
-        changed_at_ist as event_time,
-        CASE WHEN to_state = 'ONLINE_AVAILABLE' THEN 1 ELSE -1 END as direction,
-        to_state,
-        from_state
-    FROM state_changes
-    WHERE to_state = 'ONLINE_AVAILABLE'
-       OR from_state = 'ONLINE_AVAILABLE'
-),
--- Pair start/end events
-paired_sessions AS (
-    SELECT
-        guide_id,
-        guide_name,
-        event_time as session_start,
-        LEAD(event_time) OVER (PARTITION BY guide_id ORDER BY event_time) as session_end,
-        direction
-    FROM online_periods
-)
-SELECT
-    guide_name,
-    MIN(session_start)::date as first_online,
-    MAX(COALESCE(session_end, session_start))::date as last_online,
-    COALESCE(SUM(
-        EXTRACT(EPOCH FROM (
-            COALESCE(session_end, NOW() + INTERVAL '5 hours 30 minutes') - session_start
-        )) / 60
-    ), 0)::int as total_minutes_online
-FROM paired_sessions
-WHERE direction = 1  -- Only count sessions that START with going online
-  AND session_end IS NOT NULL  -- Only count completed sessions
-GROUP BY guide_id, guide_name
-ORDER BY total_minutes_online DESC;
-"""
-
-# Live Astrologers count (current snapshot)
-LIVE_ASTROLOGERS_QUERY = """
-SELECT COUNT(*) as live_count
-FROM guide.guide_profile
-WHERE availability_state = 'ONLINE_AVAILABLE'
-  AND deleted_at IS NULL;
-"""
+# Astrologer Availability (BD-9.0) online time and live count are answered from
+# the availability session store (availability_sessions.py), built incrementally
+# from audit.logged_actions.
 
 # Query to get paying customers (first recharge) in a date range (IST corrected)
 CAC_QUERY = """
@@ -795,259 +786,27 @@ WHERE fr.first_recharge_date_ist::date >= %s
 
 # --- Guides Dashboard Queries ---
 
-# Guide counts (online/offline/total)
-GUIDE_COUNTS_QUERY = """
-SELECT
-    COUNT(*) FILTER (WHERE availability_state = 'ONLINE_AVAILABLE') as online_guides,
-    COUNT(*) FILTER (WHERE availability_state = 'OFFLINE') as offline_guides,
-    COUNT(*) as total_guides
-FROM guide.guide_profile
-WHERE deleted_at IS NULL;
-"""
-
-# Channel counts (chat/voice/video for online guides)
-GUIDE_CHANNEL_COUNTS_QUERY = """
-SELECT
-    COUNT(*) FILTER (WHERE chat_enabled = true) as online_chat_guides,
-    COUNT(*) FILTER (WHERE voice_enabled = true) as online_voice_guides,
-    COUNT(*) FILTER (WHERE video_enabled = true) as online_video_guides
-FROM guide.guide_profile
-WHERE availability_state = 'ONLINE_AVAILABLE'
-  AND deleted_at IS NULL;
-"""
-
-# Skills breakdown (online/offline per skill)
-GUIDE_SKILLS_BREAKDOWN_QUERY = """
-SELECT
-    s.name as skill_name,
-    COUNT(*) FILTER (WHERE gp.availability_state = 'ONLINE_AVAILABLE') as online_count,
-    COUNT(*) FILTER (WHERE gp.availability_state != 'ONLINE_AVAILABLE') as offline_count,
-    COUNT(*) as total_count
-FROM guide.skills s
-LEFT JOIN guide.guide_skills gs ON s.id = gs.skill_id AND gs.deleted_at IS NULL
-LEFT JOIN guide.guide_profile gp ON gs.guide_id = gp.id AND gp.deleted_at IS NULL
-WHERE s.deleted_at IS NULL
-GROUP BY s.id, s.name
-HAVING COUNT(gp.id) > 0
-ORDER BY online_count DESC, s.name;
-"""
-
-# Online guides with details
-ONLINE_GUIDES_QUERY = """
-WITH guide_skills_agg AS (
-    SELECT
-        gs.guide_id,
-        STRING_AGG(s.name, ', ' ORDER BY s.name) as skills
-    FROM guide.guide_skills gs
-    JOIN guide.skills s ON gs.skill_id = s.id
-    WHERE gs.deleted_at IS NULL
-    GROUP BY gs.guide_id
-),
-guide_earnings AS (
-    SELECT
-        gp.id as guide_id,
-        COALESCE(SUM(wo.consultant_share), 0) as total_earnings
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultant_wallets cw
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = cw.phone_number
-        AND cw.deleted_at IS NULL
-    LEFT JOIN wallet.wallet_orders wo
-        ON cw.consultant_id = wo.consultant_id
-        AND wo.status = 'COMPLETED'
-        AND wo.consultant_share IS NOT NULL
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
-),
-guide_pricing AS (
-    SELECT
-        gp.id as guide_id,
-        c.price_per_minute
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultants c
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = c.phone_number
-    WHERE gp.deleted_at IS NULL
-),
-guide_orders_today AS (
-    SELECT
-        gp.id as guide_id,
-        COUNT(*) FILTER (WHERE wo.status = 'PENDING') as pending_count,
-        COUNT(*) FILTER (WHERE wo.status = 'INPROGRESS') as inprogress_count,
-        STRING_AGG(DISTINCT u.name, ', ' ORDER BY u.name) FILTER (WHERE wo.status = 'INPROGRESS') as inprogress_customers,
-        COUNT(*) FILTER (WHERE wo.status = 'COMPLETED') as completed_count,
-        COALESCE(SUM(wo.consultant_share) FILTER (WHERE wo.status = 'COMPLETED'), 0) as today_earnings,
-        COUNT(*) FILTER (WHERE wo.status = 'REFUNDED') as refunded_count,
-        COUNT(*) FILTER (WHERE wo.status = 'CANCELLED') as cancelled_count
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultant_wallets cw
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = cw.phone_number
-        AND cw.deleted_at IS NULL
-    LEFT JOIN wallet.wallet_orders wo
-        ON cw.consultant_id = wo.consultant_id
-        AND DATE(wo.created_at + INTERVAL '5 hours 30 minutes') = CURRENT_DATE
-    LEFT JOIN wallet.users u
-        ON wo.user_id = u.user_id
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
-),
-guide_sessions AS (
-    SELECT
-        gp.id as guide_id,
-        MAX(us.refresh_token_exp) as token_exp
-    FROM guide.guide_profile gp
-    LEFT JOIN auth.auth_users au
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = au.phone_number
-    LEFT JOIN auth.user_sessions us
-        ON au.id = us.auth_user_id AND us.user_type = 'guide'
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
-)
-SELECT
-    gp.id,
-    gp.full_name,
-    gp.phone_number,
-    gp.chat_enabled,
-    gp.voice_enabled,
-    gp.video_enabled,
-    COALESCE(gsa.skills, 'No skills') as skills,
-    COALESCE(gpr.price_per_minute, 0) as price_per_minute,
-    gp.guide_stats->>'rating' as rating,
-    gp.guide_stats->>'total_number_of_completed_consultations' as completed_consultations,
-    COALESCE(ge.total_earnings, 0) as total_earnings,
-    COALESCE(got.pending_count, 0) as today_pending,
-    COALESCE(got.inprogress_count, 0) as today_inprogress_count,
-    COALESCE(got.inprogress_customers, '-') as today_inprogress_customers,
-    COALESCE(got.completed_count, 0) as today_completed,
-    COALESCE(got.today_earnings, 0) as today_earnings,
-    COALESCE(got.refunded_count, 0) as today_refunded,
-    COALESCE(got.cancelled_count, 0) as today_cancelled,
-    CASE
-        WHEN gsess.token_exp IS NULL THEN 'No Session'
-        WHEN gsess.token_exp < NOW() THEN 'Expired'
-        ELSE 'Active'
-    END as session_status
-FROM guide.guide_profile gp
-LEFT JOIN guide_skills_agg gsa ON gp.id = gsa.guide_id
-LEFT JOIN guide_earnings ge ON gp.id = ge.guide_id
-LEFT JOIN guide_pricing gpr ON gp.id = gpr.guide_id
-LEFT JOIN guide_orders_today got ON gp.id = got.guide_id
-LEFT JOIN guide_sessions gsess ON gp.id = gsess.guide_id
-WHERE gp.availability_state IN ('ONLINE_AVAILABLE', 'ONLINE_BUSY')
-  AND gp.deleted_at IS NULL
-  AND gp.full_name NOT IN ('Aman Jain', 'Praveen')
-ORDER BY COALESCE(got.today_earnings, 0) DESC;
-"""
-
-# Offline guides with details
-OFFLINE_GUIDES_QUERY = """
-WITH guide_skills_agg AS (
-    SELECT
-        gs.guide_id,
-        STRING_AGG(s.name, ', ' ORDER BY s.name) as skills
-    FROM guide.guide_skills gs
-    JOIN guide.skills s ON gs.skill_id = s.id
-    WHERE gs.deleted_at IS NULL
-    GROUP BY gs.guide_id
-),
-guide_earnings AS (
-    SELECT
-        gp.id as guide_id,
-        COALESCE(SUM(wo.consultant_share), 0) as total_earnings
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultant_wallets cw
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = cw.phone_number
-        AND cw.deleted_at IS NULL
-    LEFT JOIN wallet.wallet_orders wo
-        ON cw.consultant_id = wo.consultant_id
-        AND wo.status = 'COMPLETED'
-        AND wo.consultant_share IS NOT NULL
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
+# Every live guide with its details, in one scan. guide_snapshot.py splits the
+# rows into online/offline/test tables and derives the summary counts, channel
+# counts and skills breakdown. Wallet and auth rows are joined on integer ids
+# from the guide identity map (guide_identity.py), passed as arrays, instead of
+# on normalised phone numbers.
+GUIDE_SNAPSHOT_QUERY = """
+WITH guide_ident AS (
+    SELECT *
+    FROM UNNEST(%(guide_ids)s::bigint[], %(consultant_ids)s::bigint[], %(prices)s::numeric[])
+        AS gi(guide_id, consultant_id, price_per_minute)
 ),
-guide_pricing AS (
-    SELECT
-        gp.id as guide_id,
-        c.price_per_minute
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultants c
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = c.phone_number
-    WHERE gp.deleted_at IS NULL
+guide_auth AS (
+    SELECT *
+    FROM UNNEST(%(auth_guide_ids)s::bigint[], %(auth_user_ids)s::bigint[])
+        AS ga(guide_id, auth_user_id)
 ),
-guide_orders_today AS (
-    SELECT
-        gp.id as guide_id,
-        COUNT(*) FILTER (WHERE wo.status = 'PENDING') as pending_count,
-        COUNT(*) FILTER (WHERE wo.status = 'INPROGRESS') as inprogress_count,
-        STRING_AGG(DISTINCT u.name, ', ' ORDER BY u.name) FILTER (WHERE wo.status = 'INPROGRESS') as inprogress_customers,
-        COUNT(*) FILTER (WHERE wo.status = 'COMPLETED') as completed_count,
-        COALESCE(SUM(wo.consultant_share) FILTER (WHERE wo.status = 'COMPLETED'), 0) as today_earnings,
-        COUNT(*) FILTER (WHERE wo.status = 'REFUNDED') as refunded_count,
-        COUNT(*) FILTER (WHERE wo.status = 'CANCELLED') as cancelled_count
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultant_wallets cw
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = cw.phone_number
-        AND cw.deleted_at IS NULL
-    LEFT JOIN wallet.wallet_orders wo
-        ON cw.consultant_id = wo.consultant_id
-        AND DATE(wo.created_at + INTERVAL '5 hours 30 minutes') = CURRENT_DATE
-    LEFT JOIN wallet.users u
-        ON wo.user_id = u.user_id
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
-),
-guide_sessions AS (
-    SELECT
-        gp.id as guide_id,
-        MAX(us.refresh_token_exp) as token_exp
-    FROM guide.guide_profile gp
-    LEFT JOIN auth.auth_users au
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = au.phone_number
-    LEFT JOIN auth.user_sessions us
-        ON au.id = us.auth_user_id AND us.user_type = 'guide'
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
-)
-SELECT
-    gp.id,
-    gp.full_name,
-    gp.phone_number,
-    gp.chat_enabled,
-    gp.voice_enabled,
-    gp.video_enabled,
-    COALESCE(gsa.skills, 'No skills') as skills,
-    COALESCE(gpr.price_per_minute, 0) as price_per_minute,
-    gp.guide_stats->>'rating' as rating,
-    gp.guide_stats->>'total_number_of_completed_consultations' as completed_consultations,
-    COALESCE(ge.total_earnings, 0) as total_earnings,
-    COALESCE(got.pending_count, 0) as today_pending,
-    COALESCE(got.inprogress_count, 0) as today_inprogress_count,
-    COALESCE(got.inprogress_customers, '-') as today_inprogress_customers,
-    COALESCE(got.completed_count, 0) as today_completed,
-    COALESCE(got.today_earnings, 0) as today_earnings,
-    COALESCE(got.refunded_count, 0) as today_refunded,
-    COALESCE(got.cancelled_count, 0) as today_cancelled,
-    CASE
-        WHEN gsess.token_exp IS NULL THEN 'No Session'
-        WHEN gsess.token_exp < NOW() THEN 'Expired'
-        ELSE 'Active'
-    END as session_status
-FROM guide.guide_profile gp
-LEFT JOIN guide_skills_agg gsa ON gp.id = gsa.guide_id
-LEFT JOIN guide_earnings ge ON gp.id = ge.guide_id
-LEFT JOIN guide_pricing gpr ON gp.id = gpr.guide_id
-LEFT JOIN guide_orders_today got ON gp.id = got.guide_id
-LEFT JOIN guide_sessions gsess ON gp.id = gsess.guide_id
-WHERE gp.availability_state NOT IN ('ONLINE_AVAILABLE', 'ONLINE_BUSY')
-  AND gp.deleted_at IS NULL
-  AND gp.full_name NOT IN ('Aman Jain', 'Praveen')
-ORDER BY COALESCE(got.today_earnings, 0) DESC;
-"""
-
-# Test guides (Aman Jain and Praveen)
-TEST_GUIDES_QUERY = """
-WITH guide_skills_agg AS (
+guide_skills_agg AS (
     SELECT
         gs.guide_id,
-        STRING_AGG(s.name, ', ' ORDER BY s.name) as skills
+        STRING_AGG(s.name, ', ' ORDER BY s.name) as skills,
+        ARRAY_AGG(s.name ORDER BY s.name) FILTER (WHERE s.deleted_at IS NULL) as skill_names
     FROM guide.guide_skills gs
     JOIN guide.skills s ON gs.skill_id = s.id
     WHERE gs.deleted_at IS NULL
@@ -1055,31 +814,18 @@ WITH guide_skills_agg AS (
 ),
 guide_earnings AS (
     SELECT
-        gp.id as guide_id,
+        gi.guide_id,
         COALESCE(SUM(wo.consultant_share), 0) as total_earnings
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultant_wallets cw
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = cw.phone_number
-        AND cw.deleted_at IS NULL
-    LEFT JOIN wallet.wallet_orders wo
-        ON cw.consultant_id = wo.consultant_id
+    FROM guide_ident gi
+    JOIN wallet.wallet_orders wo
+        ON wo.consultant_id = gi.consultant_id
         AND wo.status = 'COMPLETED'
         AND wo.consultant_share IS NOT NULL
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
-),
-guide_pricing AS (
-    SELECT
-        gp.id as guide_id,
-        c.price_per_minute
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultants c
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = c.phone_number
-    WHERE gp.deleted_at IS NULL
+    GROUP BY gi.guide_id
 ),
 guide_orders_today AS (
     SELECT
-        gp.id as guide_id,
+        gi.guide_id,
         COUNT(*) FILTER (WHERE wo.status = 'PENDING') as pending_count,
         COUNT(*) FILTER (WHERE wo.status = 'INPROGRESS') as inprogress_count,
         STRING_AGG(DISTINCT u.name, ', ' ORDER BY u.name) FILTER (WHERE wo.status = 'INPROGRESS') as inprogress_customers,
@@ -1087,29 +833,22 @@ guide_orders_today AS (
         COALESCE(SUM(wo.consultant_share) FILTER (WHERE wo.status = 'COMPLETED'), 0) as today_earnings,
         COUNT(*) FILTER (WHERE wo.status = 'REFUNDED') as refunded_count,
         COUNT(*) FILTER (WHERE wo.status = 'CANCELLED') as cancelled_count
-    FROM guide.guide_profile gp
-    LEFT JOIN wallet.consultant_wallets cw
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = cw.phone_number
-        AND cw.deleted_at IS NULL
-    LEFT JOIN wallet.wallet_orders wo
-        ON cw.consultant_id = wo.consultant_id
+    FROM guide_ident gi
+    JOIN wallet.wallet_orders wo
+        ON wo.consultant_id = gi.consultant_id
         AND DATE(wo.created_at + INTERVAL '5 hours 30 minutes') = CURRENT_DATE
     LEFT JOIN wallet.users u
         ON wo.user_id = u.user_id
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
+    GROUP BY gi.guide_id
 ),
 guide_sessions AS (
     SELECT
-        gp.id as guide_id,
+        ga.guide_id,
         MAX(us.refresh_token_exp) as token_exp
-    FROM guide.guide_profile gp
-    LEFT JOIN auth.auth_users au
-        ON REPLACE(REPLACE(gp.phone_number, '+91', ''), '+', '') = au.phone_number
-    LEFT JOIN auth.user_sessions us
-        ON au.id = us.auth_user_id AND us.user_type = 'guide'
-    WHERE gp.deleted_at IS NULL
-    GROUP BY gp.id
+    FROM guide_auth ga
+    JOIN auth.user_sessions us
+        ON us.auth_user_id = ga.auth_user_id AND us.user_type = 'guide'
+    GROUP BY ga.guide_id
 )
 SELECT
     gp.id,
@@ -1120,7 +859,7 @@ SELECT
     gp.voice_enabled,
     gp.video_enabled,
     COALESCE(gsa.skills, 'No skills') as skills,
-    COALESCE(gpr.price_per_minute, 0) as price_per_minute,
+    COALESCE(gi.price_per_minute, 0) as price_per_minute,
     gp.guide_stats->>'rating' as rating,
     gp.guide_stats->>'total_number_of_completed_consultations' as completed_consultations,
     COALESCE(ge.total_earnings, 0) as total_earnings,
@@ -1135,15 +874,15 @@ SELECT
         WHEN gsess.token_exp IS NULL THEN 'No Session'
         WHEN gsess.token_exp < NOW() THEN 'Expired'
         ELSE 'Active'
-    END as session_status
+    END as session_status,
+    COALESCE(gsa.skill_names, '{}') as skill_names
 FROM guide.guide_profile gp
 LEFT JOIN guide_skills_agg gsa ON gp.id = gsa.guide_id
+LEFT JOIN guide_ident gi ON gp.id = gi.guide_id
 LEFT JOIN guide_earnings ge ON gp.id = ge.guide_id
-LEFT JOIN guide_pricing gpr ON gp.id = gpr.guide_id
 LEFT JOIN guide_orders_today got ON gp.id = got.guide_id
 LEFT JOIN guide_sessions gsess ON gp.id = gsess.guide_id
 WHERE gp.deleted_at IS NULL
-  AND gp.full_name IN ('Aman Jain', 'Praveen')
 ORDER BY COALESCE(got.today_earnings, 0) DESC;
 """
 
@@ -1354,3 +1093,27 @@ SELECT
     (SELECT ROUND(AVG(EXTRACT(EPOCH FROM (success_time - session_start)) / 60)::numeric, 1)
      FROM session_stats WHERE session_succeeded = 1 AND success_time IS NOT NULL) as avg_minutes_to_connect;
 """
+
+
+# =============================================================================
+# RESULT CACHE TTLs (seconds) - queries not listed here always hit the DB
+# =============================================================================
+
+CACHE_TTLS = {
+    # Full-history scans whose answer barely moves between ticks
+    KPI_QUERY: 300,
+    GUIDE_PERFORMANCE_QUERY: 600,
+    GUIDE_LEAKAGE_QUERY: 600,
+    ALL_USERS_COUNT_QUERY: 900,          # exact count, refreshed in the background
+    ALL_USERS_COMPLETE_QUERY: 120,
+    WALLET_TRANSACTIONS_AFTER_QUERY: 60,  # older pages, prefetched one ahead
+    WALLET_TRANSACTIONS_ESTIMATE_QUERY: 300,
+    WALLET_CREATION_QUERY: 300,
+    ADD_COMPARISON_QUERY: 120,
+    DAILY_RECHARGE_QUERY: 120,
+    WALLET_TRANSACTIONS_COUNT_QUERY: 120,
+    PROMO_GRANT_SPENDING_QUERY: 300,
+    CONSULTATION_PERFORMANCE_QUERY: 300,
+    ASTROLOGER_PERFORMANCE_QUERY: 120,
+    CAC_QUERY: 300,
+}
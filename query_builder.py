@@ -0,0 +1,111 @@
+"""
+Query Builder - one-pass FILTER aggregates from declarative metric specs.
+
+Each Metric is `aggregate FILTER (WHERE filter)` over a table and an IST
+date range. Metrics sharing a source (table, joins, date column) are
+computed in a single scan; sources are CROSS JOINed into one row.
+Date ranges are UTC bounds on the raw column so indexes can be used.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+IST_OFFSET = timedelta(hours=5, minutes=30)
+IST_DAY = "({col} + INTERVAL '5 hours 30 minutes')::date"
+
+
+@dataclass(frozen=True)
+class Metric:
+    """One aggregate over an IST date range."""
+    name: str
+    table: str              # may carry an alias: 'consultation.consultation c'
+    date_column: str        # raw timestamp column, e.g. 'created_at'
+    aggregate: str = 'COUNT(*)'
+    filter: str = ''        # SQL predicate for FILTER (WHERE ...)
+    joins: str = ''         # JOIN clauses appended to the table
+    tz_aware: bool = False  # date_column is timestamptz
+
+    @property
+    def source(self) -> tuple:
+        return (self.table, self.joins, self.date_column, self.tz_aware)
+
+    @property
+    def key(self) -> str:
+        """Stable id of the definition (changes when the SQL changes)."""
+        spec = '|'.join((self.name, *map(str, self.source), self.aggregate, self.filter))
+        return f"{self.name}:{hashlib.sha1(spec.encode()).hexdigest()[:10]}"
+
+    def select_expr(self, filtered: bool = True) -> str:
+        agg = self.aggregate
+        if self.filter and filtered:
+            agg = f"{agg} FILTER (WHERE {self.filter})"
+        return f"COALESCE({agg}, 0) as {self.name}"
+
+
+# --- Params ---
+
+def range_params(start: date, end: date) -> dict:
+    """Named params for IST days start..end as UTC [start, end) bounds."""
+    lo = datetime.combine(start, datetime.min.time()) - IST_OFFSET
+    hi = datetime.combine(end + timedelta(days=1), datetime.min.time()) - IST_OFFSET
+    return {
+        'start': lo, 'end': hi,
+        'start_tz': lo.replace(tzinfo=timezone.utc), 'end_tz': hi.replace(tzinfo=timezone.utc),
+    }
+
+
+# --- SQL generation ---
+
+def group_by_source(metrics: List[Metric]) -> List[List[Metric]]:
+    """Split metrics into per-source groups, keeping declaration order."""
+    groups = {}
+    for m in metrics:
+        groups.setdefault(m.source, []).append(m)
+    return list(groups.values())
+
+
+def _source_sql(group: List[Metric], leading: list = (), group_by: str = '') -> str:
+    """SELECT over one source with the date-range predicate.
+
+    A filter shared by every metric in the group moves into WHERE.
+    """
+    table, joins, col, tz_aware = group[0].source
+    suffix = '_tz' if tz_aware else ''
+    shared = group[0].filter if len({m.filter for m in group}) == 1 else ''
+    select = list(leading) + [m.select_expr(filtered=not shared) for m in group]
+    lines = [
+        "SELECT",
+        ",\n".join(f"    {expr}" for expr in select),
+        f"FROM {table}",
+    ]
+    if joins:
+        lines.append(joins)
+    lines.append(f"WHERE {col} >= %(start{suffix})s")
+    lines.append(f"  AND {col} < %(end{suffix})s")
+    if shared:
+        lines.append(f"  AND {shared}")
+    if group_by:
+        lines.append(f"GROUP BY {group_by}")
+    return "\n".join(lines)
+
+
+def build_summary_query(metrics: List[Metric]) -> str:
+    """One row, one column per metric, one scan per source."""
+    groups = group_by_source(metrics)
+    if len(groups) == 1:
+        return _source_sql(groups[0]) + ";"
+    alias = {m.name: f"s{i}" for i, g in enumerate(groups) for m in g}
+    parts = [f"({_source_sql(g)}) s{i}" for i, g in enumerate(groups)]
+    cols = ", ".join(f"{alias[m.name]}.{m.name}" for m in metrics)
+    return f"SELECT {cols}\nFROM " + "\nCROSS JOIN ".join(parts) + ";"
+
+
+def build_daily_queries(metrics: List[Metric]) -> List[tuple]:
+    """Per-source (sql, metrics) returning (ist_day, metric...) rows."""
+    queries = []
+    for group in group_by_source(metrics):
+        day = IST_DAY.format(col=group[0].date_column) + " as day"
+        queries.append((_source_sql(group, [day], group_by='1') + ";", group))
+    return queries
@@ -0,0 +1,139 @@
+"""
+Query result cache - TTL per query, LRU bound, stale-while-revalidate.
+
+Entries are keyed on (query, params). A fresh entry is returned as-is; a
+stale one is returned immediately while a single background refresh runs,
+and concurrent misses on one key share a single load. Callers get their
+own copy of the row list. Queries without a TTL are never cached.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+CACHE_ENABLED = os.getenv('QUERY_CACHE', '1') != '0'
+CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 256))
+CACHE_MAX_STALE = int(os.getenv('QUERY_CACHE_MAX_STALE', 3))  # serve stale up to N x TTL
+CACHE_REFRESH_WORKERS = 2
+
+
+def _params_key(params):
+    """Hashable form of positional or named query params."""
+    if isinstance(params, dict):
+        return tuple(sorted(params.items()))
+    return tuple(params) if isinstance(params, list) else params
+
+
+class QueryCache:
+    """Thread-safe LRU of query results with per-query TTLs."""
+
+    def __init__(self, ttls: Dict[str, int] = None, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, result)
+        self._inflight = set()
+        self._loading = {}  # key -> Event set when the in-progress miss finishes
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS,
+                                             thread_name_prefix="cache-refresh")
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def ttl_for(self, query: str) -> int:
+        """Seconds a result for this query stays fresh (0 = don't cache)."""
+        return self.ttls.get(query, 0)
+
+    def get(self, query: str, params: Optional[tuple], loader: Callable[[], list]) -> list:
+        """Return a cached result for (query, params), loading it if needed."""
+        ttl = self.ttl_for(query)
+        if not ttl:
+            return loader()
+        key = (query, _params_key(params))
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    age = time.monotonic() - entry[0]
+                    if age < ttl:
+                        self.hits += 1
+                        return list(entry[1])
+                    if age < ttl * CACHE_MAX_STALE:
+                        self.stale += 1
+                        self._schedule_refresh(key, loader)
+                        return list(entry[1])
+                loading = self._loading.get(key)
+                if loading is None:
+                    self.misses += 1
+                    loading = self._loading[key] = threading.Event()
+                    break
+            loading.wait()  # another caller is loading this key; re-check when it is done
+        try:
+            result = loader()
+            self._store(key, result)
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+        return list(result)
+
+    def warm(self, query: str, params: Optional[tuple], loader: Callable[[], list]) -> None:
+        """Load (query, params) in the background unless a fresh result is cached."""
+        ttl = self.ttl_for(query)
+        if not ttl:
+            return
+        key = (query, _params_key(params))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] >= ttl:
+                self._schedule_refresh(key, loader)
+
+    def _schedule_refresh(self, key: tuple, loader: Callable[[], list]) -> None:
+        """Refresh an entry in the background, once per key (lock held)."""
+        if key in self._inflight:
+            return
+        self._inflight.add(key)
+        self._refresher.submit(self._refresh, key, loader)
+
+    def _refresh(self, key: tuple, loader: Callable[[], list]) -> None:
+        """Background refresh; on failure the stale entry is kept."""
+        try:
+            self._store(key, loader())
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def _store(self, key: tuple, result: list) -> None:
+        """Insert a result, evicting least-recently-used entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), tuple(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, query: str = None) -> None:
+        """Drop cached results for one query, or everything."""
+        with self._lock:
+            if query is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == query]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.stale + self.misses
+            return {
+                'hits': self.hits,
+                'stale': self.stale,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.stale) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+            }
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Regression check: legacy summary SQL vs query_builder one-pass SQL.
+
+Runs both versions of the revenue, payment and consultation summaries
+over several IST date ranges, asserts identical results and prints the
+planner's EXPLAIN cost for each.
+
+Usage:
+    python query_regression.py --dsn "dbname=astrokiran_fixture" --fixture
+    python query_regression.py --dsn "host=... dbname=astrokiran user=..."
+
+--fixture (re)creates minimal wallet/consultation/guide tables with seeded
+rows; it only runs against a database whose name contains 'fixture' or
+'test'. Without it the check runs read-only against an existing database.
+"""
+
+import sys
+import random
+import argparse
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import psycopg2
+
+from query_builder import range_params
+from queries import REVENUE_SUMMARY_QUERY, PAYMENT_SUMMARY_QUERY, CONSULTATION_SUMMARY_QUERY
+from views.revenue import REVENUE_SUMMARY_SQL
+from views.payments import PAYMENT_SUMMARY_SQL
+from views.consultations import CONSULTATION_SUMMARY_SQL
+
+# (name, legacy SQL, number of (start, end) pairs it takes, builder SQL)
+CASES = [
+    ("revenue", REVENUE_SUMMARY_QUERY, 8, REVENUE_SUMMARY_SQL),
+    ("payments", PAYMENT_SUMMARY_QUERY, 5, PAYMENT_SUMMARY_SQL),
+    ("consultations", CONSULTATION_SUMMARY_QUERY, 6, CONSULTATION_SUMMARY_SQL),
+]
+
+FIXTURE_DAYS = 60
+FIXTURE_ROWS = 5000
+
+FIXTURE_DDL = """
+DROP SCHEMA IF EXISTS wallet, consultation, guide CASCADE;
+CREATE SCHEMA wallet;
+CREATE SCHEMA consultation;
+CREATE SCHEMA guide;
+CREATE TABLE guide.guide_profile (id bigint PRIMARY KEY, deleted_at timestamptz);
+CREATE TABLE wallet.payment_orders (
+    payment_order_id bigserial PRIMARY KEY, user_id bigint, amount numeric(15,2),
+    virtual_cash_amount numeric(15,2), status text, created_at timestamp);
+CREATE TABLE wallet.wallet_orders (
+    order_id bigserial PRIMARY KEY, final_amount numeric(10,2), consultant_share numeric(10,2),
+    status text, created_at timestamp);
+CREATE TABLE consultation.consultation (
+    id bigserial PRIMARY KEY, guide_id bigint, order_id bigint, mode text, state text,
+    completed_at timestamptz);
+CREATE INDEX ON wallet.payment_orders (created_at);
+CREATE INDEX ON wallet.wallet_orders (created_at);
+CREATE INDEX ON consultation.consultation (completed_at);
+"""
+
+
+# --- Fixture ---
+
+def random_ts(rng: random.Random, today: date) -> datetime:
+    """UTC timestamp in the fixture window, biased towards IST midnight (18:30 UTC)."""
+    day = today - timedelta(days=rng.randrange(FIXTURE_DAYS))
+    if rng.random() < 0.2:
+        minute = 18 * 60 + 30 + rng.choice([-1, 0, 1])
+    else:
+        minute = rng.randrange(24 * 60)
+    return datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+
+
+def seed_fixture(conn, today: date) -> None:
+    """Create and fill the fixture tables."""
+    rng = random.Random(42)
+    with conn.cursor() as cur:
+        cur.execute(FIXTURE_DDL)
+        cur.executemany("INSERT INTO guide.guide_profile VALUES (%s, %s)",
+                        [(g, datetime(2025, 1, 1) if g % 7 == 0 else None) for g in range(1, 41)])
+        cur.executemany(
+            "INSERT INTO wallet.payment_orders (user_id, amount, virtual_cash_amount, status, created_at) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(rng.randrange(500), Decimal(rng.randrange(100, 5000)), Decimal(rng.choice([0, 0, 50, 100])),
+              rng.choice(['SUCCESSFUL', 'SUCCESSFUL', 'FAILED', 'PENDING']), random_ts(rng, today))
+             for _ in range(FIXTURE_ROWS)])
+        orders = [(Decimal(rng.randrange(10, 900)), Decimal(rng.randrange(5, 400)) if rng.random() < 0.9 else None,
+                   rng.choice(['COMPLETED', 'COMPLETED', 'CANCELLED']), random_ts(rng, today))
+                  for _ in range(FIXTURE_ROWS)]
+        cur.executemany("INSERT INTO wallet.wallet_orders (final_amount, consultant_share, status, created_at) "
+                        "VALUES (%s, %s, %s, %s)", orders)
+        cur.executemany(
+            "INSERT INTO consultation.consultation (guide_id, order_id, mode, state, completed_at) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [(rng.randrange(1, 41), rng.randrange(1, FIXTURE_ROWS + 50), rng.choice(['chat', 'voice', 'video']),
+              rng.choice(['completed', 'completed', 'guide_rejected']), random_ts(rng, today))
+             for _ in range(FIXTURE_ROWS)])
+        cur.execute("ANALYZE")
+
+
+# --- Checks ---
+
+def normalize(row: tuple) -> tuple:
+    return tuple(round(Decimal(v or 0), 2) for v in row)
+
+
+def explain_cost(cur, sql: str, params) -> float:
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    return cur.fetchone()[0][0]['Plan']['Total Cost']
+
+
+def check_case(cur, case: tuple, start: date, end: date) -> bool:
+    """Run one case for one range; print costs and return True if results match."""
+    name, legacy_sql, pairs, new_sql = case
+    legacy_params = (start, end) * pairs
+    new_params = range_params(start, end)
+    cur.execute(legacy_sql, legacy_params)
+    legacy = normalize(cur.fetchone())
+    cur.execute(new_sql, new_params)
+    new = normalize(cur.fetchone())
+    old_cost, new_cost = explain_cost(cur, legacy_sql, legacy_params), explain_cost(cur, new_sql, new_params)
+    status = "OK" if legacy == new else "MISMATCH"
+    print(f"{name:<14} {start} .. {end}  cost {old_cost:>10.1f} -> {new_cost:>10.1f}  {status}")
+    if legacy != new:
+        print(f"    legacy: {legacy}\n    new:    {new}")
+    return legacy == new
+
+
+def date_ranges(today: date) -> list:
+    return [
+        (today, today),
+        (today - timedelta(days=1), today - timedelta(days=1)),
+        (today - timedelta(days=6), today),
+        (today - timedelta(days=29), today),
+        (today.replace(day=1), today),
+        (today - timedelta(days=FIXTURE_DAYS), today),
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Legacy vs one-pass summary SQL regression check")
+    parser.add_argument("--dsn", required=True, help="libpq connection string")
+    parser.add_argument("--fixture", action="store_true", help="create and seed fixture tables first")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    # Legacy SQL derives IST days from timestamptz in the session time zone
+    with conn.cursor() as cur:
+        cur.execute("SET TimeZone = 'UTC'")
+    today = (datetime.utcnow() + timedelta(hours=5, minutes=30)).date()
+    if args.fixture:
+        dbname = conn.get_dsn_parameters().get('dbname', '')
+        if 'fixture' not in dbname and 'test' not in dbname:
+            print(f"Refusing to seed fixture tables in database '{dbname}'")
+            return 2
+        seed_fixture(conn, today)
+
+    ok = True
+    with conn.cursor() as cur:
+        for case in CASES:
+            for start, end in date_ranges(today):
+                ok = check_case(cur, case, start, end) and ok
+    conn.close()
+    print("All results identical" if ok else "Result mismatches found")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Query statistics - per-query latency histograms for db.execute_query.
+
+Every database execution records wall time, rows, approximate bytes,
+retries and time spent waiting for a pooled connection under the query's
+name (its constant name in queries.py or another project module, e.g.
+KPI_QUERY or availability_sessions.CHANGES_QUERY). Every execute_query call
+also records whether it was served from the result cache.
+
+Latencies go into fixed log-spaced buckets, so memory stays constant and
+p50/p95 are bucket upper bounds (within 25%); max is exact. The last
+QUERY_STATS_RECENT executions are kept for the slowest-recent list.
+
+Set QUERY_STATS_LOG to a path to append every execution there as JSONL;
+export_jsonl() writes a snapshot of the per-query summary.
+"""
+
+import os
+import sys
+import json
+import bisect
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, NamedTuple
+
+QUERY_STATS_ENABLED = os.getenv('QUERY_STATS', '1') != '0'
+QUERY_STATS_LOG = os.getenv('QUERY_STATS_LOG')          # JSONL path, one line per execution
+QUERY_STATS_RECENT = int(os.getenv('QUERY_STATS_RECENT', 200))
+BYTES_SAMPLE_ROWS = 20
+
+# Bucket upper bounds in ms: 0.1ms .. ~20min, each 25% above the last
+BUCKET_BOUNDS_MS = [0.1 * 1.25 ** i for i in range(74)]
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class QueryExecution(NamedTuple):
+    at: datetime
+    name: str
+    seconds: float
+    rows: int
+    bytes: int
+    retries: int
+    wait: float          # seconds waiting for a pooled connection
+    error: bool
+
+
+class QuerySummary(NamedTuple):
+    name: str
+    calls: int           # execute_query calls
+    cached: int          # calls answered from the result cache
+    cacheable: bool      # query has a cache TTL
+    executions: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    total_s: float
+    avg_rows: float
+    avg_bytes: float
+    retries: int
+    avg_wait_ms: float
+
+
+class QueryHistogram:
+    """Counters and a log-bucket latency histogram for one query."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.calls = self.cached = self.executions = self.errors = 0
+        self.cacheable = False
+        self.total_s = self.max_s = self.wait_s = 0.0
+        self.rows = self.bytes = self.retries = 0
+
+    def add(self, e: QueryExecution) -> None:
+        """Count one execution."""
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, e.seconds * 1000)] += 1
+        self.executions += 1
+        self.errors += e.error
+        self.total_s += e.seconds
+        self.max_s = max(self.max_s, e.seconds)
+        self.wait_s += e.wait
+        self.rows, self.bytes, self.retries = self.rows + e.rows, self.bytes + e.bytes, self.retries + e.retries
+
+    def percentile_ms(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th execution (capped at max)."""
+        if not self.executions:
+            return 0.0
+        rank, seen = q * self.executions, 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                bound = BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else float('inf')
+                return min(bound, self.max_s * 1000)
+        return self.max_s * 1000
+
+    def summary(self, name: str) -> QuerySummary:
+        """Snapshot as a QuerySummary."""
+        n = self.executions or 1
+        return QuerySummary(name, self.calls, self.cached, self.cacheable, self.executions, self.errors,
+                            self.percentile_ms(0.5), self.percentile_ms(0.95), self.max_s * 1000,
+                            self.total_s, self.rows / n, self.bytes / n, self.retries, self.wait_s / n * 1000)
+
+
+# --- Query names ---
+
+_names = {}
+
+
+def _project_queries() -> dict:
+    """{sql: name} for *_QUERY strings of loaded project modules."""
+    found = {}
+    for module_name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+        if not path.startswith(_ROOT) or 'site-packages' in path:
+            continue
+        for attr, value in list(vars(module).items()):
+            if attr.endswith('_QUERY') and isinstance(value, str):
+                name = attr if module_name == 'queries' else f"{module_name}.{attr}"
+                found.setdefault(value, name)
+    return found
+
+
+def query_name(query: str) -> str:
+    """Constant name of a query, else 'sql:' plus a short hash of its text."""
+    name = _names.get(query)
+    if name is None:
+        name = _project_queries().get(query) or "sql:" + hashlib.md5(query.encode()).hexdigest()[:8]
+        _names[query] = name
+    return name
+
+
+# --- Store ---
+
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}
+_recent = deque(maxlen=QUERY_STATS_RECENT)
+_log = None
+
+
+def _histogram(name: str) -> QueryHistogram:
+    """The histogram for name, created on first use (lock held)."""
+    if name not in _stats:
+        _stats[name] = QueryHistogram()
+    return _stats[name]
+
+
+def estimate_bytes(rows: list) -> int:
+    """Approximate result size: repr length of a sample of rows, scaled to all rows."""
+    if not rows:
+        return 0
+    sample = rows[:BYTES_SAMPLE_ROWS]
+    return sum(len(repr(r)) for r in sample) * len(rows) // len(sample)
+
+
+def record(query: str, seconds: float, rows: list = None, retries: int = 0, wait: float = 0.0) -> None:
+    """Record one database execution of query (rows None = failed)."""
+    if not QUERY_STATS_ENABLED:
+        return
+    _local.executions = getattr(_local, 'executions', 0) + 1
+    e = QueryExecution(datetime.now(timezone.utc), query_name(query), seconds,
+                       len(rows or ()), estimate_bytes(rows), retries, wait, rows is None)
+    with _lock:
+        _histogram(e.name).add(e)
+        _recent.append(e)
+        _write_log(e)
+
+
+def _write_log(e: QueryExecution) -> None:
+    """Append an execution to QUERY_STATS_LOG, if set (lock held)."""
+    global _log
+    if not QUERY_STATS_LOG:
+        return
+    if _log is None:
+        _log = open(QUERY_STATS_LOG, 'a', buffering=1)
+    _log.write(json.dumps(_execution_dict(e)) + "\n")
+
+
+def call_started() -> int:
+    """Mark the start of an execute_query call; pass the result to call_finished."""
+    return getattr(_local, 'executions', 0)
+
+
+def call_finished(query: str, started: int, cacheable: bool) -> None:
+    """An execute_query call ended; it was cached if this thread executed nothing since."""
+    if not QUERY_STATS_ENABLED:
+        return
+    cached = getattr(_local, 'executions', 0) == started
+    with _lock:
+        h = _histogram(query_name(query))
+        h.calls += 1
+        h.cached += cached
+        h.cacheable = cacheable
+
+
+# --- Reports ---
+
+def summary() -> List[QuerySummary]:
+    """Per-query summaries, most total database time first."""
+    with _lock:
+        rows = [h.summary(name) for name, h in _stats.items()]
+    return sorted(rows, key=lambda s: s.total_s, reverse=True)
+
+
+def slowest(limit: int = 20) -> List[QueryExecution]:
+    """Slowest of the recent executions, slowest first."""
+    with _lock:
+        return sorted(_recent, key=lambda e: e.seconds, reverse=True)[:limit]
+
+
+def recent(limit: int = 20) -> List[QueryExecution]:
+    """Latest executions, newest first."""
+    with _lock:
+        return list(reversed(_recent))[:limit]
+
+
+def reset() -> None:
+    """Forget everything recorded."""
+    with _lock:
+        _stats.clear()
+        _recent.clear()
+
+
+def _execution_dict(e: QueryExecution) -> dict:
+    """JSON-ready form of an execution."""
+    return {'kind': 'execution', 'at': e.at.isoformat(), 'name': e.name, 'ms': round(e.seconds * 1000, 3),
+            'rows': e.rows, 'bytes': e.bytes, 'retries': e.retries, 'wait_ms': round(e.wait * 1000, 3),
+            'error': e.error}
+
+
+def export_jsonl(path: str) -> int:
+    """Append one JSON line per query summary to path; returns lines written."""
+    at = datetime.now(timezone.utc).isoformat()
+    rows = summary()
+    with open(path, 'a') as f:
+        for s in rows:
+            f.write(json.dumps(dict(s._asdict(), at=at, kind='summary')) + "\n")
+    return len(rows)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Ranking backtest - replay guide.ranking_history through alternative weights.
+
+Takes the last ranking_history snapshot per guide per day and re-scores
+every day under thousands of weight vectors and activity-multiplier bands
+at once (configs x days x guides arrays). Reports per configuration:
+  stability  mean rank correlation of guides between consecutive days
+  churn      mean share of the top-N replaced from one day to the next
+  revenue    mean rank correlation of score with each guide's completed
+             order revenue over the following --horizon days
+  overlap    mean share of the top-N shared with the current weights
+
+Row 0 is always the current 35/15/15/15/5/5/5/3/2 split with the
+<5d=0.5x, 5-10d=0.75x, 10-15d=0.9x bands.
+
+Usage:
+    python ranking_backtest.py                          # last 90 days, 5000 random configs
+    python ranking_backtest.py --days 30 --configs 20000 --top 5
+    python ranking_backtest.py --synthetic              # no database: synthetic history
+"""
+
+import time
+import argparse
+from datetime import date, timedelta
+from typing import NamedTuple
+
+import numpy as np
+
+from ranking_engine import FACTORS, WEIGHTS, MULTIPLIER_BANDS, _columns, weighted_ranking
+
+BAND_BOUNDS = np.array([bound for bound, _ in MULTIPLIER_BANDS])
+BASE_MULTIPLIERS = np.array([value for _, value in MULTIPLIER_BANDS])
+HISTORY_TS = 'created_at'       # ranking_history insert timestamp
+DIRICHLET_CONCENTRATION = 50    # higher = random weights stay closer to WEIGHTS
+CONFIG_CHUNK = 500              # configs scored per array pass (bounds memory)
+
+
+class History(NamedTuple):
+    days: np.ndarray            # snapshot dates, ascending (datetime64[D])
+    guide_id: np.ndarray        # sorted
+    factors: np.ndarray         # (days, guides, 9), NaN where a guide has no snapshot
+    days_active: np.ndarray     # (days, guides)
+    stored: np.ndarray          # (days, guides) ranking_score written that day
+    revenue: np.ndarray         # (days, guides) revenue over the horizon after each day, NaN if incomplete
+
+
+class Configs(NamedTuple):
+    weights: np.ndarray         # (k, 9), rows sum to 1
+    multipliers: np.ndarray     # (k, len(BAND_BOUNDS)) multiplier below each bound
+
+
+# --- Extraction ---
+
+HISTORY_QUERY = f"""
+    SELECT DISTINCT ON ({HISTORY_TS}::date, guide_id)
+           {HISTORY_TS}::date, guide_id, days_active, ranking_score::float8,
+           {', '.join(f'{f}::float8' for f in FACTORS)}
+    FROM guide.ranking_history
+    WHERE {HISTORY_TS} >= CURRENT_DATE - %(days)s
+    ORDER BY {HISTORY_TS}::date, guide_id, {HISTORY_TS} DESC"""
+
+REVENUE_QUERY = """
+    SELECT consultant_id, created_at::date, SUM(final_amount)::float8
+    FROM wallet.wallet_orders
+    WHERE status = 'COMPLETED' AND consultant_id IS NOT NULL AND created_at >= %(since)s
+    GROUP BY 1, 2"""
+
+
+def grid(day_keys: np.ndarray, guide_keys: np.ndarray, days: np.ndarray, guides: np.ndarray,
+         values: np.ndarray) -> np.ndarray:
+    """Scatter (day, guide, value) rows into a days x guides array, NaN elsewhere."""
+    out = np.full((len(day_keys), len(guide_keys)) + values.shape[1:], np.nan)
+    out[np.searchsorted(day_keys, days), np.searchsorted(guide_keys, guides)] = values
+    return out
+
+
+def forward_revenue(days: np.ndarray, guide_id: np.ndarray, rev_guide: np.ndarray, rev_day: np.ndarray,
+                    rev_amount: np.ndarray, horizon: int, today: np.datetime64) -> np.ndarray:
+    """Revenue per (snapshot day, guide) over the `horizon` days after it; NaN if that window is not over."""
+    calendar = np.arange(days[0], days[-1] + horizon + 2)
+    known = np.isin(rev_guide, guide_id) & (rev_day >= calendar[0]) & (rev_day <= calendar[-1])
+    daily = np.zeros((len(calendar), len(guide_id)))
+    np.add.at(daily, (np.searchsorted(calendar, rev_day[known]), np.searchsorted(guide_id, rev_guide[known])),
+              rev_amount[known])
+    cum = np.vstack([np.zeros(len(guide_id)), np.cumsum(daily, axis=0)])
+    start = np.searchsorted(calendar, days) + 1
+    revenue = cum[start + horizon] - cum[start]
+    revenue[days + horizon >= today] = np.nan
+    return revenue
+
+
+def load_history(conn, days: int, horizon: int) -> History:
+    """Daily factor snapshots and forward revenue from Postgres."""
+    with conn.cursor() as cur:
+        snap_day, guide, active, stored, *factors = _columns(
+            cur, HISTORY_QUERY, (object, np.int64, float, float) + (float,) * len(FACTORS), {'days': days})
+        snap_day = np.array(snap_day, dtype='datetime64[D]')
+        since = str(snap_day.min()) if len(snap_day) else str(date.today())
+        rev_guide, rev_day, rev_amount = _columns(cur, REVENUE_QUERY, (np.int64, object, float), {'since': since})
+    if not len(snap_day):
+        raise ValueError(f"No ranking_history rows in the last {days} days")
+    day_keys, guide_keys = np.unique(snap_day), np.unique(guide)
+    cells = lambda values: grid(day_keys, guide_keys, snap_day, guide, values)  # noqa: E731
+    revenue = forward_revenue(day_keys, guide_keys, rev_guide, np.array(rev_day, dtype='datetime64[D]'),
+                              rev_amount, horizon, np.datetime64(date.today()))
+    return History(day_keys, guide_keys, cells(np.column_stack(factors)), cells(active), cells(stored), revenue)
+
+
+# --- Configurations ---
+
+def random_configs(k: int, seed: int = 0) -> Configs:
+    """Current weights and bands, plus k-1 random variations around them."""
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(WEIGHTS * DIRICHLET_CONCENTRATION, k)
+    multipliers = np.sort(rng.uniform(0.25, 1.0, (k, len(BAND_BOUNDS))), axis=1)
+    weights[0], multipliers[0] = WEIGHTS, BASE_MULTIPLIERS
+    return Configs(weights, multipliers)
+
+
+def config_scores(h: History, cfg: Configs) -> np.ndarray:
+    """Rankings (configs, days, guides) under each config; -inf where a guide has no snapshot."""
+    base = np.moveaxis(np.nan_to_num(h.factors) @ cfg.weights.T, -1, 0)
+    band = np.searchsorted(BAND_BOUNDS, np.nan_to_num(h.days_active), side='right')
+    table = np.hstack([cfg.multipliers, np.ones((len(cfg.weights), 1))])
+    scores = base * table[:, band] * 10
+    return np.where(np.isnan(h.factors[..., 0]), -np.inf, scores)
+
+
+# --- Metrics ---
+
+def ranks(values: np.ndarray) -> np.ndarray:
+    """0-based descending rank along the last axis (-inf last)."""
+    order = np.argsort(-values, axis=-1, kind='stable')
+    out = np.empty_like(order)
+    np.put_along_axis(out, order, np.arange(values.shape[-1]), axis=-1)
+    return out
+
+
+def tie_ranks(values: np.ndarray) -> np.ndarray:
+    """Descending ranks with ties averaged, per row (revenue has many zeros)."""
+    out = np.empty(values.shape)
+    for i, row in enumerate(values):
+        _, inv, counts = np.unique(-row, return_inverse=True, return_counts=True)
+        out[i] = (np.cumsum(counts) - (counts + 1) / 2.0)[inv]
+    return out
+
+
+def masked_corr(a: np.ndarray, b: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Pearson correlation along the last axis over masked entries; NaN if under 3 or constant."""
+    n = np.maximum(mask.sum(axis=-1), 1)
+    a, b = np.where(mask, a, 0.0), np.where(mask, b, 0.0)
+    sa, sb = a.sum(axis=-1), b.sum(axis=-1)
+    cov = np.einsum('...i,...i->...', a, b) - sa * sb / n
+    var = (np.einsum('...i,...i->...', a, a) - sa * sa / n) * (np.einsum('...i,...i->...', b, b) - sb * sb / n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where((n >= 3) & (var > 1e-12), cov / np.sqrt(np.maximum(var, 1e-12)), np.nan)
+
+
+def chunk_metrics(h: History, cfg: Configs, top: int, base_top: np.ndarray, revenue_rank: np.ndarray) -> dict:
+    """Metric per config for one chunk of configs."""
+    scores = config_scores(h, cfg)
+    present = np.isfinite(scores)
+    rank = ranks(scores).astype(float)
+    in_top = (rank < top) & present
+    both = present[:, 1:] & present[:, :-1]
+    with np.errstate(invalid='ignore'):
+        return {
+            'stability': np.nanmean(masked_corr(rank[:, 1:], rank[:, :-1], both), axis=1),
+            'churn': 1 - np.mean(np.sum(in_top[:, 1:] & in_top[:, :-1], axis=-1), axis=1) / top,
+            'revenue': np.nanmean(masked_corr(rank, revenue_rank, present & ~np.isnan(h.revenue)), axis=1),
+            'overlap': np.mean(np.sum(in_top & base_top, axis=-1), axis=1) / top,
+        }
+
+
+def evaluate(h: History, cfg: Configs, top: int) -> dict:
+    """Metrics for every config, scored CONFIG_CHUNK configs at a time."""
+    base_rank = ranks(config_scores(h, Configs(cfg.weights[:1], cfg.multipliers[:1])))[0]
+    base_top = (base_rank < top) & ~np.isnan(h.factors[..., 0])
+    revenue_rank = tie_ranks(np.nan_to_num(h.revenue))
+    parts = [chunk_metrics(h, Configs(cfg.weights[i:i + CONFIG_CHUNK], cfg.multipliers[i:i + CONFIG_CHUNK]),
+                           top, base_top, revenue_rank)
+             for i in range(0, len(cfg.weights), CONFIG_CHUNK)]
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def replay_error(h: History) -> float:
+    """Max |current weights replayed - stored ranking_score| (factors are stored to 3 decimals)."""
+    replayed = weighted_ranking(np.nan_to_num(h.factors), np.nan_to_num(h.days_active))
+    return float(np.nanmax(np.abs(replayed - h.stored))) if np.isfinite(h.stored).any() else 0.0
+
+
+# --- Report ---
+
+def describe(cfg: Configs, i: int) -> str:
+    """'35/15/15/...  0.50/0.75/0.90' for config i."""
+    weights = '/'.join(f"{w * 100:.0f}" for w in cfg.weights[i])
+    return f"{weights:<30} {'/'.join(f'{m:.2f}' for m in cfg.multipliers[i])}"
+
+
+def print_report(cfg: Configs, metrics: dict, show: int):
+    """Current config, then the best configs by revenue correlation."""
+    order = [0] + [i for i in np.argsort(-np.nan_to_num(metrics['revenue'], nan=-2)) if i != 0][:show]
+    print(f"Weights %: {' / '.join(f.replace('_score', '') for f in FACTORS)}")
+    print(f"Bands: multiplier below {' / '.join(f'{b}d' for b in BAND_BOUNDS)}")
+    print("=" * 100)
+    print(f"{'#':<6} {'Weights %':<30} {'Bands':<15} {'Revenue':>8} {'Stable':>7} {'Churn':>6} {'Overlap':>8}")
+    print("=" * 100)
+    for i in order:
+        label = 'now' if i == 0 else str(i)
+        print(f"{label:<6} {describe(cfg, i)}  {metrics['revenue'][i]:>8.3f} {metrics['stability'][i]:>7.3f} "
+              f"{metrics['churn'][i]:>6.2f} {metrics['overlap'][i]:>8.2f}")
+    print("=" * 100)
+
+
+# --- Synthetic ---
+
+def synthetic_history(days: int = 90, guides: int = 30, horizon: int = 7, seed: int = 0) -> History:
+    """Slowly drifting factors, with revenue driven by repeat, volume and activity."""
+    rng = np.random.default_rng(seed)
+    drift = np.cumsum(rng.normal(0, 0.02, (days, guides, len(FACTORS))), axis=0)
+    factors = np.clip(rng.uniform(0, 1, (1, guides, len(FACTORS))) + drift, 0, 1)
+    active = np.clip(np.round(factors[..., 3] * 20 + rng.normal(0, 2, (days, guides))), 0, 30)
+    factors[rng.random((days, guides)) < 0.05] = np.nan
+    driver = factors[..., 0] * 3 + factors[..., 2] * 2 + active / 10
+    revenue = np.maximum(0, np.nan_to_num(driver) * 500 + rng.normal(0, 300, (days, guides)))
+    revenue[-horizon:] = np.nan
+    day_keys = np.datetime64(date.today() - timedelta(days=days)) + np.arange(days)
+    stored = np.round(weighted_ranking(np.nan_to_num(factors), active), 2)
+    return History(day_keys, np.arange(1, guides + 1), factors, active, stored, revenue)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="What-if backtest of ranking weights over ranking_history")
+    parser.add_argument('--days', type=int, default=90, help="history window (days)")
+    parser.add_argument('--configs', type=int, default=5000, help="weight configurations to try")
+    parser.add_argument('--top', type=int, default=10, help="top-N used for churn and overlap")
+    parser.add_argument('--horizon', type=int, default=7, help="days of revenue after each snapshot")
+    parser.add_argument('--show', type=int, default=15, help="best configs to print")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--synthetic', action='store_true', help="use synthetic history instead of Postgres")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        history = synthetic_history(args.days, horizon=args.horizon, seed=args.seed)
+    else:
+        import psycopg2
+        from get_rankings_pg import PG_CONFIG
+        conn = psycopg2.connect(**PG_CONFIG)
+        history = load_history(conn, args.days, args.horizon)
+        conn.close()
+    print(f"{len(history.days)} days x {len(history.guide_id)} guides, "
+          f"replay check: max |delta| vs stored ranking_score {replay_error(history):.3f}")
+
+    configs = random_configs(args.configs, args.seed)
+    started = time.perf_counter()
+    metrics = evaluate(history, configs, args.top)
+    elapsed = time.perf_counter() - started
+    print_report(configs, metrics, args.show)
+    print(f"{args.configs} configs in {elapsed:.2f}s ({args.configs / elapsed:,.0f} configs/s)")
@@ -0,0 +1,765 @@
+#!/usr/bin/env python3
+"""
+Guide ranking engine - the 9-factor algorithm computed in-process with NumPy.
+9-factor algorithm: Repeat=35%, AOV=15%, Volume=15%, Activity=15%, Rating=5%, Response=5%, Consistency=5%, Reliability=3%, Experience=2%
+Activity multiplier penalty: <5d=0.5x, 5-10d=0.75x, 10-15d=0.9x, 15+d=1.0x
+
+Same results and output dicts as get_rankings_pg.RANKING_QUERY, but the
+database only returns compact event arrays (one row per consultation,
+feedback and SPENT transaction, plus each user's latest ADD). The
+per-(user, guide) first-spend / add-after / spend-again logic that the SQL
+does with a window over all SPENT rows and two self-joins is a sort and a
+group-by here.
+
+--incremental keeps the per-guide aggregates in RANKING_STATE_FILE with
+per-table watermarks, so a run only reads consultations, feedback and
+wallet transactions changed since the previous one.
+
+Usage:
+    python ranking_engine.py                      # print rankings (full recompute)
+    python ranking_engine.py --incremental        # update the saved state, rank from it
+    python ranking_engine.py --rebuild            # discard the state and replay all history
+    python ranking_engine.py --verify             # compare with the SQL version on the replica
+    python ranking_engine.py --verify-incremental # compare state + changes with a full recompute
+    python ranking_engine.py --check-incremental  # offline check on synthetic edits/deletes
+    python ranking_engine.py --dsn "dbname=astrokiran_fixture" --fixture 7
+                                                  # seed ranking_fixture, run both verifications
+    python ranking_engine.py --bench 1 10 100     # synthetic data at 1x/10x/100x volume
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+import psycopg2
+
+import availability_sessions
+from guide_identity import cursor_fetch
+from get_rankings_pg import PG_CONFIG, TEST_GUIDES, RANKING_QUERY, print_table, ranking_params
+from neo4j_sync import SYNC_COMMIT_LAG, TABLES, Table, window
+
+FACTORS = ('repeat_score', 'aov_score', 'volume_score', 'activity_score', 'rating_score',
+           'response_score', 'consistency_score', 'reliability_score', 'experience_score')
+WEIGHTS = np.array([0.35, 0.15, 0.15, 0.15, 0.05, 0.05, 0.05, 0.03, 0.02])
+# (days_active below, multiplier); 1.0 from the last bound up
+MULTIPLIER_BANDS = ((5, 0.5), (10, 0.75), (15, 0.9))
+
+COMPLETED, CANCELLED, OTHER = 1, 2, 0   # consultation state codes
+PAIR_SHIFT = 40                         # (guide index << 40) | user_id packs a pair into int64
+EXPERIENCE_SECONDS = 24.0 * 30 * 24 * 3600
+
+
+class Guides(NamedTuple):
+    guide_id: np.ndarray        # ranked guides, sorted by id
+    guide_name: list
+    guide_age: np.ndarray       # seconds since created_at, NaN if unknown
+    guide_months: np.ndarray    # months on platform (Postgres AGE)
+    activity_guide: np.ndarray  # days active in the last 30 days, per guide id
+    activity_days: np.ndarray
+
+
+class Events(NamedTuple):
+    guide_id: np.ndarray        # Guides fields first, so an Events can be scored directly
+    guide_name: list
+    guide_age: np.ndarray
+    guide_months: np.ndarray
+    activity_guide: np.ndarray
+    activity_days: np.ndarray
+    cons_guide: np.ndarray
+    cons_customer: np.ndarray   # -1 if NULL
+    cons_state: np.ndarray      # COMPLETED / CANCELLED / OTHER
+    cons_response: np.ndarray   # accepted_at - requested_at seconds, NaN if NULL
+    fb_guide: np.ndarray        # feedback on completed consultations
+    fb_rating: np.ndarray       # NaN if NULL
+    spend_user: np.ndarray      # SPENT transactions
+    spend_guide: np.ndarray
+    spend_at: np.ndarray        # epoch seconds
+    spend_real: np.ndarray      # real_cash_delta
+    add_user: np.ndarray        # latest ADD per user, sorted by user
+    add_last: np.ndarray
+
+
+# --- Extraction ---
+
+EVENT_QUERIES = {
+    'guides': """
+        SELECT id, full_name, EXTRACT(EPOCH FROM (NOW() - created_at))::float8,
+               EXTRACT(MONTH FROM AGE(NOW(), created_at))::int +
+                   EXTRACT(YEAR FROM AGE(NOW(), created_at))::int * 12
+        FROM guide.guide_profile
+        WHERE deleted_at IS NULL AND full_name NOT IN %(test_guides)s
+        ORDER BY id""",
+    'consultations': """
+        SELECT guide_id, customer_id,
+               CASE WHEN state = 'completed' THEN 1
+                    WHEN state IN ('cancelled', 'guide_rejected') THEN 2 ELSE 0 END,
+               EXTRACT(EPOCH FROM (accepted_at - requested_at))::float8
+        FROM consultation.consultation
+        WHERE deleted_at IS NULL AND guide_id IS NOT NULL""",
+    'feedback': """
+        SELECT c.guide_id, f.rating::float8
+        FROM consultation.consultation c
+        JOIN consultation.feedback f ON f.consultation_id = c.id AND f.deleted_at IS NULL
+        WHERE c.state = 'completed' AND c.deleted_at IS NULL AND c.guide_id IS NOT NULL""",
+    'spends': """
+        SELECT t.user_id, wo.consultant_id, EXTRACT(EPOCH FROM t.created_at)::float8,
+               t.real_cash_delta::float8
+        FROM wallet.wallet_transactions t
+        JOIN wallet.wallet_orders wo ON wo.order_id = t.order_id
+        WHERE t.type = 'SPENT' AND wo.consultant_id IS NOT NULL""",
+    'adds': """
+        SELECT user_id, MAX(EXTRACT(EPOCH FROM created_at))::float8
+        FROM wallet.wallet_transactions
+        WHERE type = 'ADD'
+        GROUP BY user_id
+        ORDER BY user_id""",
+}
+
+
+def _columns(cur, query: str, dtypes: tuple, params: dict = None) -> list:
+    """Run a query and return one array per column (NULL -> NaN / -1)."""
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    columns = list(zip(*rows)) if rows else [()] * len(dtypes)
+    arrays = []
+    for values, dtype in zip(columns, dtypes):
+        null = np.nan if dtype == float else -1
+        arrays.append(values if dtype == object else
+                      np.array([null if v is None else v for v in values], dtype=dtype))
+    return arrays
+
+
+def fetch_guides(cur) -> Guides:
+    """Ranked guides and their recent activity (small; re-read every run)."""
+    guides = _columns(cur, EVENT_QUERIES['guides'], (np.int64, object, float, np.int64),
+                      {'test_guides': TEST_GUIDES})
+    guides[1] = list(guides[1])
+    active = availability_sessions.days_active(cursor_fetch(cur))
+    activity = [np.fromiter(col, np.int64, len(active)) for col in (active, active.values())]
+    return Guides(*guides, *activity)
+
+
+def fetch_events(conn) -> Events:
+    """Pull the compact event arrays from Postgres."""
+    with conn.cursor() as cur:
+        guides = fetch_guides(cur)
+        cons = _columns(cur, EVENT_QUERIES['consultations'], (np.int64, np.int64, np.int8, float))
+        feedback = _columns(cur, EVENT_QUERIES['feedback'], (np.int64, float))
+        spends = _columns(cur, EVENT_QUERIES['spends'], (np.int64, np.int64, float, float))
+        adds = _columns(cur, EVENT_QUERIES['adds'], (np.int64, float))
+    return Events(*guides, *cons, *feedback, *spends, *adds)
+
+
+# --- Aggregation ---
+
+def lookup(sorted_keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Index of each value in sorted unique keys, -1 where absent."""
+    if len(sorted_keys) == 0:
+        return np.full(len(values), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(sorted_keys, values), len(sorted_keys) - 1)
+    return np.where(sorted_keys[pos] == values, pos, -1)
+
+
+def per_guide(idx: np.ndarray, n: int, weights: np.ndarray = None) -> np.ndarray:
+    """Count (or sum weights) per guide index, ignoring -1."""
+    valid = idx >= 0
+    return np.bincount(idx[valid], None if weights is None else weights[valid], minlength=n)
+
+
+def group_first(key: np.ndarray, at: np.ndarray, count: np.ndarray) -> tuple:
+    """Unique keys with the earliest `at` and the summed `count` per key."""
+    order = np.lexsort((at, key))
+    key, at, count = key[order], at[order], count[order]
+    if not len(key):
+        return key, at, count
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    return key[starts], at[starts], np.add.reduceat(count, starts)
+
+
+def spend_pairs(spend_guide: np.ndarray, spend_user: np.ndarray, spend_at: np.ndarray) -> tuple:
+    """Per-(guide id, user) SPENT groups: (packed pair key, first spend, spend count)."""
+    sel = spend_guide >= 0
+    key = (spend_guide[sel] << PAIR_SHIFT) | spend_user[sel]
+    return group_first(key, spend_at[sel], np.ones(len(key), dtype=np.int64))
+
+
+def repeat_customers(guide_id: np.ndarray, pairs: tuple, add_user: np.ndarray, add_last: np.ndarray) -> tuple:
+    """(total, repeat) customers per guide: a repeat spent again after an ADD later than their first spend."""
+    pair_key, first_at, spends = pairs
+    g = lookup(guide_id, pair_key >> PAIR_SHIFT)
+    last_add = np.append(add_last, -np.inf)[lookup(add_user, pair_key & ((1 << PAIR_SHIFT) - 1))]  # -1 -> no ADD
+    n = len(guide_id)
+    return per_guide(g, n), per_guide(g[(spends > 1) & (last_add > first_at)], n)
+
+
+def consultation_stats(guide_id: np.ndarray, cons_guide: np.ndarray, cons_customer: np.ndarray,
+                       cons_state: np.ndarray, cons_response: np.ndarray) -> dict:
+    """Per-guide consultation counts, distinct customers and response-time sums."""
+    n = len(guide_id)
+    g = lookup(guide_id, cons_guide)
+    done = cons_state == COMPLETED
+    timed = done & ~np.isnan(cons_response)
+    served = done & (g >= 0) & (cons_customer >= 0)
+    customers = np.unique((g[served] << PAIR_SHIFT) | cons_customer[served]) >> PAIR_SHIFT
+    return {
+        'completed': per_guide(g[done], n),
+        'total_cons': per_guide(g[cons_state != OTHER], n),
+        'cancelled': per_guide(g[cons_state == CANCELLED], n),
+        'unique_customers': per_guide(customers, n),
+        'response_sum': per_guide(g[timed], n, cons_response[timed]),
+        'response_n': per_guide(g[timed], n),
+    }
+
+
+def feedback_stats(guide_id: np.ndarray, fb_guide: np.ndarray, fb_rating: np.ndarray) -> dict:
+    """Per-guide review counts and rating sums."""
+    n = len(guide_id)
+    fb = lookup(guide_id, fb_guide)
+    rated = ~np.isnan(fb_rating)
+    return {
+        'review_count': per_guide(fb, n),
+        'rating_sum': per_guide(fb[rated], n, fb_rating[rated]),
+        'rating_n': per_guide(fb[rated], n),
+    }
+
+
+def days_active(guides) -> np.ndarray:
+    """Days active in the last 30 days, aligned to guide_id."""
+    return per_guide(lookup(guides.guide_id, guides.activity_guide), len(guides.guide_id),
+                     guides.activity_days).astype(np.int64)
+
+
+def aggregate(ev: Events) -> dict:
+    """Per-guide counts and sums behind every factor (arrays aligned to guide_id)."""
+    n = len(ev.guide_id)
+    sg = lookup(ev.guide_id, ev.spend_guide)
+    real = ev.spend_real < 0
+    pairs = spend_pairs(ev.spend_guide, ev.spend_user, ev.spend_at)
+    total, repeat = repeat_customers(ev.guide_id, pairs, ev.add_user, ev.add_last)
+    return {
+        **consultation_stats(ev.guide_id, ev.cons_guide, ev.cons_customer, ev.cons_state, ev.cons_response),
+        **feedback_stats(ev.guide_id, ev.fb_guide, ev.fb_rating),
+        'aov_sum': per_guide(sg[real], n, -ev.spend_real[real]),
+        'aov_n': per_guide(sg[real], n),
+        'total_customers': total,
+        'repeat_customers': repeat,
+        'days_active': days_active(ev),
+    }
+
+
+# --- Scoring ---
+
+def _ratio(num: np.ndarray, den: np.ndarray, default) -> np.ndarray:
+    """num / den where den > 0, else default."""
+    return np.where(den > 0, num / np.maximum(den, 1), default)
+
+
+def activity_multiplier(days_active: np.ndarray, bands: tuple = MULTIPLIER_BANDS) -> np.ndarray:
+    """Multiplier for each guide's days_active (works on any shape)."""
+    mult = np.ones(np.shape(days_active))
+    for bound, value in reversed(bands):
+        mult = np.where(days_active < bound, value, mult)
+    return mult
+
+
+def factor_scores(agg: dict, guide_age: np.ndarray) -> dict:
+    """The nine factor scores per guide, each in [0, 1]."""
+    completed, reviews = agg['completed'], agg['review_count']
+    avg_response = _ratio(agg['response_sum'], agg['response_n'], np.nan)
+    aov = _ratio(agg['aov_sum'], agg['aov_n'], 0.0)
+    avg_rating = _ratio(agg['rating_sum'], agg['rating_n'], 0.0)
+    return {
+        'repeat_score': _ratio(agg['repeat_customers'], agg['total_customers'], 0.0),
+        'aov_score': np.where(aov >= 50, 1.0, np.where(aov > 0, aov / 50.0, 0.0)),
+        'volume_score': np.where(completed > 0, np.minimum(np.log(np.maximum(completed, 1)) / np.log(200.0), 1.0), 0.0),
+        'activity_score': np.minimum(agg['days_active'] / 20.0, 1.0),
+        'rating_score': np.where(reviews > 0, ((reviews * avg_rating + 20.0) / (reviews + 5) - 1.0) / 4.0, 0.75),
+        'response_score': np.where(np.isnan(avg_response) | (avg_response > 300), 0.5,
+                                   np.where(avg_response <= 30, 1.0, 1.0 - (avg_response - 30) / 270.0)),
+        'consistency_score': _ratio(reviews, completed, 0.0),
+        'reliability_score': 1.0 - _ratio(agg['cancelled'], agg['total_cons'], 0.0),
+        'experience_score': np.where(np.isnan(guide_age), 0.5, np.minimum(guide_age / EXPERIENCE_SECONDS, 1.0)),
+    }
+
+
+def weighted_ranking(factors: np.ndarray, days_active: np.ndarray,
+                     weights: np.ndarray = WEIGHTS, bands: tuple = MULTIPLIER_BANDS) -> np.ndarray:
+    """Ranking = (factors . weights) * activity multiplier * 10; factors (..., 9)."""
+    return (factors @ weights) * activity_multiplier(days_active, bands) * 10
+
+
+def score(ev: Guides, agg: dict) -> list:
+    """Ranking dicts (same keys as get_rankings_pg), best first; ev may be Events or Guides."""
+    factors = factor_scores(agg, ev.guide_age)
+    matrix = np.column_stack([factors[f] for f in FACTORS]) if len(ev.guide_id) else np.zeros((0, 9))
+    ranking = weighted_ranking(matrix, agg['days_active'])
+    avg_response = _ratio(agg['response_sum'], agg['response_n'], 0.0)
+    rows = []
+    for i, guide_id in enumerate(ev.guide_id):
+        rows.append({
+            'id': int(guide_id), 'name': ev.guide_name[i], 'ranking': float(ranking[i]),
+            'activity_multiplier': float(activity_multiplier(agg['days_active'][i])),
+            **{f: float(factors[f][i]) for f in FACTORS},
+            'total_consultations': int(agg['completed'][i]),
+            'unique_customers': int(agg['unique_customers'][i]),
+            'total_customers': int(agg['total_customers'][i]),
+            'repeat_customers': int(agg['repeat_customers'][i]),
+            'avg_order_value': float(_ratio(agg['aov_sum'][i], agg['aov_n'][i], 0.0)),
+            'days_active': int(agg['days_active'][i]),
+            'avg_rating': float(_ratio(agg['rating_sum'][i], agg['rating_n'][i], 0.0)),
+            'response_seconds': int(np.floor(avg_response[i] + 0.5)),
+            'review_count': int(agg['review_count'][i]),
+            'cancelled_count': int(agg['cancelled'][i]),
+            'months_on_platform': int(ev.guide_months[i]),
+        })
+    return sorted(rows, key=lambda r: -r['ranking'])
+
+
+def compute_rankings(conn=None) -> list:
+    """Fetch events and rank guides in-process."""
+    own = conn is None
+    conn = conn or psycopg2.connect(**PG_CONFIG)
+    try:
+        events = fetch_events(conn)
+    finally:
+        if own:
+            conn.close()
+    return score(events, aggregate(events))
+
+
+# --- Incremental state ---
+# Consultations and feedback change after insert (state transitions, soft
+# deletes), so their latest compact row is kept by id and a changed row
+# replaces the earlier version. The transaction ledger is append-only, so
+# new SPENT/ADD rows are folded into running per-pair, per-guide and
+# per-user aggregates. Guides and activity are re-read every run.
+
+RANKING_STATE_FILE = os.getenv('RANKING_STATE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             '.ranking_state.npz'))
+SPENT, ADD = 1, 2                       # transaction kind codes
+START_MARK = {'ts': '-infinity', 'pk': None}
+LEDGER = Table('transaction_id', ('created_at',))
+
+
+class RankingState(NamedTuple):
+    marks: dict                 # {source: {'ts': ..., 'pk': ...}} per DELTA_QUERIES source
+    cons_id: np.ndarray         # live consultations, latest version, sorted by id
+    cons_guide: np.ndarray
+    cons_customer: np.ndarray
+    cons_state: np.ndarray
+    cons_response: np.ndarray
+    fb_id: np.ndarray           # live feedback, sorted by id
+    fb_consultation: np.ndarray
+    fb_rating: np.ndarray
+    pair_key: np.ndarray        # (guide id << PAIR_SHIFT) | user, sorted
+    pair_first: np.ndarray      # first SPENT, epoch seconds
+    pair_count: np.ndarray      # SPENT count
+    aov_guide: np.ndarray       # real-cash SPENT per guide id, sorted
+    aov_sum: np.ndarray
+    aov_n: np.ndarray
+    add_user: np.ndarray        # latest ADD per user, sorted
+    add_last: np.ndarray
+
+
+def empty_state() -> RankingState:
+    """State before the first run (the first update replays all history)."""
+    i, f = np.array([], dtype=np.int64), np.array([], dtype=float)
+    return RankingState({}, i, i, i, np.array([], dtype=np.int8), f, i, i, f, i, f, i, i, f, i, i, f)
+
+
+def load_state(path: str = RANKING_STATE_FILE) -> RankingState:
+    """Saved state, or an empty one."""
+    if not os.path.exists(path):
+        return empty_state()
+    with np.load(path) as saved:
+        return RankingState(json.loads(str(saved['marks'])), *(saved[f] for f in RankingState._fields[1:]))
+
+
+def save_state(state: RankingState, path: str = RANKING_STATE_FILE):
+    """Atomically replace the state file (temp file, fsync, rename)."""
+    arrays = {**state._asdict(), 'marks': json.dumps(state.marks)}
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# Each query returns (change ts, pk, ...) ordered by the watermark
+DELTA_QUERIES = {
+    'consultations': f"""
+        SELECT {TABLES['consultations'].change_ts}, id, guide_id, customer_id,
+               CASE WHEN state = 'completed' THEN 1
+                    WHEN state IN ('cancelled', 'guide_rejected') THEN 2 ELSE 0 END,
+               EXTRACT(EPOCH FROM (accepted_at - requested_at))::float8,
+               deleted_at IS NOT NULL
+        FROM consultation.consultation
+        WHERE {window(TABLES['consultations'])}
+        ORDER BY 1, 2""",
+    'feedback': f"""
+        SELECT {TABLES['feedback'].change_ts}, id, consultation_id, rating::float8, deleted_at IS NOT NULL
+        FROM consultation.feedback
+        WHERE {window(TABLES['feedback'])}
+        ORDER BY 1, 2""",
+    'transactions': f"""
+        SELECT t.created_at, t.transaction_id, CASE WHEN t.type = 'SPENT' THEN 1 ELSE 2 END,
+               t.user_id, wo.consultant_id, EXTRACT(EPOCH FROM t.created_at)::float8,
+               t.real_cash_delta::float8
+        FROM (SELECT * FROM wallet.wallet_transactions
+              WHERE type IN ('SPENT', 'ADD') AND {window(LEDGER)}) t
+        LEFT JOIN wallet.wallet_orders wo ON wo.order_id = t.order_id
+        ORDER BY 1, 2""",
+}
+
+DELTA_DTYPES = {
+    'consultations': (np.int64, np.int64, np.int64, np.int8, float, bool),
+    'feedback': (np.int64, np.int64, float, bool),
+    'transactions': (object, np.int8, np.int64, np.int64, float, float),
+}
+
+
+def pg_until(cur, lag: int = SYNC_COMMIT_LAG):
+    """Database time minus the commit lag (see neo4j_sync.pg_until)."""
+    cur.execute("SELECT now() - %s * INTERVAL '1 second'", (lag,))
+    return cur.fetchone()[0]
+
+
+def fetch_delta(cur, source: str, mark: dict, until) -> tuple:
+    """Columns (pk first) of rows changed past a watermark, and the advanced watermark."""
+    cols = _columns(cur, DELTA_QUERIES[source], (object, *DELTA_DTYPES[source]),
+                    {'ts': mark['ts'], 'pk': mark['pk'], 'until': until})
+    if len(cols[0]):
+        pk = cols[1][-1]
+        mark = {'ts': cols[0][-1].isoformat(), 'pk': pk.item() if isinstance(pk, np.generic) else pk}
+    return cols[1:], mark
+
+
+def replace_rows(ids: np.ndarray, columns: tuple, new_ids: np.ndarray, new_columns: tuple,
+                 live: np.ndarray) -> tuple:
+    """Keyed rows with each id's last new version replacing the old one; not-live ids dropped."""
+    _, last_rev = np.unique(new_ids[::-1], return_index=True)
+    latest = len(new_ids) - 1 - last_rev
+    latest = latest[live[latest]]
+    keep = ~np.isin(ids, new_ids)
+    merged = [np.concatenate([old[keep], new[latest]]) for old, new in zip((ids, *columns), (new_ids, *new_columns))]
+    order = np.argsort(merged[0], kind='stable')
+    return tuple(col[order] for col in merged)
+
+
+def group_sum(key: np.ndarray, value: np.ndarray, count: np.ndarray) -> tuple:
+    """Unique keys with summed value and count."""
+    keys, inv = np.unique(key, return_inverse=True)
+    return keys, np.bincount(inv, value, len(keys)), np.bincount(inv, count, len(keys)).astype(np.int64)
+
+
+def group_max(key: np.ndarray, value: np.ndarray) -> tuple:
+    """Unique keys with the largest value."""
+    keys, inv = np.unique(key, return_inverse=True)
+    best = np.full(len(keys), -np.inf)
+    np.maximum.at(best, inv, value)
+    return keys, best
+
+
+def apply_consultations(state: RankingState, delta: tuple) -> RankingState:
+    """Replace changed consultations; deleted ones drop out."""
+    ids, guide, customer, cons_state, response, deleted = delta
+    rows = replace_rows(state.cons_id, (state.cons_guide, state.cons_customer, state.cons_state, state.cons_response),
+                        ids, (guide, customer, cons_state, response), ~deleted)
+    return state._replace(**dict(zip(RankingState._fields[1:6], rows)))
+
+
+def apply_feedback(state: RankingState, delta: tuple) -> RankingState:
+    """Replace changed feedback; deleted ones drop out."""
+    ids, consultation, rating, deleted = delta
+    rows = replace_rows(state.fb_id, (state.fb_consultation, state.fb_rating), ids, (consultation, rating), ~deleted)
+    return state._replace(**dict(zip(RankingState._fields[6:9], rows)))
+
+
+def apply_transactions(state: RankingState, delta: tuple) -> RankingState:
+    """Fold new SPENT/ADD rows into the pair, AOV and latest-ADD aggregates."""
+    _, kind, user, guide, at, real_cash = delta
+    spent, added = kind == SPENT, kind == ADD
+    new_key, new_first, new_count = spend_pairs(guide[spent], user[spent], at[spent])
+    pairs = group_first(np.concatenate([state.pair_key, new_key]), np.concatenate([state.pair_first, new_first]),
+                        np.concatenate([state.pair_count, new_count]))
+    real = spent & (guide >= 0) & (real_cash < 0)
+    aov = group_sum(np.concatenate([state.aov_guide, guide[real]]), np.concatenate([state.aov_sum, -real_cash[real]]),
+                    np.concatenate([state.aov_n, np.ones(real.sum(), dtype=np.int64)]))
+    adds = group_max(np.concatenate([state.add_user, user[added]]), np.concatenate([state.add_last, at[added]]))
+    return state._replace(pair_key=pairs[0], pair_first=pairs[1], pair_count=pairs[2],
+                          aov_guide=aov[0], aov_sum=aov[1], aov_n=aov[2], add_user=adds[0], add_last=adds[1])
+
+
+DELTA_APPLY = {
+    'consultations': apply_consultations,
+    'feedback': apply_feedback,
+    'transactions': apply_transactions,
+}
+
+
+def update_state(conn, state: RankingState, until) -> tuple:
+    """Fold rows changed since the watermarks (up to `until`) into the state; returns (state, rows read)."""
+    marks, rows = dict(state.marks), 0
+    with conn.cursor() as cur:
+        for source, apply in DELTA_APPLY.items():
+            delta, marks[source] = fetch_delta(cur, source, marks.get(source, START_MARK), until)
+            state = apply(state, delta)
+            rows += len(delta[0])
+    return state._replace(marks=marks), rows
+
+
+def state_aggregate(state: RankingState, guides: Guides) -> dict:
+    """Same result as aggregate(), from the running state."""
+    n = len(guides.guide_id)
+    c = lookup(state.cons_id, state.fb_consultation)
+    rated = c >= 0
+    rated[rated] = state.cons_state[c[rated]] == COMPLETED
+    ag = lookup(guides.guide_id, state.aov_guide)
+    pairs = (state.pair_key, state.pair_first, state.pair_count)
+    total, repeat = repeat_customers(guides.guide_id, pairs, state.add_user, state.add_last)
+    return {
+        **consultation_stats(guides.guide_id, state.cons_guide, state.cons_customer, state.cons_state,
+                             state.cons_response),
+        **feedback_stats(guides.guide_id, state.cons_guide[c[rated]], state.fb_rating[rated]),
+        'aov_sum': per_guide(ag, n, state.aov_sum),
+        'aov_n': per_guide(ag, n, state.aov_n),
+        'total_customers': total,
+        'repeat_customers': repeat,
+        'days_active': days_active(guides),
+    }
+
+
+def incremental_rankings(conn=None, path: str = RANKING_STATE_FILE) -> list:
+    """Rank from the saved state plus rows changed since the last run, then save the state."""
+    own = conn is None
+    conn = conn or psycopg2.connect(**PG_CONFIG)
+    try:
+        with conn.cursor() as cur:
+            until = pg_until(cur)
+            guides = fetch_guides(cur)
+        state, rows = update_state(conn, load_state(path), until)
+    finally:
+        if own:
+            conn.close()
+    save_state(state, path)
+    print(f"Incremental ranking: {rows} changed rows since the last run")
+    return score(guides, state_aggregate(state, guides))
+
+
+# --- Verification ---
+
+COMPARE_TOLERANCE = 1e-6
+
+
+def diff_rankings(expected: list, actual: list, tolerance: float = COMPARE_TOLERANCE) -> list:
+    """Human-readable differences between two ranking lists, matched by guide id."""
+    actual_by_id = {r['id']: r for r in actual}
+    diffs = [f"guide {r['id']} missing" for r in expected if r['id'] not in actual_by_id]
+    diffs += [f"guide {i} unexpected" for i in actual_by_id.keys() - {r['id'] for r in expected}]
+    for exp in expected:
+        act = actual_by_id.get(exp['id'], {})
+        for key, value in exp.items():
+            if key in ('id', 'name') or key not in act:
+                continue
+            if abs(float(value or 0) - float(act[key] or 0)) > tolerance:
+                diffs.append(f"guide {exp['id']} {key}: {value} != {act[key]}")
+    return diffs
+
+
+def report_diffs(expected: list, actual: list) -> int:
+    """Print differences; exit status 1 if there are any."""
+    diffs = diff_rankings(expected, actual)
+    for line in diffs:
+        print(line)
+    print(f"{len(expected)} guides compared: " + (f"{len(diffs)} differences" if diffs else "identical"))
+    return 1 if diffs else 0
+
+
+def snapshot_conn(dsn: str = None):
+    """Read-only connection where every query sees the same snapshot (replica unless dsn)."""
+    conn = psycopg2.connect(dsn) if dsn else psycopg2.connect(**PG_CONFIG)
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    return conn
+
+
+def verify(dsn: str = None) -> int:
+    """Compare the engine with get_rankings_pg.RANKING_QUERY on the same snapshot."""
+    from psycopg2.extras import RealDictCursor
+    conn = snapshot_conn(dsn)
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(RANKING_QUERY, ranking_params(conn))
+        expected = [dict(r) for r in cur.fetchall()]
+    actual = compute_rankings(conn)
+    conn.close()
+    return report_diffs(expected, actual)
+
+
+def verify_incremental(path: str = RANKING_STATE_FILE, dsn: str = None) -> int:
+    """Compare saved state + changes with a full recompute on one snapshot (state not saved)."""
+    conn = snapshot_conn(dsn)
+    state, rows = update_state(conn, load_state(path), 'infinity')
+    with conn.cursor() as cur:
+        guides = fetch_guides(cur)
+    expected = compute_rankings(conn)
+    conn.close()
+    print(f"State at {path} plus {rows} changed rows vs full recompute")
+    return report_diffs(expected, score(guides, state_aggregate(state, guides)))
+
+
+def verify_fixture(dsn: str, seed: int) -> int:
+    """Seed ranking_fixture tables, run verify(), build a state, edit the tables, run verify_incremental()."""
+    import tempfile
+    import ranking_fixture
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep fixture sessions and state out of the real local stores
+        availability_sessions.AVAILABILITY_DB = os.path.join(tmp, 'availability.db')
+        path = os.path.join(tmp, 'state.npz')
+        ranking_fixture.seed_fixture(conn, seed)
+        failed = verify(dsn)
+        save_state(update_state(conn, load_state(path), 'infinity')[0], path)
+        ranking_fixture.edit_fixture(conn, seed)
+        failed |= verify_incremental(path, dsn)
+    conn.close()
+    return failed
+
+
+# --- Benchmark ---
+
+# Roughly the current production volume (see ranking.log)
+BENCH_BASE = {'guides': 30, 'customers': 2500, 'consultations': 4000,
+              'feedback': 1200, 'spends': 6000, 'adds': 4000}
+
+
+def synthetic_events(scale: int, seed: int = 0) -> Events:
+    """Random events at scale x BENCH_BASE (guides fixed)."""
+    rng = np.random.default_rng(seed)
+    size = {k: v * (scale if k != 'guides' else 1) for k, v in BENCH_BASE.items()}
+    guides = np.arange(1, size['guides'] + 1)
+    users = rng.integers(1, size['customers'] + 1, size['spends'])
+    add_users = np.unique(rng.integers(1, size['customers'] + 1, size['adds']))
+    year = 365 * 86400.0
+    return Events(
+        guides, [f"Guide {g}" for g in guides], rng.uniform(0, 3 * year, len(guides)), rng.integers(0, 36, len(guides)),
+        guides, rng.integers(0, 31, len(guides)),
+        rng.integers(1, size['guides'] + 1, size['consultations']), rng.integers(1, size['customers'] + 1, size['consultations']),
+        rng.choice([COMPLETED, COMPLETED, COMPLETED, CANCELLED, OTHER], size['consultations']).astype(np.int8),
+        np.where(rng.random(size['consultations']) < 0.1, np.nan, rng.exponential(60, size['consultations'])),
+        rng.integers(1, size['guides'] + 1, size['feedback']), rng.integers(1, 6, size['feedback']).astype(float),
+        users, rng.integers(1, size['guides'] + 1, size['spends']), rng.uniform(0, year, size['spends']),
+        -rng.exponential(40, size['spends']) * (rng.random(size['spends']) < 0.8),
+        add_users, rng.uniform(0, year, len(add_users)),
+    )
+
+
+def bench(scales: list, repeats: int = 3):
+    """Time aggregate + score on synthetic data at each scale."""
+    print(f"{'Scale':>6}  {'SPENT rows':>11}  {'Consults':>9}  {'Rank (ms)':>10}")
+    for scale in scales:
+        events = synthetic_events(scale)
+        best = float('inf')
+        for _ in range(repeats):
+            started = time.perf_counter()
+            score(events, aggregate(events))
+            best = min(best, time.perf_counter() - started)
+        print(f"{scale:>5}x  {len(events.spend_user):>11}  {len(events.cons_guide):>9}  {best * 1000:>10.1f}")
+
+
+def synthetic_changes(scale: int, seed: int = 0) -> tuple:
+    """Synthetic events as two batches of delta rows, the second with edits and
+    deletes of earlier rows; returns (batches, Events for the final tables)."""
+    ev, rng = synthetic_events(scale, seed), np.random.default_rng(seed + 1)
+    nc, nf = len(ev.cons_guide), len(ev.fb_guide)
+    cons_id, fb_id, fb_cons = np.arange(1, nc + 1), np.arange(1, nf + 1), rng.integers(1, nc + 1, nf)
+    edited = rng.choice(nc, nc // 10, replace=False)
+    new_state = rng.choice([COMPLETED, CANCELLED, OTHER], len(edited)).astype(np.int8)
+    gone = rng.random(len(edited)) < 0.2
+    fb_gone = rng.choice(nf, nf // 20, replace=False)
+    no = np.zeros(nc, dtype=bool)
+    cons = (cons_id, ev.cons_guide, ev.cons_customer, ev.cons_state, ev.cons_response, no)
+    cons_edits = (cons_id[edited], ev.cons_guide[edited], ev.cons_customer[edited], new_state,
+                  ev.cons_response[edited], gone)
+    fb = (fb_id, fb_cons, ev.fb_rating, np.zeros(nf, dtype=bool))
+    fb_deletes = (fb_id[fb_gone], fb_cons[fb_gone], ev.fb_rating[fb_gone], np.ones(len(fb_gone), dtype=bool))
+    kind = np.r_[np.full(len(ev.spend_user), SPENT), np.full(len(ev.add_user), ADD)].astype(np.int8)
+    at = np.r_[ev.spend_at, ev.add_last]
+    tx = (np.array([f"tx{i}" for i in range(len(at))], dtype=object), kind, np.r_[ev.spend_user, ev.add_user],
+          np.r_[ev.spend_guide, np.full(len(ev.add_user), -1)], at, np.r_[ev.spend_real, np.full(len(ev.add_user), np.nan)])
+    tx = tuple(col[np.argsort(at, kind='stable')] for col in tx)
+
+    def split(cols, first):
+        return tuple(c[:first] for c in cols), tuple(c[first:] for c in cols)
+
+    (cons1, cons2), (fb1, fb2), (tx1, tx2) = split(cons, nc * 7 // 10), split(fb, nf * 7 // 10), split(tx, len(at) * 7 // 10)
+    batches = [
+        {'consultations': cons1, 'feedback': fb1, 'transactions': tx1},
+        {'consultations': tuple(np.r_[a, b] for a, b in zip(cons2, cons_edits)),
+         'feedback': tuple(np.r_[a, b] for a, b in zip(fb2, fb_deletes)), 'transactions': tx2},
+    ]
+    final_state = ev.cons_state.copy()
+    final_state[edited] = new_state
+    live = np.ones(nc, dtype=bool)
+    live[edited[gone]] = False
+    fb_live = np.ones(nf, dtype=bool)
+    fb_live[fb_gone] = False
+    fb_live &= live[fb_cons - 1] & (final_state[fb_cons - 1] == COMPLETED)
+    final = ev._replace(cons_guide=ev.cons_guide[live], cons_customer=ev.cons_customer[live],
+                        cons_state=final_state[live], cons_response=ev.cons_response[live],
+                        fb_guide=ev.cons_guide[fb_cons[fb_live] - 1], fb_rating=ev.fb_rating[fb_live])
+    return batches, final
+
+
+def check_incremental(scale: int = 1) -> int:
+    """Full aggregate vs state folded from two synthetic batches (saved and reloaded in between)."""
+    import tempfile
+    batches, final = synthetic_changes(scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.npz')
+        for batch in batches:
+            state = load_state(path)
+            for source, apply in DELTA_APPLY.items():
+                state = apply(state, batch[source])
+            save_state(state, path)
+        state = load_state(path)
+    print(f"Synthetic {scale}x: {len(final.cons_guide)} live consultations, {len(final.fb_guide)} counted reviews")
+    return report_diffs(score(final, aggregate(final)), score(final, state_aggregate(state, final)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="In-process guide ranking engine")
+    parser.add_argument('--verify', action='store_true', help="compare with the SQL ranking query")
+    parser.add_argument('--bench', type=int, nargs='*', help="benchmark at these volume multiples")
+    parser.add_argument('--incremental', action='store_true', help="update the saved state and rank from it")
+    parser.add_argument('--rebuild', action='store_true', help="discard the saved state first (full replay)")
+    parser.add_argument('--verify-incremental', action='store_true', help="compare state + changes with a full recompute")
+    parser.add_argument('--check-incremental', type=int, nargs='?', const=1, metavar='SCALE',
+                        help="offline check of the state updates on synthetic data")
+    parser.add_argument('--dsn', help="libpq connection string for the verify options (default: the replica)")
+    parser.add_argument('--fixture', type=int, metavar='SEED',
+                        help="seed ranking_fixture tables in --dsn and run both verifications on them")
+    args = parser.parse_args()
+
+    if args.fixture is not None:
+        if not args.dsn:
+            parser.error("--fixture needs --dsn (a database named *fixture* or *test*)")
+        sys.exit(verify_fixture(args.dsn, args.fixture))
+    elif args.verify:
+        sys.exit(verify(args.dsn))
+    elif args.verify_incremental:
+        sys.exit(verify_incremental(dsn=args.dsn))
+    elif args.check_incremental:
+        sys.exit(check_incremental(args.check_incremental))
+    elif args.bench is not None:
+        bench(args.bench or [1, 10, 100])
+    else:
+        if args.rebuild and os.path.exists(RANKING_STATE_FILE):
+            os.remove(RANKING_STATE_FILE)
+        rankings = incremental_rankings() if args.incremental or args.rebuild else compute_rankings()
+        print_table(rankings)
+        print(f"\nTotal: {len(rankings)} guides")
@@ -0,0 +1,175 @@
+"""
+Ranking fixture - seeded tables for re-running the ranking parity checks.
+
+Creates minimal guide/consultation/wallet/audit tables holding just the
+columns the ranking SQL, ranking_engine and availability_sessions read,
+and fills them from a seed: guides (two of them excluded test guides, some
+deleted), 40 days of availability flips, consultations in every state,
+feedback, orders for guides that may not exist, and SPENT/ADD transactions.
+edit_fixture() then changes, soft-deletes and appends rows the way live
+traffic does, so an incremental state built before it has deltas to fold.
+
+Used by `ranking_engine.py --dsn ... --fixture SEED`; it only seeds a
+database whose name contains 'fixture' or 'test'.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from psycopg2.extras import execute_values
+
+from get_rankings_pg import TEST_GUIDES
+
+FIXTURE_GUIDES = 40
+FIXTURE_USERS = 600
+FIXTURE_CONSULTATIONS = 4000
+FIXTURE_FEEDBACK = 1500
+FIXTURE_ORDERS = 5000
+FIXTURE_TRANSACTIONS = 9000
+
+FIXTURE_DDL = """
+DROP SCHEMA IF EXISTS guide, consultation, wallet, audit CASCADE;
+CREATE SCHEMA guide;
+CREATE SCHEMA consultation;
+CREATE SCHEMA wallet;
+CREATE SCHEMA audit;
+CREATE TABLE guide.guide_profile (
+    id bigint PRIMARY KEY, full_name varchar NOT NULL, availability_state varchar,
+    created_at timestamptz DEFAULT now(), updated_at timestamptz DEFAULT now(), deleted_at timestamptz);
+CREATE TABLE audit.logged_actions (
+    event_id bigserial PRIMARY KEY, schema_name text, table_name text, action text,
+    action_tstamp timestamptz, original_data jsonb, new_data jsonb);
+CREATE TABLE consultation.consultation (
+    id integer PRIMARY KEY, guide_id bigint, customer_id bigint, state text,
+    requested_at timestamptz, accepted_at timestamptz,
+    created_at timestamptz DEFAULT now(), updated_at timestamptz DEFAULT now(), deleted_at timestamptz);
+CREATE TABLE consultation.feedback (
+    id serial PRIMARY KEY, consultation_id bigint UNIQUE, rating smallint,
+    created_at timestamptz DEFAULT now(), updated_at timestamptz DEFAULT now(), deleted_at timestamptz);
+CREATE TABLE wallet.wallet_orders (
+    order_id bigint PRIMARY KEY, user_id bigint, consultant_id bigint, created_at timestamp DEFAULT now());
+CREATE TABLE wallet.wallet_transactions (
+    transaction_id varchar PRIMARY KEY, id bigint, user_id bigint, order_id bigint, type text,
+    real_cash_delta numeric, created_at timestamp DEFAULT now());
+CREATE INDEX ON consultation.consultation (updated_at);
+CREATE INDEX ON consultation.feedback (updated_at);
+CREATE INDEX ON wallet.wallet_transactions (created_at);
+CREATE INDEX ON audit.logged_actions (action_tstamp);
+"""
+
+CONSULTATION_STATES = ['completed'] * 6 + ['cancelled', 'guide_rejected', 'requested', 'failed']
+
+
+def check_fixture_db(conn) -> str:
+    """Name of the connected database, or raise unless it looks like a fixture."""
+    dbname = conn.get_dsn_parameters().get('dbname', '')
+    if 'fixture' not in dbname and 'test' not in dbname:
+        raise SystemExit(f"Refusing to seed fixture tables in database '{dbname}'")
+    return dbname
+
+
+# --- Seeding ---
+
+def guide_names() -> list:
+    """Fixture guide names; guides 4 and 5 carry the excluded test names."""
+    names = [f"Guide {g}" for g in range(1, FIXTURE_GUIDES + 1)]
+    names[3], names[4] = TEST_GUIDES
+    return names
+
+
+def seed_guides(cur, rng: random.Random, now: datetime) -> None:
+    """Guides of mixed tenure (every 13th deleted) and their ONLINE/OFFLINE flips."""
+    names = guide_names()
+    execute_values(cur, "INSERT INTO guide.guide_profile "
+                        "(id, full_name, availability_state, created_at, deleted_at) VALUES %s",
+                   [(g, names[g - 1], 'OFFLINE',
+                     now - timedelta(days=rng.choice([1, 5, 40, 200, 400, 900]), seconds=rng.randrange(86400)),
+                     now if g % 13 == 0 else None) for g in range(1, FIXTURE_GUIDES + 1)])
+    flips = []
+    for g in range(1, FIXTURE_GUIDES + 1):
+        at, state = now - timedelta(days=40), 'OFFLINE'
+        while at < now:
+            at += timedelta(hours=rng.expovariate(1 / 30))
+            new = 'ONLINE_AVAILABLE' if state == 'OFFLINE' else 'OFFLINE'
+            flips.append(('guide', 'guide_profile', 'U', at,
+                          json.dumps({'id': g, 'full_name': names[g - 1], 'availability_state': state}),
+                          json.dumps({'id': g, 'full_name': names[g - 1], 'availability_state': new})))
+            state = new
+    execute_values(cur, "INSERT INTO audit.logged_actions "
+                        "(schema_name, table_name, action, action_tstamp, original_data, new_data) VALUES %s", flips)
+
+
+def seed_consultations(cur, rng: random.Random, now: datetime) -> None:
+    """Consultations (a few for unknown guides, some soft-deleted) and feedback on every other one."""
+    rows = []
+    for c in range(1, FIXTURE_CONSULTATIONS + 1):
+        requested = now - timedelta(days=rng.uniform(0, 300))
+        accepted = requested + timedelta(seconds=rng.choice([5, 20, 45, 120, 400])) if rng.random() < 0.8 else None
+        rows.append((c, rng.randrange(1, FIXTURE_GUIDES + 3), rng.randrange(1, FIXTURE_USERS),
+                     rng.choice(CONSULTATION_STATES), requested, accepted, requested,
+                     now if rng.random() < 0.03 else None))
+    execute_values(cur, "INSERT INTO consultation.consultation (id, guide_id, customer_id, state, "
+                        "requested_at, accepted_at, created_at, deleted_at) VALUES %s", rows)
+    execute_values(cur, "INSERT INTO consultation.feedback (consultation_id, rating, deleted_at) VALUES %s",
+                   [(f * 2 + rng.randrange(2), rng.randrange(1, 6), now if rng.random() < 0.05 else None)
+                    for f in range(1, FIXTURE_FEEDBACK + 1)])
+
+
+def transaction_row(rng: random.Random, t: int) -> tuple:
+    """A SPENT (real cash, zero or NULL delta) or ADD wallet transaction, without created_at."""
+    user = rng.randrange(1, FIXTURE_USERS // 3)
+    if rng.random() < 0.65:
+        real = rng.choice([-rng.uniform(1, 200), -rng.uniform(1, 200), 0, None])
+        return (f"t{t}", t if rng.random() < 0.9 else None, user, rng.randrange(1, FIXTURE_ORDERS + 1),
+                'SPENT', round(real, 2) if real else real)
+    return (f"t{t}", None, user, None, 'ADD', 100)
+
+
+def seed_wallet(cur, rng: random.Random, now: datetime) -> None:
+    """Orders (5% without a guide) and 300 days of transactions against them."""
+    execute_values(cur, "INSERT INTO wallet.wallet_orders (order_id, user_id, consultant_id) VALUES %s",
+                   [(o, rng.randrange(1, FIXTURE_USERS),
+                     rng.randrange(1, FIXTURE_GUIDES + 3) if rng.random() < 0.95 else None)
+                    for o in range(1, FIXTURE_ORDERS + 1)])
+    naive_now = now.replace(tzinfo=None)
+    execute_values(cur, "INSERT INTO wallet.wallet_transactions "
+                        "(transaction_id, id, user_id, order_id, type, real_cash_delta, created_at) VALUES %s",
+                   [(*transaction_row(rng, t), naive_now - timedelta(days=rng.uniform(0, 300), seconds=rng.randrange(60)))
+                    for t in range(1, FIXTURE_TRANSACTIONS + 1)])
+
+
+def seed_fixture(conn, seed: int) -> None:
+    """Create and fill the fixture tables (conn in autocommit)."""
+    check_fixture_db(conn)
+    rng, now = random.Random(seed), datetime.now(timezone.utc)
+    with conn.cursor() as cur:
+        cur.execute(FIXTURE_DDL)
+        seed_guides(cur, rng, now)
+        seed_consultations(cur, rng, now)
+        seed_wallet(cur, rng, now)
+        cur.execute("ANALYZE")
+
+
+# --- Live-traffic edits ---
+
+def edit_fixture(conn, seed: int) -> None:
+    """State changes, soft deletes, new feedback and new transactions (a millisecond apart from now)."""
+    check_fixture_db(conn)
+    rng, now = random.Random(seed + 1), datetime.now(timezone.utc).replace(tzinfo=None)
+    edited = rng.sample(range(1, FIXTURE_CONSULTATIONS + 1), FIXTURE_CONSULTATIONS // 10)
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            UPDATE consultation.consultation c
+            SET state = e.state, deleted_at = CASE WHEN e.gone THEN now() END, updated_at = now()
+            FROM (VALUES %s) AS e(id, state, gone) WHERE c.id = e.id""",
+                       [(c, rng.choice(CONSULTATION_STATES), rng.random() < 0.2) for c in edited])
+        cur.execute("UPDATE consultation.feedback SET deleted_at = now(), updated_at = now() "
+                    "WHERE id %% 20 = %s", (rng.randrange(20),))
+        execute_values(cur, "INSERT INTO consultation.feedback (consultation_id, rating) VALUES %s "
+                            "ON CONFLICT (consultation_id) DO NOTHING",
+                       [(rng.randrange(1, FIXTURE_CONSULTATIONS + 1), rng.randrange(1, 6)) for _ in range(200)])
+        execute_values(cur, "INSERT INTO wallet.wallet_transactions "
+                            "(transaction_id, id, user_id, order_id, type, real_cash_delta, created_at) VALUES %s",
+                       [(*transaction_row(rng, t), now + timedelta(milliseconds=n))
+                        for n, t in enumerate(range(FIXTURE_TRANSACTIONS + 1, FIXTURE_TRANSACTIONS + 1001))])
@@ -0,0 +1,67 @@
+"""
+Ranking writes shared by get_rankings.py and get_rankings_pg.py.
+
+History rows are streamed into guide.ranking_history with COPY, and
+guide_profile.ranking_score is only rewritten for guides whose score moved
+more than RANKING_UPDATE_THRESHOLD, via a join against UNNEST arrays.
+Unchanged guides get no new row version and no row lock. Both writes run in
+one transaction, with the UPDATE last so its locks are held only until the
+commit.
+"""
+
+import io
+import os
+from typing import NamedTuple
+
+RANKING_UPDATE_THRESHOLD = float(os.getenv('RANKING_UPDATE_THRESHOLD', 0))
+RANKING_LOCK_TIMEOUT = os.getenv('RANKING_LOCK_TIMEOUT', '5s')
+
+
+class HistoryColumn(NamedTuple):
+    column: str             # guide.ranking_history column
+    key: str                # ranking dict key
+    digits: int = None      # round floats (the old SQL used .2f / .3f); None for integers
+    default: float = 0
+
+
+UPDATE_CHANGED_SQL = """
+UPDATE guide.guide_profile g
+SET ranking_score = s.score, updated_at = NOW()
+FROM UNNEST(%s::bigint[], %s::numeric[]) AS s(id, score)
+WHERE g.id = s.id AND ABS(g.ranking_score - s.score) > %s
+"""
+
+
+def history_value(r: dict, col: HistoryColumn):
+    """One history cell; missing/NULL values fall back to the column default."""
+    value = r.get(col.key)
+    value = col.default if value is None else value
+    return round(float(value), col.digits) if col.digits is not None else int(value)
+
+
+def copy_history(cur, rankings: list, columns: list) -> int:
+    """COPY one ranking_history row per guide; returns rows written."""
+    buf = io.StringIO()
+    for r in rankings:
+        buf.write('\t'.join(str(history_value(r, col)) for col in columns) + '\n')
+    buf.seek(0)
+    names = ', '.join(col.column for col in columns)
+    cur.copy_expert(f"COPY guide.ranking_history ({names}) FROM STDIN", buf)
+    return len(rankings)
+
+
+def update_changed_scores(cur, rankings: list, threshold: float = RANKING_UPDATE_THRESHOLD) -> int:
+    """Set ranking_score where it moved more than threshold; returns guides updated."""
+    ids = [int(r['id']) for r in rankings]
+    scores = [round(float(r['ranking']), 2) for r in rankings]
+    cur.execute(UPDATE_CHANGED_SQL, (ids, scores, threshold))
+    return cur.rowcount
+
+
+def write_rankings(conn, rankings: list, columns: list, threshold: float = RANKING_UPDATE_THRESHOLD) -> tuple:
+    """History + changed scores in one transaction; returns (history rows, guides updated)."""
+    with conn, conn.cursor() as cur:
+        cur.execute("SET LOCAL lock_timeout = %s", (RANKING_LOCK_TIMEOUT,))
+        saved = copy_history(cur, rankings, columns)
+        updated = update_changed_scores(cur, rankings, threshold)
+    return saved, updated
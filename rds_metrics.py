@@ -0,0 +1,146 @@
+"""
+RDS CloudWatch Metrics - one GetMetricData call per refresh on a reused client.
+
+The collector keeps a single boto3 CloudWatch client, asks for every metric
+in one GetMetricData request (instead of a GetMetricStatistics round trip per
+metric), serves the result for RDS_METRICS_TTL seconds and keeps the last
+RDS_HISTORY_POINTS datapoints per metric for trend display.
+
+Point CLOUDWATCH_ENDPOINT_URL at a local stub (e.g. `moto_server`) to run
+against something other than AWS.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AWS_REGION = os.getenv('AWS_REGION', 'ap-south-1')
+RDS_INSTANCE_ID = os.getenv('RDS_INSTANCE_ID', '')
+CLOUDWATCH_ENDPOINT_URL = os.getenv('CLOUDWATCH_ENDPOINT_URL')
+RDS_METRICS_TTL = int(os.getenv('RDS_METRICS_TTL', 60))          # seconds a result is reused
+RDS_METRICS_PERIOD = int(os.getenv('RDS_METRICS_PERIOD', 300))   # seconds per datapoint
+RDS_METRICS_WINDOW = 10                                          # minutes; CloudWatch lags ~5 minutes
+RDS_HISTORY_POINTS = int(os.getenv('RDS_HISTORY_POINTS', 36))
+
+
+class MetricSpec(NamedTuple):
+    name: str
+    unit: str = ''
+    stat: str = 'Average'
+
+
+RDS_METRICS = [
+    MetricSpec('CPUUtilization', 'Percent'),
+    MetricSpec('FreeableMemory', 'Bytes'),
+    MetricSpec('ReadIOPS', 'Count/Second'),
+    MetricSpec('WriteIOPS', 'Count/Second'),
+    MetricSpec('ReadLatency', 'Seconds'),
+    MetricSpec('WriteLatency', 'Seconds'),
+    MetricSpec('ReplicaLag', 'Seconds'),  # Replication lag for read replicas
+]
+# Extra AWS/RDS metric names, comma separated (e.g. "DatabaseConnections,DiskQueueDepth")
+RDS_METRICS += [MetricSpec(name.strip()) for name in os.getenv('RDS_EXTRA_METRICS', '').split(',') if name.strip()]
+
+
+def cloudwatch_client():
+    """A new CloudWatch client from the environment (explicit keys, else the IAM role)."""
+    import boto3
+    kwargs = {'region_name': AWS_REGION}
+    if CLOUDWATCH_ENDPOINT_URL:
+        kwargs['endpoint_url'] = CLOUDWATCH_ENDPOINT_URL
+    if os.getenv('AWS_ACCESS_KEY_ID'):
+        kwargs['aws_access_key_id'] = os.getenv('AWS_ACCESS_KEY_ID')
+        kwargs['aws_secret_access_key'] = os.getenv('AWS_SECRET_ACCESS_KEY')
+    return boto3.client('cloudwatch', **kwargs)
+
+
+def metric_queries(specs: list, instance_id: str, period: int = RDS_METRICS_PERIOD) -> list:
+    """GetMetricData queries, id m<i> for specs[i]."""
+    dimensions = [{'Name': 'DBInstanceIdentifier', 'Value': instance_id}]
+    return [{'Id': f"m{i}", 'ReturnData': True,
+             'MetricStat': {'Metric': {'Namespace': 'AWS/RDS', 'MetricName': spec.name, 'Dimensions': dimensions},
+                            'Period': period, 'Stat': spec.stat}}
+            for i, spec in enumerate(specs)]
+
+
+def fetch_series(client, specs: list, instance_id: str, minutes: int = RDS_METRICS_WINDOW,
+                 period: int = RDS_METRICS_PERIOD) -> dict:
+    """{spec: [(timestamp, value), ...] oldest first} from one GetMetricData call (paged if needed)."""
+    end = datetime.now(timezone.utc)
+    request = {'MetricDataQueries': metric_queries(specs, instance_id, period),
+               'StartTime': end - timedelta(minutes=minutes), 'EndTime': end,
+               'ScanBy': 'TimestampAscending'}
+    series = {spec: [] for spec in specs}
+    while True:
+        response = client.get_metric_data(**request)
+        for result in response['MetricDataResults']:
+            series[specs[int(result['Id'][1:])]] += zip(result['Timestamps'], result['Values'])
+        if not response.get('NextToken'):
+            return {spec: sorted(points) for spec, points in series.items()}
+        request['NextToken'] = response['NextToken']
+
+
+class RdsMetricsCollector:
+    """Latest RDS metric values plus a short ring buffer per metric."""
+
+    def __init__(self, instance_id: str = RDS_INSTANCE_ID, specs: list = None, client=None,
+                 ttl: int = RDS_METRICS_TTL, history_points: int = RDS_HISTORY_POINTS):
+        self.instance_id = instance_id
+        self.specs = list(specs or RDS_METRICS)
+        self.ttl = ttl
+        self._client = client
+        self._history = {spec.name: deque(maxlen=history_points) for spec in self.specs}
+        self._latest = None
+        self._fetched_at = float('-inf')
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The CloudWatch client, created on first use and reused."""
+        if self._client is None:
+            self._client = cloudwatch_client()
+        return self._client
+
+    def _record(self, series: dict) -> None:
+        """Append datapoints newer than the last one kept for each metric."""
+        for spec, points in series.items():
+            buffer = self._history[spec.name]
+            buffer.extend(p for p in points if not buffer or p[0] > buffer[-1][0])
+
+    def collect(self) -> dict:
+        """{metric name: latest value (0 without data)}, refetched at most every ttl seconds."""
+        with self._lock:
+            if self._latest is not None and time.monotonic() - self._fetched_at < self.ttl:
+                return self._latest
+            # The first call backfills the ring buffer; later ones only need the recent window
+            minutes = RDS_METRICS_WINDOW if self._latest is not None else \
+                max(RDS_METRICS_WINDOW, self._history_minutes())
+            self._record(fetch_series(self.client, self.specs, self.instance_id, minutes))
+            self._latest = self._recent_values()
+            self._fetched_at = time.monotonic()
+            return self._latest
+
+    def _recent_values(self) -> dict:
+        """Last value per metric if it falls in the recent window, else 0."""
+        since = datetime.now(timezone.utc) - timedelta(minutes=RDS_METRICS_WINDOW)
+        return {name: buffer[-1][1] if buffer and buffer[-1][0] >= since else 0
+                for name, buffer in self._history.items()}
+
+    def _history_minutes(self) -> int:
+        """Minutes of data that fill the ring buffer."""
+        points = max((b.maxlen for b in self._history.values()), default=0)
+        return points * RDS_METRICS_PERIOD // 60
+
+    def history(self, name: str) -> list:
+        """Recent values of one metric, oldest first."""
+        with self._lock:
+            return [value for _, value in self._history.get(name, ())]
+
+
+rds_metrics = RdsMetricsCollector()
@@ -0,0 +1,138 @@
+"""
+Refresh Scheduler - adaptive per-view refresh cadence for the dashboards.
+
+Each view (or standalone dashboard) declares a target freshness in seconds.
+The interval actually used stretches when the last refresh was slow
+relative to that target, or when the read replica is lagging (the data
+cannot get fresher than the replica, and fewer queries help it catch up).
+Cheap live views declare short targets and refresh faster than the rest.
+
+The UI only redraws the countdown every REFRESH_FRAME_SECONDS; due-ness is
+computed from timestamps, not by counting ticks.
+"""
+
+import os
+import time
+import threading
+from typing import Callable, Dict, NamedTuple
+
+from queries import REPLICATION_STATUS_QUERY
+
+REFRESH_SECONDS = int(os.getenv('DASHBOARD_REFRESH_SECONDS', 30))             # default target
+REFRESH_FRAME_SECONDS = float(os.getenv('DASHBOARD_FRAME_SECONDS', 1.0))      # countdown redraw
+REFRESH_MAX_SECONDS = int(os.getenv('DASHBOARD_REFRESH_MAX_SECONDS', 300))    # backoff ceiling
+REFRESH_SLOW_FRACTION = 0.25   # a refresh taking longer than this share of its target backs off
+LAG_CHECK_SECONDS = 15
+LAG_BACKOFF_SECONDS = 10       # replica lag tolerated before backing off
+
+
+class RefreshStats(NamedTuple):
+    key: str
+    target: float           # declared freshness, seconds
+    interval: float         # current interval after backoff
+    next_refresh: float     # seconds until due (0 when due)
+    last_duration: float    # seconds the last refresh took, None before the first
+    refreshes: int
+
+
+def replica_lag(status) -> float:
+    """Seconds the replica is behind from a REPLICATION_STATUS_QUERY row; 0 on a primary or when caught up."""
+    if not status:
+        return 0.0
+    is_replica, wal_bytes_behind, seconds_since_last_tx = status
+    if not is_replica or not wal_bytes_behind:
+        return 0.0
+    return float(seconds_since_last_tx or 0)
+
+
+class RefreshScheduler:
+    """Thread-safe refresh timing per key (view id or dashboard name)."""
+
+    def __init__(self, max_interval: float = REFRESH_MAX_SECONDS):
+        self.max_interval = max_interval
+        self.lag = 0.0
+        self._targets: Dict[str, float] = {}
+        self._runs: Dict[str, tuple] = {}   # key -> (finished_at, duration, refreshes)
+        self._lag_checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def register(self, key: str, target: float = REFRESH_SECONDS) -> None:
+        """Declare a key's target freshness (re-registering keeps its history)."""
+        with self._lock:
+            self._targets[key] = target
+
+    def interval(self, key: str) -> float:
+        """Target stretched by slow refreshes and replica lag, capped at max_interval."""
+        target = self._targets.get(key, REFRESH_SECONDS)
+        _, duration, _ = self._runs.get(key, (None, 0.0, 0))
+        slow = (duration or 0.0) / (target * REFRESH_SLOW_FRACTION)
+        lagging = 1 + self.lag / LAG_BACKOFF_SECONDS if self.lag > LAG_BACKOFF_SECONDS else 1.0
+        return max(target, min(self.max_interval, target * max(slow, lagging)))
+
+    def remaining(self, key: str) -> float:
+        """Seconds until the key is due; 0 if due (or never refreshed)."""
+        finished_at = self._runs.get(key, (None,))[0]
+        if finished_at is None:
+            return 0.0
+        return max(0.0, finished_at + self.interval(key) - time.monotonic())
+
+    def progress(self, key: str) -> float:
+        """Fraction of the current interval elapsed, 0..1."""
+        return 1.0 - self.remaining(key) / self.interval(key)
+
+    def due(self, key: str) -> bool:
+        """Whether the key should refresh now."""
+        return self.remaining(key) <= 0
+
+    def record(self, key: str, duration: float) -> None:
+        """A refresh of key finished after duration seconds; the next one counts from now."""
+        with self._lock:
+            refreshes = self._runs.get(key, (None, None, 0))[2]
+            self._runs[key] = (time.monotonic(), duration, refreshes + 1)
+
+    def reset(self, key: str) -> None:
+        """Restart the countdown from now (after a manual refresh)."""
+        with self._lock:
+            _, duration, refreshes = self._runs.get(key, (None, None, 0))
+            self._runs[key] = (time.monotonic(), duration, refreshes)
+
+    def observe_lag(self, status) -> None:
+        """Update replica lag from a REPLICATION_STATUS_QUERY row."""
+        self.lag = replica_lag(status)
+        self._lag_checked_at = time.monotonic()
+
+    def check_lag(self, fetch: Callable) -> None:
+        """Re-read replica lag via fetch(query) -> rows, at most every LAG_CHECK_SECONDS."""
+        if time.monotonic() - self._lag_checked_at < LAG_CHECK_SECONDS:
+            return
+        try:
+            rows = fetch(REPLICATION_STATUS_QUERY)
+            self.observe_lag(rows[0] if rows else None)
+        except Exception:
+            self._lag_checked_at = time.monotonic()
+
+    def stats(self) -> list:
+        """RefreshStats per registered key."""
+        return [RefreshStats(key, target, self.interval(key), self.remaining(key),
+                             *self._runs.get(key, (None, None, 0))[1:])
+                for key, target in list(self._targets.items())]
+
+    def label(self, key: str) -> str:
+        """Countdown text for a refresh bar, e.g. 'Auto-refresh: 12s (last 0.8s)'."""
+        _, duration, _ = self._runs.get(key, (None, None, 0))
+        text = f"Auto-refresh: {self.remaining(key):.0f}s"
+        if duration is not None:
+            text += f" (last {duration:.1f}s)"
+        if self.lag > LAG_BACKOFF_SECONDS:
+            text += f" | replica {self.lag:.0f}s behind"
+        return text
+
+
+def format_stats(stats: list) -> str:
+    """One line per key: interval, target, next refresh and last duration."""
+    lines = []
+    for s in stats:
+        last = f"{s.last_duration:.1f}s" if s.last_duration is not None else "-"
+        lines.append(f"{s.key}: every {s.interval:.0f}s (target {s.target:.0f}s), "
+                     f"next in {s.next_refresh:.0f}s, last took {last}")
+    return "\n".join(lines) or "No refreshes yet"
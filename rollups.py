@@ -0,0 +1,153 @@
+"""
+Daily Rollups - per-IST-day metric values kept in a local SQLite store.
+
+Summaries for any date range are the sum of stored days plus a live query
+for today. Days older than ROLLUP_SETTLE_DAYS are settled and never
+re-read; that watermark only moves forward. Recent days are recomputed
+every ROLLUP_RECENT_TTL seconds to pick up late status changes
+(PENDING -> SUCCESSFUL, refunds).
+
+Values are stored per Metric.key, so editing a metric's SQL starts a
+fresh history for it instead of mixing definitions. They are kept as
+integer hundredths (paise for amounts) so sums stay exact, and come back
+out of summary() as Decimal like Postgres numerics.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from db import execute_query
+from query_builder import Metric, IST_OFFSET, build_daily_queries, range_params
+
+ROLLUPS_ENABLED = os.getenv('DASHBOARD_ROLLUPS', '1') != '0'
+ROLLUP_DB = os.getenv('ROLLUP_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.rollups.db'))
+ROLLUP_SETTLE_DAYS = int(os.getenv('ROLLUP_SETTLE_DAYS', 2))
+ROLLUP_RECENT_TTL = int(os.getenv('ROLLUP_RECENT_TTL', 300))  # seconds
+
+_lock = threading.Lock()
+_conn = None
+
+
+# --- Postgres side ---
+
+def _to_paise(value) -> int:
+    """A Postgres aggregate (int, Decimal, float or None) as integer hundredths."""
+    return int((Decimal(str(value or 0)) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def _from_paise(paise: int) -> Decimal:
+    """Integer hundredths back to an exact Decimal."""
+    return Decimal(paise).scaleb(-2)
+
+
+def ist_today() -> date:
+    """Current date in IST."""
+    return (datetime.now(timezone.utc) + IST_OFFSET).date()
+
+
+def compute_days(metrics: List[Metric], start: date, end: date) -> dict:
+    """Aggregate IST days start..end from Postgres: {day: {metric key: paise}}."""
+    days = {start + timedelta(days=n): {m.key: 0 for m in metrics}
+            for n in range((end - start).days + 1)}
+    for query, group in build_daily_queries(metrics):
+        for row in execute_query(query, range_params(start, end)):
+            if row[0] in days:
+                days[row[0]].update(zip((m.key for m in group), (_to_paise(v) for v in row[1:])))
+    return days
+
+
+# --- Local store ---
+
+def _db() -> sqlite3.Connection:
+    """Open (and create) the local rollup store."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(ROLLUP_DB, check_same_thread=False)
+        _conn.execute("DROP TABLE IF EXISTS daily_metric")  # float values, superseded
+        _conn.execute("CREATE TABLE IF NOT EXISTS daily_metric_paise ("
+                      "day TEXT NOT NULL, metric TEXT NOT NULL, paise INTEGER NOT NULL, "
+                      "settled INTEGER NOT NULL, refreshed_at REAL NOT NULL, "
+                      "PRIMARY KEY (day, metric))")
+    return _conn
+
+
+def _in_clause(keys: list) -> str:
+    return ', '.join('?' * len(keys))
+
+
+def _stale_days(keys: list, start: date, end: date) -> list:
+    """Days in range missing a metric, or unsettled and older than the TTL."""
+    stored = {row[0]: row[1:] for row in _db().execute(
+        f"SELECT day, COUNT(*), MIN(settled), MIN(refreshed_at) FROM daily_metric_paise "
+        f"WHERE day BETWEEN ? AND ? AND metric IN ({_in_clause(keys)}) GROUP BY day",
+        (start.isoformat(), end.isoformat(), *keys))}
+    cutoff = time.time() - ROLLUP_RECENT_TTL
+    stale = []
+    for n in range((end - start).days + 1):
+        day = start + timedelta(days=n)
+        count, settled, refreshed_at = stored.get(day.isoformat(), (0, 0, 0))
+        if count < len(keys) or (not settled and refreshed_at < cutoff):
+            stale.append(day)
+    return stale
+
+
+def _store(days: dict) -> None:
+    """Upsert computed days, marking those past the settle window as final."""
+    settle_before = ist_today() - timedelta(days=ROLLUP_SETTLE_DAYS)
+    now = time.time()
+    rows = [(day.isoformat(), key, value, int(day < settle_before), now)
+            for day, values in days.items() for key, value in values.items()]
+    with _db():
+        _db().executemany("INSERT OR REPLACE INTO daily_metric_paise "
+                          "(day, metric, paise, settled, refreshed_at) VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def refresh(metrics: List[Metric], start: date, end: date) -> int:
+    """Bring stored days start..end up to date; returns days recomputed."""
+    with _lock:
+        stale = _stale_days([m.key for m in metrics], start, end)
+    if not stale:
+        return 0
+    # Postgres runs unlocked; a concurrent refresh of the same days only repeats an idempotent upsert
+    days = compute_days(metrics, min(stale), max(stale))
+    with _lock:
+        _store(days)
+    return len(stale)
+
+
+def _stored_totals(keys: list, start: date, end: date) -> dict:
+    """Sum stored days start..end per metric key, in paise."""
+    with _lock:
+        return dict(_db().execute(
+            f"SELECT metric, SUM(paise) FROM daily_metric_paise "
+            f"WHERE day BETWEEN ? AND ? AND metric IN ({_in_clause(keys)}) GROUP BY metric",
+            (start.isoformat(), end.isoformat(), *keys)).fetchall())
+
+
+# --- Public API ---
+
+def summary(metrics: List[Metric], start: date = None, end: date = None) -> dict:
+    """Metric totals by name for IST days start..end (stored days + live today)."""
+    today = ist_today()
+    start = start or today
+    end = end or today
+    totals = {m.key: 0 for m in metrics}
+    if start < today:
+        past_end = min(end, today - timedelta(days=1))
+        refresh(metrics, start, past_end)
+        totals.update(_stored_totals(list(totals), start, past_end))
+    if start <= today <= end:
+        for key, value in compute_days(metrics, today, today)[today].items():
+            totals[key] += value
+    return {m.name: _from_paise(totals[m.key]) for m in metrics}
+
+
+def summary_tuple(metrics: List[Metric], start: date = None, end: date = None) -> tuple:
+    """summary() as a tuple in metric declaration order."""
+    totals = summary(metrics, start, end)
+    return tuple(totals[m.name] for m in metrics)
@@ -3,9 +3,9 @@ cd /home/ubuntu/astrokiran-dashboards
 source .venv/bin/activate
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Starting sync..."
-python neo4j_sync.py
+python neo4j_sync.py --resume
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Updating rankings..."
-python get_rankings.py --update
+python get_rankings_pg.py --incremental --update
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Done!"
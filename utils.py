@@ -5,13 +5,13 @@ Utility Functions for AstroKiran Dashboard
 import os
 import csv
 import re
-import psycopg2
-import boto3
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
 
+from db import execute_single
 from queries import CAC_QUERY
+from rds_metrics import rds_metrics
 
 # Load environment variables
 load_dotenv()
@@ -25,18 +25,6 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD')
 }
 
-# AWS Configuration for RDS CloudWatch metrics
-AWS_CONFIG = {
-    'region': os.getenv('AWS_REGION', 'ap-south-1'),
-    'rds_instance_id': os.getenv('RDS_INSTANCE_ID', ''),
-}
-
-# AWS credentials (optional - will use IAM role if not provided)
-if os.getenv('AWS_ACCESS_KEY_ID'):
-    AWS_CONFIG['aws_access_key_id'] = os.getenv('AWS_ACCESS_KEY_ID')
-    AWS_CONFIG['aws_secret_access_key'] = os.getenv('AWS_SECRET_ACCESS_KEY')
-
-
 def parse_meta_ads_csv(file_path: str):
     """
     Parse a Meta Ads CSV export file.
@@ -152,12 +140,7 @@ def fetch_cac_data(date_start, date_end):
         return None
 
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        cursor.execute(CAC_QUERY, (date_start, date_end))
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        result = execute_single(CAC_QUERY, (date_start, date_end))
 
         if result:
             new_customers, total_recharge = result
@@ -203,58 +186,18 @@ def scan_for_csv_files():
 
 def get_rds_cloudwatch_metrics():
     """
-    Fetch RDS CloudWatch metrics for the last 10 minutes.
-    Returns: dict with CPU, memory, IOPS, latency, replica lag, and replication metrics
+    Latest RDS CloudWatch metrics from the shared collector (see rds_metrics.py).
+    Returns: dict with CPU, memory, IOPS, latency and replica lag, or None if not configured/unavailable
     """
-    if not AWS_CONFIG.get('rds_instance_id'):
+    if not rds_metrics.instance_id:
         return None
 
     try:
-        # Create CloudWatch client
-        session_kwargs = {'region_name': AWS_CONFIG['region']}
-        if AWS_CONFIG.get('aws_access_key_id'):
-            session_kwargs['aws_access_key_id'] = AWS_CONFIG['aws_access_key_id']
-            session_kwargs['aws_secret_access_key'] = AWS_CONFIG['aws_secret_access_key']
-
-        cloudwatch = boto3.client('cloudwatch', **session_kwargs)
-
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(minutes=10)  # CloudWatch data may have 5-minute delay
-
-        # Metrics to fetch
-        metrics_to_fetch = [
-            ('CPUUtilization', 'Percent'),
-            ('FreeableMemory', 'Bytes'),
-            ('ReadIOPS', 'Count/Second'),
-            ('WriteIOPS', 'Count/Second'),
-            ('ReadLatency', 'Seconds'),
-            ('WriteLatency', 'Seconds'),
-            ('ReplicaLag', 'Seconds'),  # Replication lag for read replicas
-        ]
-
-        results = {}
-
-        for metric_name, unit in metrics_to_fetch:
-            response = cloudwatch.get_metric_statistics(
-                Namespace='AWS/RDS',
-                MetricName=metric_name,
-                Dimensions=[
-                    {'Name': 'DBInstanceIdentifier', 'Value': AWS_CONFIG['rds_instance_id']}
-                ],
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=300,  # 5 minutes
-                Statistics=['Average']
-            )
-
-            if response['Datapoints']:
-                # Get the most recent datapoint
-                datapoint = sorted(response['Datapoints'], key=lambda x: x['Timestamp'], reverse=True)[0]
-                results[metric_name] = datapoint['Average']
-            else:
-                results[metric_name] = 0
-
-        return results
-
-    except Exception as e:
+        return rds_metrics.collect()
+    except Exception:
         return None
+
+
+def get_rds_metric_trends(names=('CPUUtilization', 'ReadIOPS', 'WriteIOPS')):
+    """Recent values per metric (oldest first) for trend display."""
+    return {name: rds_metrics.history(name) for name in names}
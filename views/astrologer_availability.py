@@ -8,9 +8,9 @@ All support hourly/date range filtering.
 
 from datetime import date
 from typing import List
-from views.base import BaseView, TableConfig, ContainerConfig
-from db import execute_query, execute_scalar
-from queries import ASTROLOGER_AVAILABILITY_QUERY, LIVE_ASTROLOGERS_QUERY
+from views.base import BaseView, TableConfig, ContainerConfig, FetchConfig
+from db import execute_query
+from availability_sessions import live_count, online_time
 from fmt import colorize, fmt_number, pad, GREEN
 
 
@@ -18,17 +18,16 @@ from fmt import colorize, fmt_number, pad, GREEN
 
 def fetch_live_count() -> int:
     """Fetch current live astrologers count."""
-    result = execute_scalar(LIVE_ASTROLOGERS_QUERY, ())
-    return result or 0
+    return live_count(execute_query)
 
 
 def fetch_online_time(start_date=None, end_date=None) -> list:
-    """Fetch astrologer online time from audit logs."""
+    """Fetch astrologer online time from the availability session store."""
     if start_date is None:
         start_date = date.today()
     if end_date is None:
         end_date = date.today()
-    return execute_query(ASTROLOGER_AVAILABILITY_QUERY, (start_date, end_date))
+    return online_time(execute_query, start_date, end_date)
 
 
 # --- Row Formatting (stateless) ---
@@ -52,7 +51,7 @@ def format_online_time_row(row: tuple) -> tuple:
     minutes = int(total_minutes) % 60
     time_str = f"{hours}h {minutes}m"
     return (
-        name,
+        name or "Unknown",
         pad(format_date_range(first_online, last_online)),
         pad(time_str)
     )
@@ -66,6 +65,7 @@ class AstrologerAvailabilityView(BaseView):
     name = "Astrologer Availability"
     view_id = "astro-avail"
     icon = "V"
+    refresh_seconds = 10  # live count is a local-store lookup after a small audit-log read
 
     def get_containers(self) -> List[ContainerConfig]:
         return [
@@ -83,14 +83,12 @@ class AstrologerAvailabilityView(BaseView):
             ])
         ]
 
-    def fetch_data(self, **kwargs) -> dict:
-        return {
-            'live_count': fetch_live_count(),
-            'online_time': fetch_online_time(
-                kwargs.get('start_date'),
-                kwargs.get('end_date')
-            )
-        }
+    def get_fetches(self, **kwargs) -> List[FetchConfig]:
+        dates = (kwargs.get('start_date'), kwargs.get('end_date'))
+        return [
+            FetchConfig('live_count', fetch_live_count, default=0),
+            FetchConfig('online_time', fetch_online_time, dates, default=[], freshness=60)
+        ]
 
     def format_rows(self, data: dict) -> dict:
         return {
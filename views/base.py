@@ -2,11 +2,27 @@
 Base View Protocol for Dashboard Views
 """
 
+import time
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import List, Callable, Any
 from textual.app import ComposeResult
 
+from db import POOL_MAX
+from refresh_scheduler import REFRESH_SECONDS
+
+
+# Fetches run on one shared pool, no wider than the DB connection pool
+FETCH_WORKERS = POOL_MAX
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
+# Results of fetches declaring a freshness: (fn, args) -> (fetched_at, value)
+FRESH_MAX_AGE = 3600
+_fresh_results = {}
+_fresh_lock = threading.Lock()
+
 
 @dataclass
 class TableConfig:
@@ -24,22 +40,84 @@ class ContainerConfig:
     tables: List[TableConfig]
 
 
+@dataclass
+class FetchConfig:
+    """An independent fetch: data[key] = fn(*args), or default on error.
+
+    With freshness (seconds), a result younger than that is reused instead of
+    refetched, so a slow fetch can refresh less often than its view.
+    """
+    key: str
+    fn: Callable
+    args: tuple = ()
+    default: Any = None
+    freshness: float = None
+
+
+def _fresh(f: FetchConfig):
+    """Stored result of f if still within its freshness, else None."""
+    if f.freshness is None:
+        return None
+    with _fresh_lock:
+        entry = _fresh_results.get((f.fn, f.args))
+    if entry is None or time.monotonic() - entry[0] >= f.freshness:
+        return None
+    return entry
+
+
+def _store_fresh(f: FetchConfig, value: Any) -> None:
+    """Remember f's result and drop entries older than FRESH_MAX_AGE."""
+    now = time.monotonic()
+    with _fresh_lock:
+        _fresh_results[(f.fn, f.args)] = (now, value)
+        for key in [k for k, (at, _) in _fresh_results.items() if now - at > FRESH_MAX_AGE]:
+            del _fresh_results[key]
+
+
+def run_fetches(fetches: List[FetchConfig]) -> dict:
+    """Run fetches concurrently; failed fetches fall back to their default."""
+    stored = {f.key: _fresh(f) for f in fetches}
+    futures = {f.key: _executor.submit(f.fn, *f.args) for f in fetches if stored[f.key] is None}
+    data, errors = {}, {}
+    for f in fetches:
+        if stored[f.key] is not None:
+            data[f.key] = stored[f.key][1]
+            continue
+        try:
+            data[f.key] = futures[f.key].result()
+            if f.freshness is not None:
+                _store_fresh(f, data[f.key])
+        except Exception as e:
+            data[f.key] = f.default
+            errors[f.key] = str(e)
+    if errors:
+        data['_errors'] = errors
+    return data
+
+
 class BaseView(ABC):
     """Abstract base class for dashboard views."""
 
     name: str = ""
     view_id: str = ""
     icon: str = ""
+    refresh_seconds: float = REFRESH_SECONDS  # target freshness, see refresh_scheduler
 
     @abstractmethod
     def get_containers(self) -> List[ContainerConfig]:
         """Return list of container configurations."""
         pass
 
-    @abstractmethod
+    def get_fetches(self, **kwargs) -> List[FetchConfig]:
+        """Return independent fetches for this view. Override to use run_fetches."""
+        return []
+
     def fetch_data(self, **kwargs) -> dict:
-        """Fetch data for this view. Must be stateless."""
-        pass
+        """Fetch data for this view. Must be stateless.
+
+        Default runs get_fetches() concurrently; override for custom fetching.
+        """
+        return run_fetches(self.get_fetches(**kwargs))
 
     @abstractmethod
     def format_rows(self, data: dict) -> dict:
@@ -10,15 +10,47 @@ All support hourly/date range filtering.
 
 from datetime import date
 from typing import List
-from views.base import BaseView, TableConfig, ContainerConfig
+from views.base import BaseView, TableConfig, ContainerConfig, FetchConfig
 from db import execute_single, execute_query
 from queries import (
-    CONSULTATION_SUMMARY_QUERY, CONSULTATION_BY_ASTROLOGER_QUERY,
+    CONSULTATION_BY_ASTROLOGER_QUERY,
     CONSULTATION_REQUESTS_QUERY, CONSULTATION_PERFORMANCE_QUERY
 )
+from query_builder import Metric, build_summary_query, range_params
+from rollups import ROLLUPS_ENABLED, summary_tuple
 from fmt import colorize, fmt_currency, fmt_number, fmt_percent, pick_color, pad, GREEN, RED, YELLOW
 
 
+# --- Metrics ---
+# Excludes deleted guides (test/developer accounts); amounts come from the wallet order
+
+CONSULTATIONS = 'consultation.consultation c'
+CONSULTATION_JOINS = (
+    "JOIN guide.guide_profile gp ON c.guide_id = gp.id AND gp.deleted_at IS NULL\n"
+    "LEFT JOIN wallet.wallet_orders wo ON c.order_id = wo.order_id"
+)
+COMPLETED = "c.state = 'completed'"
+CHAT = "c.state = 'completed' AND c.mode = 'chat'"
+CALL = "c.state = 'completed' AND c.mode = 'voice'"
+
+
+def consultation_metric(name: str, aggregate: str, where: str) -> Metric:
+    """Metric over completed consultations by IST completion date."""
+    return Metric(name, CONSULTATIONS, 'c.completed_at', aggregate, where,
+                  joins=CONSULTATION_JOINS, tz_aware=True)
+
+
+CONSULTATION_METRICS = [
+    consultation_metric('all_count', 'COUNT(*)', COMPLETED),           # BD-3.1
+    consultation_metric('all_amount', 'SUM(wo.final_amount)', COMPLETED),
+    consultation_metric('chat_count', 'COUNT(*)', CHAT),               # BD-3.4
+    consultation_metric('chat_amount', 'SUM(wo.final_amount)', CHAT),
+    consultation_metric('call_count', 'COUNT(*)', CALL),               # BD-3.5
+    consultation_metric('call_amount', 'SUM(wo.final_amount)', CALL),
+]
+CONSULTATION_SUMMARY_SQL = build_summary_query(CONSULTATION_METRICS)
+
+
 # --- Data Fetching (stateless) ---
 
 def fetch_consultation_summary(start_date=None, end_date=None) -> tuple:
@@ -27,9 +59,10 @@ def fetch_consultation_summary(start_date=None, end_date=None) -> tuple:
         start_date = date.today()
     if end_date is None:
         end_date = date.today()
-    # Query needs: start, end repeated 6 times (for each subquery)
-    params = (start_date, end_date) * 6
-    return execute_single(CONSULTATION_SUMMARY_QUERY, params) or (0, 0, 0, 0, 0, 0)
+    if ROLLUPS_ENABLED:
+        return summary_tuple(CONSULTATION_METRICS, start_date, end_date)
+    params = range_params(start_date, end_date)
+    return execute_single(CONSULTATION_SUMMARY_SQL, params) or (0, 0, 0, 0, 0, 0)
 
 
 def fetch_by_astrologer(start_date=None, end_date=None) -> list:
@@ -247,15 +280,14 @@ class ConsultationsView(BaseView):
             ])
         ]
 
-    def fetch_data(self, **kwargs) -> dict:
-        start = kwargs.get('start_date')
-        end = kwargs.get('end_date')
-        return {
-            'summary': fetch_consultation_summary(start, end),
-            'performance': fetch_connection_performance(start, end),
-            'by_astrologer': fetch_by_astrologer(start, end),
-            'requests': fetch_requests(start, end)
-        }
+    def get_fetches(self, **kwargs) -> List[FetchConfig]:
+        dates = (kwargs.get('start_date'), kwargs.get('end_date'))
+        return [
+            FetchConfig('summary', fetch_consultation_summary, dates, default=(0,) * 6),
+            FetchConfig('performance', fetch_connection_performance, dates, default=(0,) * 8),
+            FetchConfig('by_astrologer', fetch_by_astrologer, dates, default=[]),
+            FetchConfig('requests', fetch_requests, dates, default=[])
+        ]
 
     def format_rows(self, data: dict) -> dict:
         astro_rows = [format_astrologer_row(r) for r in data['by_astrologer']]
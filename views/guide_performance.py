@@ -5,7 +5,7 @@ Flow: SPENT (Guide) → ADD → ADD again
 """
 
 from typing import List
-from views.base import BaseView, TableConfig, ContainerConfig
+from views.base import BaseView, TableConfig, ContainerConfig, FetchConfig
 from db import execute_query
 from queries import GUIDE_PERFORMANCE_QUERY, GUIDE_LEAKAGE_QUERY
 from fmt import colorize, fmt_number, fmt_percent, pad, GREEN, RED, YELLOW
@@ -101,6 +101,7 @@ class GuidePerformanceView(BaseView):
     name = "Guide Performance"
     view_id = "guide_performance"
     icon = "P"
+    refresh_seconds = 120  # both queries are cached for 10 minutes
 
     def get_containers(self) -> List[ContainerConfig]:
         return [
@@ -116,11 +117,11 @@ class GuidePerformanceView(BaseView):
             ])
         ]
 
-    def fetch_data(self, **kwargs) -> dict:
-        return {
-            'performance': fetch_guide_performance(),
-            'leakage': fetch_guide_leakage()
-        }
+    def get_fetches(self, **kwargs) -> List[FetchConfig]:
+        return [
+            FetchConfig('performance', fetch_guide_performance, default=[]),
+            FetchConfig('leakage', fetch_guide_leakage, default=[])
+        ]
 
     def format_rows(self, data: dict) -> dict:
         return {
@@ -4,15 +4,12 @@ Real-time monitoring of guides availability with skills breakdown.
 """
 
 from typing import List
-from views.base import BaseView, TableConfig, ContainerConfig
-from db import execute_query, execute_single
+from views.base import BaseView, TableConfig, ContainerConfig, FetchConfig
+from db import execute_query
+from guide_identity import guide_identities
+from guide_snapshot import GuideSnapshot, partition
 from queries import (
-    GUIDE_COUNTS_QUERY,
-    GUIDE_CHANNEL_COUNTS_QUERY,
-    GUIDE_SKILLS_BREAKDOWN_QUERY,
-    ONLINE_GUIDES_QUERY,
-    OFFLINE_GUIDES_QUERY,
-    TEST_GUIDES_QUERY,
+    GUIDE_SNAPSHOT_QUERY,
     PROMO_GRANT_SPENDING_QUERY,
     LATEST_FEEDBACK_QUERY
 )
@@ -21,34 +18,10 @@ from fmt import colorize, fmt_currency, fmt_number, pad, GREEN, RED, YELLOW
 
 # --- Data Fetching (stateless) ---
 
-def fetch_guide_counts() -> tuple:
-    """Fetch online/offline/total counts."""
-    return execute_single(GUIDE_COUNTS_QUERY) or (0, 0, 0)
-
-
-def fetch_channel_counts() -> tuple:
-    """Fetch chat/voice/video counts."""
-    return execute_single(GUIDE_CHANNEL_COUNTS_QUERY) or (0, 0, 0)
-
-
-def fetch_skills_breakdown() -> list:
-    """Fetch skill-wise guide counts."""
-    return execute_query(GUIDE_SKILLS_BREAKDOWN_QUERY)
-
-
-def fetch_online_guides() -> list:
-    """Fetch online guides with details."""
-    return execute_query(ONLINE_GUIDES_QUERY)
-
-
-def fetch_offline_guides() -> list:
-    """Fetch offline guides with details."""
-    return execute_query(OFFLINE_GUIDES_QUERY)
-
-
-def fetch_test_guides() -> list:
-    """Fetch test guides."""
-    return execute_query(TEST_GUIDES_QUERY)
+def fetch_guide_snapshot() -> GuideSnapshot:
+    """Fetch every live guide once and split it into the guides tables."""
+    rows = execute_query(GUIDE_SNAPSHOT_QUERY, guide_identities.query_params(execute_query))
+    return partition(rows)
 
 
 def fetch_promo_grants() -> list:
@@ -242,25 +215,33 @@ class GuidesView(BaseView):
             ])
         ]
 
-    def fetch_data(self, **kwargs) -> dict:
-        return {
-            'counts': fetch_guide_counts(),
-            'channels': fetch_channel_counts(),
-            'skills': fetch_skills_breakdown(),
-            'online': fetch_online_guides(),
-            'offline': fetch_offline_guides(),
-            'test': fetch_test_guides(),
-            'promo': fetch_promo_grants(),
-            'feedback': fetch_feedback()
-        }
+    def get_fetches(self, **kwargs) -> List[FetchConfig]:
+        return [
+            FetchConfig('guides', fetch_guide_snapshot, default=partition([])),
+            FetchConfig('promo', fetch_promo_grants, default=[], freshness=120),
+            FetchConfig('feedback', fetch_feedback, default=[], freshness=120)
+        ]
 
     def format_rows(self, data: dict) -> dict:
+        guides = data['guides']
         return {
-            'guide-summary-table': [format_counts_row(data['counts'], data['channels'])],
-            'guide-skills-table': [format_skill_row(r) for r in data['skills']],
-            'guide-online-table': [format_guide_row(r) for r in data['online']],
-            'guide-offline-table': [format_guide_row(r) for r in data['offline']],
-            'guide-test-table': [format_test_guide_row(r) for r in data['test']],
+            'guide-summary-table': [format_counts_row(guides.counts, guides.channels)],
+            'guide-skills-table': [format_skill_row(r) for r in guides.skills],
+            'guide-online-table': [format_guide_row(r) for r in guides.online],
+            'guide-offline-table': [format_guide_row(r) for r in guides.offline],
+            'guide-test-table': [format_test_guide_row(r) for r in guides.test],
             'guide-promo-table': [format_promo_row(r) for r in data['promo']],
             'guide-feedback-table': [format_feedback_row(r) for r in data['feedback']]
         }
+
+    def get_row_keys(self, data: dict) -> dict:
+        """Row keys so guide tables update in place."""
+        guides = data['guides']
+        return {
+            'guide-skills-table': [r[0] for r in guides.skills],
+            'guide-online-table': [r[0] for r in guides.online],
+            'guide-offline-table': [r[0] for r in guides.offline],
+            'guide-test-table': [r[0] for r in guides.test],
+            'guide-promo-table': [r[0] for r in data['promo']],
+            'guide-feedback-table': [r[6] for r in data['feedback']]
+        }
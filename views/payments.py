@@ -10,12 +10,28 @@ All support hourly/date range filtering.
 
 from datetime import date
 from typing import List
-from views.base import BaseView, TableConfig, ContainerConfig
+from views.base import BaseView, TableConfig, ContainerConfig, FetchConfig
 from db import execute_query, execute_single
-from queries import PAYMENT_SUMMARY_QUERY, PAYMENT_BY_METHOD_QUERY, FAILED_PAYMENTS_QUERY, PENDING_PAYMENTS_QUERY
+from queries import PAYMENT_BY_METHOD_QUERY, FAILED_PAYMENTS_QUERY, PENDING_PAYMENTS_QUERY
+from query_builder import Metric, build_summary_query, range_params
+from rollups import ROLLUPS_ENABLED, summary_tuple
 from fmt import colorize, pick_color, fmt_currency, fmt_percent, fmt_number, fmt_datetime, pad, GREEN, RED, YELLOW
 
 
+# --- Metrics ---
+
+PAYMENTS = 'wallet.payment_orders'
+
+PAYMENT_METRICS = [
+    Metric('total_count', PAYMENTS, 'created_at', 'COUNT(*)'),                                   # BD-4.1
+    Metric('successful_amount', PAYMENTS, 'created_at', 'SUM(amount)', "status = 'SUCCESSFUL'"),  # BD-4.2
+    Metric('successful_count', PAYMENTS, 'created_at', 'COUNT(*)', "status = 'SUCCESSFUL'"),
+    Metric('failed_count', PAYMENTS, 'created_at', 'COUNT(*)', "status = 'FAILED'"),
+    Metric('pending_count', PAYMENTS, 'created_at', 'COUNT(*)', "status = 'PENDING'"),
+]
+PAYMENT_SUMMARY_SQL = build_summary_query(PAYMENT_METRICS)
+
+
 # --- Data Fetching (stateless) ---
 
 def fetch_payment_summary(start_date=None, end_date=None) -> tuple:
@@ -24,9 +40,10 @@ def fetch_payment_summary(start_date=None, end_date=None) -> tuple:
         start_date = date.today()
     if end_date is None:
         end_date = date.today()
-    # Query needs: start, end repeated 5 times (for each subquery)
-    params = (start_date, end_date) * 5
-    return execute_single(PAYMENT_SUMMARY_QUERY, params) or (0, 0, 0, 0, 0)
+    if ROLLUPS_ENABLED:
+        return summary_tuple(PAYMENT_METRICS, start_date, end_date)
+    params = range_params(start_date, end_date)
+    return execute_single(PAYMENT_SUMMARY_SQL, params) or (0, 0, 0, 0, 0)
 
 
 def fetch_by_method(start_date=None, end_date=None) -> list:
@@ -170,15 +187,14 @@ class PaymentsView(BaseView):
             ])
         ]
 
-    def fetch_data(self, **kwargs) -> dict:
-        start = kwargs.get('start_date')
-        end = kwargs.get('end_date')
-        return {
-            'summary': fetch_payment_summary(start, end),
-            'by_method': fetch_by_method(start, end),
-            'failed': fetch_failed_payments(start, end),
-            'pending': fetch_pending_payments(start, end)
-        }
+    def get_fetches(self, **kwargs) -> List[FetchConfig]:
+        dates = (kwargs.get('start_date'), kwargs.get('end_date'))
+        return [
+            FetchConfig('summary', fetch_payment_summary, dates, default=(0,) * 5),
+            FetchConfig('by_method', fetch_by_method, dates, default=[]),
+            FetchConfig('failed', fetch_failed_payments, dates, default=[]),
+            FetchConfig('pending', fetch_pending_payments, dates, default=[])
+        ]
 
     def format_rows(self, data: dict) -> dict:
         return {
@@ -0,0 +1,96 @@
+"""
+Prefetch Scheduler - keeps already-loaded views warm in the background.
+
+Views that were never shown are not prefetched, so lazy view modules are
+imported only on first use. The visible view is skipped (the app refreshes it in the foreground);
+hidden views are refreshed every PREFETCH_INTERVAL, stalest first. At most
+PREFETCH_CONCURRENCY views fetch at once so the read replica isn't
+hammered. A failed prefetch is retried after the same interval and its
+error shows up in the view's data['_errors'] under 'prefetch'.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from views.registry import ViewRegistry
+
+PREFETCH_ENABLED = os.getenv('DASHBOARD_PREFETCH', '1') != '0'
+PREFETCH_INTERVAL = int(os.getenv('DASHBOARD_PREFETCH_INTERVAL', 120))  # seconds, hidden views
+PREFETCH_CONCURRENCY = int(os.getenv('DASHBOARD_PREFETCH_CONCURRENCY', 2))
+
+
+class PrefetchScheduler:
+    """Background refresher storing the latest fetch_data() result per view."""
+
+    def __init__(self, kwargs_for: Callable[[str], dict],
+                 interval: int = PREFETCH_INTERVAL, budget: int = PREFETCH_CONCURRENCY):
+        self.kwargs_for = kwargs_for
+        self.interval = interval
+        self.budget = budget
+        self._store: Dict[str, tuple] = {}  # view_id -> (fetched_at, kwargs, data)
+        self._failed: Dict[str, tuple] = {}  # view_id -> (failed_at, kwargs, message)
+        self._inflight = set()
+        self._lock = threading.Lock()
+        # Own threads: views fan out onto the shared fetch pool, never onto this one
+        self._executor = ThreadPoolExecutor(max_workers=budget, thread_name_prefix="prefetch")
+
+    def get(self, view_id: str, kwargs: dict) -> Optional[dict]:
+        """Stored data for a view, if it was fetched with the same kwargs (plus any later prefetch error)."""
+        with self._lock:
+            entry = self._store.get(view_id)
+            failed = self._failed.get(view_id)
+        if entry is None or entry[1] != kwargs:
+            return None
+        if failed is None or failed[1] != kwargs or failed[0] < entry[0]:
+            return entry[2]
+        return dict(entry[2], _errors=dict(entry[2].get('_errors') or {}, prefetch=failed[2]))
+
+    def put(self, view_id: str, kwargs: dict, data: dict) -> None:
+        """Record a result (also used by the app's own foreground fetches)."""
+        with self._lock:
+            self._store[view_id] = (time.monotonic(), dict(kwargs), data)
+            self._failed.pop(view_id, None)
+
+    def tick(self, visible_id: str, foreground_busy: bool = False) -> None:
+        """Submit due hidden views, stalest first, within the concurrency budget."""
+        if foreground_busy:
+            return
+        for view_id in self._due(visible_id):
+            with self._lock:
+                if len(self._inflight) >= self.budget:
+                    return
+                self._inflight.add(view_id)
+            self._executor.submit(self._fetch, view_id, self.kwargs_for(view_id))
+
+    def _due(self, visible_id: str) -> list:
+        """Loaded hidden view ids needing a refresh, stalest first (failures wait out the interval too)."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for view_id in ViewRegistry.ids():
+                if view_id in self._inflight or view_id == visible_id or not ViewRegistry.is_loaded(view_id):
+                    continue
+                fetched_at, kwargs, _ = self._store.get(view_id, (0, None, None))
+                failed_at = self._failed.get(view_id, (0,))[0]
+                if now - failed_at < self.interval:
+                    continue
+                if kwargs != self.kwargs_for(view_id) or now - fetched_at >= self.interval:
+                    due.append((fetched_at, view_id))
+        return [view_id for _, view_id in sorted(due)]
+
+    def _fetch(self, view_id: str, kwargs: dict) -> None:
+        try:
+            self.put(view_id, kwargs, ViewRegistry.get(view_id).fetch_data(**kwargs))
+        except Exception as e:
+            with self._lock:
+                self._failed[view_id] = (time.monotonic(), dict(kwargs), f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.discard(view_id)
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running fetches finish in the background."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
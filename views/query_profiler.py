@@ -0,0 +1,140 @@
+"""
+Query Profiler View
+Per-query database time recorded by db.execute_query (see query_stats.py):
+- p50 / p95 / max latency, rows, bytes, retries and pool wait per query
+- Slowest recent executions
+- Result cache hit rates
+Set QUERY_PROFILER_EXPORT to a path to append each refresh's summary as JSONL.
+"""
+
+import os
+from typing import List
+from views.base import BaseView, TableConfig, ContainerConfig, FetchConfig
+from db import query_cache
+import query_stats
+from fmt import colorize, pick_color, fmt_bytes, fmt_number, fmt_percent, pad, truncate, GRAY
+
+PROFILER_EXPORT = os.getenv('QUERY_PROFILER_EXPORT')
+
+
+# --- Data Fetching (stateless) ---
+
+def fetch_query_summary() -> list:
+    """Per-query summaries, exported to PROFILER_EXPORT if set."""
+    rows = query_stats.summary()
+    if PROFILER_EXPORT:
+        query_stats.export_jsonl(PROFILER_EXPORT)
+    return rows
+
+
+def fetch_slowest() -> list:
+    """Slowest recent executions."""
+    return query_stats.slowest(20)
+
+
+def fetch_cache_stats() -> dict:
+    """Result cache counters."""
+    return query_cache.stats()
+
+
+# --- Row Formatting (stateless) ---
+
+def fmt_ms(ms: float) -> str:
+    """Milliseconds, colored by how long they are."""
+    return colorize(f"{ms:,.1f}", pick_color(ms, 100, 1000, reverse=True))
+
+
+def format_hit_rate(s: query_stats.QuerySummary) -> str:
+    """Share of calls answered from cache; '-' for uncached queries."""
+    if not s.cacheable or not s.calls:
+        return colorize("-", GRAY)
+    return fmt_percent(100 * s.cached / s.calls)
+
+
+def format_query_row(s: query_stats.QuerySummary) -> tuple:
+    """Format per-query latency row."""
+    return (
+        truncate(s.name, 40),
+        pad(fmt_number(s.calls)),
+        pad(fmt_number(s.executions)),
+        pad(format_hit_rate(s)),
+        pad(fmt_ms(s.p50_ms)),
+        pad(fmt_ms(s.p95_ms)),
+        pad(fmt_ms(s.max_ms)),
+        pad(f"{s.total_s:,.1f}"),
+        pad(fmt_number(s.avg_rows)),
+        pad(fmt_bytes(s.avg_bytes)),
+        pad(fmt_number(s.retries)),
+        pad(f"{s.avg_wait_ms:,.1f}"),
+    )
+
+
+def format_execution_row(e: query_stats.QueryExecution) -> tuple:
+    """Format one slow execution."""
+    return (
+        e.at.astimezone().strftime('%H:%M:%S'),
+        truncate(e.name, 40),
+        pad(fmt_ms(e.seconds * 1000)),
+        pad(fmt_number(e.rows)),
+        pad(fmt_bytes(e.bytes)),
+        pad(str(e.retries)),
+        pad(f"{e.wait * 1000:,.1f}"),
+        pad("error" if e.error else "ok"),
+    )
+
+
+def format_cache_row(stats: dict) -> tuple:
+    """Format result cache summary row."""
+    return (
+        pad(fmt_number(stats.get('hits', 0))),
+        pad(fmt_number(stats.get('stale', 0))),
+        pad(fmt_number(stats.get('misses', 0))),
+        pad(fmt_percent(100 * stats.get('hit_rate', 0.0))),
+        pad(fmt_number(stats.get('entries', 0))),
+    )
+
+
+# --- View Class ---
+
+class QueryProfilerView(BaseView):
+    """Query latency profiler (reads in-process stats, no database access)."""
+
+    name = "Query Profiler"
+    view_id = "query-profiler"
+    icon = "Q"
+    refresh_seconds = 5
+
+    def get_containers(self) -> List[ContainerConfig]:
+        return [
+            ContainerConfig("qp-cache-container", "RESULT CACHE", [
+                TableConfig("qp-cache-table", ["Hits", "Stale", "Misses", "Hit Rate", "Entries"])
+            ]),
+            ContainerConfig("qp-queries-container", "QUERY LATENCY (by total time)", [
+                TableConfig("qp-queries-table", [
+                    "Query", "Calls", "Exec", "Cached", "p50 ms", "p95 ms", "Max ms",
+                    "Total s", "Rows", "Size", "Retries", "Wait ms"
+                ], cursor=True)
+            ]),
+            ContainerConfig("qp-slowest-container", "SLOWEST RECENT EXECUTIONS", [
+                TableConfig("qp-slowest-table", [
+                    "Time", "Query", "ms", "Rows", "Size", "Retries", "Wait ms", "Status"
+                ], cursor=True)
+            ])
+        ]
+
+    def get_fetches(self, **kwargs) -> List[FetchConfig]:
+        return [
+            FetchConfig('queries', fetch_query_summary, default=[]),
+            FetchConfig('slowest', fetch_slowest, default=[]),
+            FetchConfig('cache', fetch_cache_stats, default={})
+        ]
+
+    def format_rows(self, data: dict) -> dict:
+        return {
+            'qp-cache-table': [format_cache_row(data['cache'])],
+            'qp-queries-table': [format_query_row(s) for s in data['queries']],
+            'qp-slowest-table': [format_execution_row(e) for e in data['slowest']]
+        }
+
+    def get_row_keys(self, data: dict) -> dict:
+        return {'qp-queries-table': [s.name for s in data['queries']]}
@@ -1,37 +1,78 @@
 """
 View Registry - Central registration for all views.
+
+Views can be registered lazily as metadata plus an import path; the module
+is imported and the view instantiated on first get(), so startup only pays
+for the views actually shown.
 """
 
-from typing import Dict, List, Type
+import threading
+from importlib import import_module
+from typing import Dict, List, NamedTuple
 from views.base import BaseView
 
 
+class ViewEntry(NamedTuple):
+    """View metadata, available without importing the view module."""
+    view_id: str
+    name: str
+    icon: str
+    target: str = ""  # "package.module:ClassName"; empty for eagerly registered views
+
+
 class ViewRegistry:
     """Registry for dashboard views."""
 
+    _entries: Dict[str, ViewEntry] = {}
     _views: Dict[str, BaseView] = {}
+    _lock = threading.Lock()
 
     @classmethod
     def register(cls, view: BaseView) -> None:
         """Register a view instance."""
+        cls._entries[view.view_id] = ViewEntry(view.view_id, view.name, view.icon)
         cls._views[view.view_id] = view
 
+    @classmethod
+    def register_lazy(cls, view_id: str, name: str, icon: str, target: str) -> None:
+        """Register a view by metadata; target ("module:Class") is imported on first get()."""
+        cls._entries[view_id] = ViewEntry(view_id, name, icon, target)
+        cls._views.pop(view_id, None)
+
     @classmethod
     def get(cls, view_id: str) -> BaseView:
-        """Get a view by ID."""
-        return cls._views.get(view_id)
+        """Get a view by ID, importing it on first use."""
+        view = cls._views.get(view_id)
+        if view is not None or view_id not in cls._entries:
+            return view
+        with cls._lock:
+            if view_id not in cls._views:
+                module, _, name = cls._entries[view_id].target.partition(':')
+                cls._views[view_id] = getattr(import_module(module), name)()
+            return cls._views[view_id]
+
+    @classmethod
+    def is_loaded(cls, view_id: str) -> bool:
+        """Whether the view has been imported and instantiated."""
+        return view_id in cls._views
+
+    @classmethod
+    def entries(cls) -> List[ViewEntry]:
+        """Metadata of all registered views, without importing them."""
+        return list(cls._entries.values())
 
     @classmethod
     def all(cls) -> List[BaseView]:
-        """Get all registered views."""
-        return list(cls._views.values())
+        """Get all registered views (imports any not yet loaded)."""
+        return [cls.get(view_id) for view_id in cls._entries]
 
     @classmethod
     def ids(cls) -> List[str]:
         """Get all view IDs."""
-        return list(cls._views.keys())
+        return list(cls._entries.keys())
 
     @classmethod
     def clear(cls) -> None:
         """Clear all registered views."""
+        cls._entries.clear()
         cls._views.clear()
@@ -13,10 +13,33 @@ from datetime import date
 from typing import List
 from views.base import BaseView, TableConfig, ContainerConfig
 from db import execute_single
-from queries import REVENUE_SUMMARY_QUERY
+from query_builder import Metric, build_summary_query, range_params
+from rollups import ROLLUPS_ENABLED, summary_tuple
 from fmt import colorize, fmt_currency, fmt_number, pad, GREEN
 
 
+# --- Metrics ---
+
+PAYMENTS = 'wallet.payment_orders'
+ORDERS = 'wallet.wallet_orders'
+SUCCESSFUL = "status = 'SUCCESSFUL'"
+PROMO = "status = 'SUCCESSFUL' AND virtual_cash_amount > 0"
+COMPLETED = "status = 'COMPLETED'"
+
+REVENUE_METRICS = [
+    Metric('add_cash_amount', PAYMENTS, 'created_at', 'SUM(amount)', SUCCESSFUL),        # BD-1.1
+    Metric('add_cash_count', PAYMENTS, 'created_at', 'COUNT(*)', SUCCESSFUL),
+    Metric('promo_amount', PAYMENTS, 'created_at', 'SUM(virtual_cash_amount)', PROMO),   # BD-1.2
+    Metric('promo_count', PAYMENTS, 'created_at', 'COUNT(*)', PROMO),
+    Metric('consult_order_amount', ORDERS, 'created_at', 'SUM(final_amount)', COMPLETED),  # BD-1.3
+    Metric('consult_order_count', ORDERS, 'created_at', 'COUNT(*)', COMPLETED),
+    Metric('astrologer_share', ORDERS, 'created_at', 'SUM(consultant_share)', COMPLETED),  # BD-1.4
+    Metric('company_share', ORDERS, 'created_at',
+           'SUM(final_amount - COALESCE(consultant_share, 0))', COMPLETED),              # BD-1.5
+]
+REVENUE_SUMMARY_SQL = build_summary_query(REVENUE_METRICS)
+
+
 # --- Data Fetching (stateless) ---
 
 def fetch_revenue_summary(start_date=None, end_date=None) -> tuple:
@@ -25,9 +48,10 @@ def fetch_revenue_summary(start_date=None, end_date=None) -> tuple:
         start_date = date.today()
     if end_date is None:
         end_date = date.today()
-    # Query needs: start, end repeated 8 times (for each subquery)
-    params = (start_date, end_date) * 8
-    return execute_single(REVENUE_SUMMARY_QUERY, params) or (0, 0, 0, 0, 0, 0, 0, 0)
+    if ROLLUPS_ENABLED:
+        return summary_tuple(REVENUE_METRICS, start_date, end_date)
+    params = range_params(start_date, end_date)
+    return execute_single(REVENUE_SUMMARY_SQL, params) or (0, 0, 0, 0, 0, 0, 0, 0)
 
 
 # --- Row Formatting (stateless) ---
@@ -4,12 +4,12 @@ All functions are stateless and under 20 lines.
 """
 
 from typing import List
-from views.base import BaseView, TableConfig, ContainerConfig
-from db import execute_query, execute_single, execute_scalar
+from views.base import BaseView, TableConfig, ContainerConfig, FetchConfig, run_fetches
+from db import execute_query, execute_single, execute_scalar, prefetch_query
 from queries import (
     DAILY_RECHARGE_QUERY, KPI_QUERY, DB_CONNECTIONS_QUERY,
-    REPLICATION_STATUS_QUERY, WALLET_TRANSACTIONS_QUERY, WALLET_TRANSACTIONS_COUNT_QUERY,
-    WALLET_CREATION_QUERY, ADD_COMPARISON_QUERY
+    REPLICATION_STATUS_QUERY, WALLET_TRANSACTIONS_QUERY, WALLET_TRANSACTIONS_AFTER_QUERY,
+    WALLET_TRANSACTIONS_ESTIMATE_QUERY, WALLET_CREATION_QUERY, ADD_COMPARISON_QUERY
 )
 from fmt import (
     colorize, pick_color, fmt_currency, fmt_percent,
@@ -50,13 +50,28 @@ def fetch_replication() -> tuple:
 
 
 def fetch_transaction_count() -> int:
-    """Fetch total transaction count."""
-    return execute_scalar(WALLET_TRANSACTIONS_COUNT_QUERY) or 0
-
-
-def fetch_transactions(limit: int, offset: int) -> list:
-    """Fetch paginated wallet transactions."""
-    return execute_query(WALLET_TRANSACTIONS_QUERY, (limit, offset))
+    """Fetch approximate transaction count (planner estimate)."""
+    return execute_scalar(WALLET_TRANSACTIONS_ESTIMATE_QUERY) or 0
+
+
+def next_cursor(rows: list, limit: int):
+    """Keyset cursor (created_at, transaction_id) after a full page, else None."""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return (last[9], last[0])
+
+
+def fetch_transactions(limit: int, cursor: tuple = None) -> list:
+    """Fetch a page of wallet transactions after cursor; warms the next page."""
+    if cursor is None:
+        rows = execute_query(WALLET_TRANSACTIONS_QUERY, (limit,))
+    else:
+        rows = execute_query(WALLET_TRANSACTIONS_AFTER_QUERY, (*cursor, limit))
+    after = next_cursor(rows, limit)
+    if after:
+        prefetch_query(WALLET_TRANSACTIONS_AFTER_QUERY, (*after, limit))
+    return rows
 
 
 # --- Row Formatting (stateless) ---
@@ -253,7 +268,7 @@ def format_txn_type(txn_type: str) -> str:
 
 def format_transaction(row: tuple) -> tuple:
     """Format single transaction row."""
-    txn_id, user_id, phone, txn_type, amount, real_delta, virtual_delta, comment, created_at = row
+    txn_id, user_id, phone, txn_type, amount, real_delta, virtual_delta, comment, created_at = row[:9]
 
     # Format deltas with color
     real_str = fmt_currency(float(real_delta)) if real_delta else "-"
@@ -311,18 +326,22 @@ class WalletView(BaseView):
             ])
         ]
 
-    def fetch_data(self, page: int = 1, per_page: int = 100) -> dict:
-        offset = (page - 1) * per_page
-        return {
-            'db_stats': fetch_db_stats(),
-            'kpis': fetch_kpis(),
-            'add_comparison': fetch_add_comparison(),
-            'wallet_creation': fetch_wallet_creation(),
-            'daily': fetch_daily_recharges(),
-            'replication': fetch_replication(),
-            'total_txns': fetch_transaction_count(),
-            'transactions': fetch_transactions(per_page, offset)
-        }
+    def get_fetches(self, per_page: int = 100, cursor: tuple = None, **kwargs) -> List[FetchConfig]:
+        return [
+            FetchConfig('db_stats', fetch_db_stats, default=(0, 0, 0, 0, 0.0)),
+            FetchConfig('kpis', fetch_kpis, default=(0,) * 13),
+            FetchConfig('add_comparison', fetch_add_comparison, default=[]),
+            FetchConfig('wallet_creation', fetch_wallet_creation, default=[]),
+            FetchConfig('daily', fetch_daily_recharges, default=[]),
+            FetchConfig('replication', fetch_replication, default=(False, 0, 0)),
+            FetchConfig('total_txns', fetch_transaction_count, default=0),
+            FetchConfig('transactions', fetch_transactions, (per_page, cursor), default=[])
+        ]
+
+    def fetch_data(self, **kwargs) -> dict:
+        data = run_fetches(self.get_fetches(**kwargs))
+        data['next_cursor'] = next_cursor(data['transactions'], kwargs.get('per_page', 100))
+        return data
 
     def format_rows(self, data: dict) -> dict:
         counts, amounts = format_daily_rows(data['daily'])
@@ -348,3 +367,9 @@ class WalletView(BaseView):
         return {
             'daily-table': get_daily_headers(data.get('daily', []))
         }
+
+    def get_row_keys(self, data: dict) -> dict:
+        """Row keys so the transactions page updates in place."""
+        return {
+            'txn-table': [t[0] for t in data['transactions']]
+        }
@@ -4,6 +4,7 @@ AstroKiran Dashboard - Wallet + Meta Ads Analytics
 Press 'D' to switch views, 'L' to load CSV.
 """
 
+import time
 from datetime import datetime
 from typing import Optional
 from textual.app import App, ComposeResult
@@ -13,7 +14,8 @@ from textual.worker import Worker, WorkerState
 
 from styles import DASHBOARD_CSS
 from screens import ViewSelectorScreen, FilePickerScreen
-from data_fetcher import fetch_all_dashboard_data
+from data_fetcher import fetch_all_dashboard_data, FIRST_USERS_PAGE, LAST_USERS_PAGE
+from refresh_scheduler import RefreshScheduler, REFRESH_FRAME_SECONDS
 from utils import parse_meta_ads_csv, fetch_cac_data
 from display_helpers import (
     format_db_stats_row,
@@ -33,8 +35,7 @@ class WalletDashboard(App):
     """Textual app to monitor wallet and Meta Ads data."""
 
     CSS = DASHBOARD_CSS
-    REFRESH_SECONDS = 30
-    TICK_RATE = 0.1
+    REFRESH_SECONDS = 30  # target; stretched when fetches are slow or the replica lags
 
     BINDINGS = [
         ("q", "quit", "Quit"),
@@ -53,10 +54,12 @@ class WalletDashboard(App):
         super().__init__()
         self.data = {}  # All dashboard data
         self.current_page = 1
+        self.users_page = FIRST_USERS_PAGE  # keyset position, see data_fetcher
         self.items_per_page = 100
         self.total_users = 0
-        self.timer_ticks = 0
-        self.total_ticks = int(self.REFRESH_SECONDS / self.TICK_RATE)
+        self.scheduler = RefreshScheduler()
+        self.scheduler.register("wallet", self.REFRESH_SECONDS)
+        self._fetching = False
         self.current_view = 'wallet'
         self.meta_ads_data = []
         self.meta_ads_summary = {}
@@ -68,7 +71,7 @@ class WalletDashboard(App):
 
         with Container(id="refresh-timer-container"):
             yield Static(f"Auto-refresh every {self.REFRESH_SECONDS}s", id="refresh-label")
-            yield ProgressBar(total=self.total_ticks, show_eta=False, id="refresh-bar")
+            yield ProgressBar(total=100, show_eta=False, id="refresh-bar")
 
         with Container(id="wallet-view"):
             with Container(id="db-stats-container"):
@@ -115,7 +118,7 @@ class WalletDashboard(App):
         self._setup_table("#meta-ads-table", ["Ad Set Name", "Spend", "Installs", "CPI", "Impressions", "Clicks", "CTR %", "Status"], cursor=True)
 
         self.fetch_data()
-        self.set_interval(self.TICK_RATE, self._tick_timer)
+        self.set_interval(REFRESH_FRAME_SECONDS, self._tick_timer)
 
     def _setup_table(self, table_id: str, columns: list, cursor: bool = False):
         table = self.query_one(table_id, DataTable)
@@ -125,26 +128,27 @@ class WalletDashboard(App):
             table.cursor_type = "row"
 
     def _tick_timer(self) -> None:
-        self.timer_ticks += 1
-        bar = self.query_one("#refresh-bar", ProgressBar)
-        bar.progress = self.timer_ticks
-
-        if self.timer_ticks % 10 == 0:
-            seconds_left = self.REFRESH_SECONDS - (self.timer_ticks * self.TICK_RATE)
-            self.query_one("#refresh-label", Static).update(f"Auto-refresh every {self.REFRESH_SECONDS}s | Next refresh in {int(seconds_left)}s")
-
-        if self.timer_ticks >= self.total_ticks:
-            self.timer_ticks = 0
-            bar.progress = 0
+        self.query_one("#refresh-bar", ProgressBar).progress = 100 * self.scheduler.progress("wallet")
+        self.query_one("#refresh-label", Static).update(self.scheduler.label("wallet"))
+        if not self._fetching and self.scheduler.due("wallet"):
             self.fetch_data()
 
     def fetch_data(self) -> None:
+        self._fetching = True
         self.run_worker(self._fetch_worker, thread=True, exclusive=True)
 
     def _fetch_worker(self) -> dict:
-        return fetch_all_dashboard_data(self.current_page, self.items_per_page)
+        started = time.monotonic()
+        try:
+            data = fetch_all_dashboard_data(self.users_page, self.items_per_page)
+            self.scheduler.observe_lag(data.get('replication_status'))
+            return data
+        finally:
+            self.scheduler.record("wallet", time.monotonic() - started)
 
     def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
+        if event.state in (WorkerState.SUCCESS, WorkerState.ERROR, WorkerState.CANCELLED):
+            self._fetching = False
         if event.state == WorkerState.SUCCESS:
             self.data = event.worker.result
             if self.data.get('error'):
@@ -177,7 +181,7 @@ class WalletDashboard(App):
         if self.data.get('rds_metrics'):
             table = self.query_one("#rds-table-1", DataTable)
             table.clear()
-            table.add_row(*format_rds_metrics_row1(self.data['rds_metrics']))
+            table.add_row(*format_rds_metrics_row1(self.data['rds_metrics'], self.data.get('rds_trends')))
 
             table = self.query_one("#rds-table-2", DataTable)
             table.clear()
@@ -222,30 +226,34 @@ class WalletDashboard(App):
     # --- Actions ---
 
     def action_refresh(self) -> None:
-        self.timer_ticks = 0
-        self.query_one("#refresh-bar", ProgressBar).progress = 0
         self.notify("Refreshing...", severity="information")
         self.fetch_data()
 
     def action_next_page(self) -> None:
-        total_pages = max(1, (self.total_users + self.items_per_page - 1) // self.items_per_page)
-        if self.current_page < total_pages:
+        page = self.data.get('next_page')
+        if page:
+            self.users_page = page
             self.current_page += 1
             self.fetch_data()
 
     def action_prev_page(self) -> None:
-        if self.current_page > 1:
-            self.current_page -= 1
+        page = self.data.get('prev_page')
+        if page:
+            self.users_page = page
+            self.current_page = max(1, self.current_page - 1)
             self.fetch_data()
 
     def action_first_page(self) -> None:
-        if self.current_page != 1:
+        if self.users_page != FIRST_USERS_PAGE:
+            self.users_page = FIRST_USERS_PAGE
             self.current_page = 1
             self.fetch_data()
 
     def action_last_page(self) -> None:
+        # Keyset pages count back from the end here, so the last page is a full page
         total_pages = max(1, (self.total_users + self.items_per_page - 1) // self.items_per_page)
-        if self.current_page != total_pages:
+        if self.users_page != LAST_USERS_PAGE:
+            self.users_page = LAST_USERS_PAGE
             self.current_page = total_pages
             self.fetch_data()
 